@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from app.core.firebase import get_firestore
+from app.core.firebase import get_firestore_async
+from app.utils.metrics import TimedRoute
 from pydantic import BaseModel
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 
 
 class PinVerifyRequest(BaseModel):
@@ -10,9 +11,9 @@ class PinVerifyRequest(BaseModel):
 
 
 @router.post("/verify-pin")
-def verify_pin(payload: PinVerifyRequest):
-    db = get_firestore()
-    doc = db.collection("Login").document("pin").get()
+async def verify_pin(payload: PinVerifyRequest):
+    db = get_firestore_async()
+    doc = await db.collection("Login").document("pin").get()
 
     if not doc.exists:
         raise HTTPException(status_code=500, detail="PIN not configured")
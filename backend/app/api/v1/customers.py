@@ -1,9 +1,30 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
 from datetime import datetime, timezone
-from app.core.firebase import get_firestore
-
-router = APIRouter()
+from app.core.firebase import get_firestore_async
+from app.services.stats_service import ensure_stats_seeded, record_master_change
+from app.services.master_data_replica import get_master_data_replica
+from app.services.search_index import (
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    SearchIndex,
+)
+from app.utils.cache import TTLCache
+from app.utils.http_cache import conditional_json_response, latest_timestamp
+from app.utils.metrics import TimedRoute
+from app.storage import async_transactional
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter(route_class=TimedRoute)
+
+# Read-through cache of the customer master data, invalidated on every write
+customers_cache = TTLCache("customers")
+customers_index = SearchIndex(
+    "customers",
+    "customer_id",
+    {"name": 3, "gstin": 2, "phone": 2},
+    code_fields=("gstin", "phone"),
+)
 
 
 # ---------------------------
@@ -31,27 +52,34 @@ class CustomerUpdate(BaseModel):
 # Create Customer
 # ---------------------------
 @router.post("/")
-def create_customer(payload: CustomerCreate):
+async def create_customer(payload: CustomerCreate):
     try:
-        db = get_firestore()
+        db = get_firestore_async()
         doc_ref = db.collection("customers").document()
 
         now = datetime.now(timezone.utc)
 
-        doc_ref.set(
-            {
-                "id": doc_ref.id,
-                "name": payload.name,
-                "email": payload.email,
-                "phone": payload.phone,
-                "address": payload.address,
-                "gstin": payload.gstin,
-                "panNumber": payload.panNumber,
-                "is_active": True,
-                "created_at": now,
-                "updated_at": None,
-            }
-        )
+        customer_data = {
+            "id": doc_ref.id,
+            "name": payload.name,
+            "email": payload.email,
+            "phone": payload.phone,
+            "address": payload.address,
+            "gstin": payload.gstin,
+            "panNumber": payload.panNumber,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": None,
+        }
+
+        # Write the document and bump the dashboard counter atomically
+        await run_in_threadpool(ensure_stats_seeded)
+        batch = db.batch()
+        batch.set(doc_ref, customer_data)
+        record_master_change(batch, db, "customers", 1)
+        await batch.commit()
+        customers_cache.invalidate("all")
+        customers_index.upsert(doc_ref.id, customer_data)
 
         return {
             "success": True,
@@ -66,11 +94,11 @@ def create_customer(payload: CustomerCreate):
 # Update Customer
 # ---------------------------
 @router.put("/{customer_id}")
-def update_customer(customer_id: str, payload: CustomerUpdate):
-    db = get_firestore()
+async def update_customer(customer_id: str, payload: CustomerUpdate):
+    db = get_firestore_async()
     print(customer_id)
     doc_ref = db.collection("customers").document(customer_id)
-    doc = doc_ref.get()
+    doc = await doc_ref.get()
 
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Customer not found")
@@ -79,7 +107,9 @@ def update_customer(customer_id: str, payload: CustomerUpdate):
 
     update_data["updated_at"] = datetime.now(timezone.utc)
 
-    doc_ref.update(update_data)
+    await doc_ref.update(update_data)
+    customers_cache.invalidate("all", customer_id)
+    customers_index.patch(customer_id, update_data)
 
     return {"success": True}
 
@@ -88,20 +118,33 @@ def update_customer(customer_id: str, payload: CustomerUpdate):
 # Delete Customer (Soft Delete)
 # ---------------------------
 @router.delete("/{customer_id}")
-def delete_customer(customer_id: str):
-    db = get_firestore()
+async def delete_customer(customer_id: str):
+    db = get_firestore_async()
     doc_ref = db.collection("customers").document(customer_id)
-    doc = doc_ref.get()
+    transaction = db.transaction()
+    await run_in_threadpool(ensure_stats_seeded)
 
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Customer not found")
+    @async_transactional
+    async def delete_in_transaction(transaction):
+        doc = await doc_ref.get(transaction=transaction)
 
-    doc_ref.update(
-        {
-            "is_active": False,
-            "updated_at": datetime.now(timezone.utc),
-        }
-    )
+        if not doc.exists:
+            raise HTTPException(status_code=404, detail="Customer not found")
+
+        transaction.update(
+            doc_ref,
+            {
+                "is_active": False,
+                "updated_at": datetime.now(timezone.utc),
+            },
+        )
+        # Only count the first soft delete of an active customer
+        if (doc.to_dict() or {}).get("is_active", True):
+            record_master_change(transaction, db, "customers", -1)
+
+    await delete_in_transaction(transaction)
+    customers_cache.invalidate("all", customer_id)
+    customers_index.remove(customer_id)
 
     return {"success": True}
 
@@ -110,8 +153,19 @@ def delete_customer(customer_id: str):
 # Get All Customers (Active Only) and sort by date descending
 # ---------------------------
 @router.get("/")
-def get_all_customers():
-    db = get_firestore()
+async def get_all_customers(request: Request):
+    replica = get_master_data_replica()
+    if replica is not None and replica.is_ready("customers"):
+        customers = replica.list_active("customers", "customer_id")
+    else:
+        customers = await customers_cache.get_or_load_async(
+            "all", _load_active_customers
+        )
+    return conditional_json_response(request, {"customers": customers})
+
+
+async def _load_active_customers() -> list:
+    db = get_firestore_async()
     customers_ref = db.collection("customers")
     query = customers_ref.where("is_active", "==", True).order_by(
         "created_at", direction="DESCENDING"
@@ -119,22 +173,61 @@ def get_all_customers():
     docs = query.stream()
 
     customers = []
-    for doc in docs:
+    async for doc in docs:
         customer_data = doc.to_dict()
         customer_data["customer_id"] = doc.id
         customers.append(customer_data)
 
-    return {"customers": customers}
+    return customers
+
+
+# ---------------------------
+# Search Customers (by name, GSTIN or phone)
+# ---------------------------
+@router.get("/search")
+async def search_customers(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+):
+    replica = get_master_data_replica()
+    if replica is not None and replica.is_ready("customers"):
+        customers_index.follow(replica)
+    else:
+        await customers_index.ensure_built_async(_load_active_customers)
+
+    customers = customers_index.search(q, limit)
+    return conditional_json_response(request, {"customers": customers})
 
 
 # ---------------------------
 # Get Customer by ID
 # ---------------------------
 @router.get("/{customer_id}")
-def get_customer_by_id(customer_id: str):
-    db = get_firestore()
+async def get_customer_by_id(customer_id: str, request: Request):
+    replica = get_master_data_replica()
+    if replica is not None and replica.is_ready("customers"):
+        customer_data = replica.get("customers", customer_id)
+        if customer_data is None:
+            raise HTTPException(status_code=404, detail="Customer not found")
+    else:
+        customer_data = await customers_cache.get_or_load_async(
+            customer_id, lambda: _load_customer(customer_id)
+        )
+
+    return conditional_json_response(
+        request,
+        {"customer": customer_data},
+        last_modified=latest_timestamp(
+            customer_data.get("created_at"), customer_data.get("updated_at")
+        ),
+    )
+
+
+async def _load_customer(customer_id: str) -> dict:
+    db = get_firestore_async()
     doc_ref = db.collection("customers").document(customer_id)
-    doc = doc_ref.get()
+    doc = await doc_ref.get()
 
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Customer not found")
@@ -142,4 +235,4 @@ def get_customer_by_id(customer_id: str):
     customer_data = doc.to_dict()
     customer_data["id"] = doc.id
 
-    return {"customer": customer_data}
+    return customer_data
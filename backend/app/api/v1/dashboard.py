@@ -1,15 +1,32 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
+from typing import Optional
 from app.services.dashboard_service import DashboardService
+from app.utils.http_cache import conditional_json_response
+from app.utils.metrics import TimedRoute
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 dashboard_service = DashboardService()
 
 
 @router.get("/stats")
-def get_dashboard_stats():
+async def get_dashboard_stats(request: Request):
     """Get dashboard statistics."""
     try:
-        stats = dashboard_service.get_stats()
-        return {"success": True, "data": stats}
+        stats = await dashboard_service.get_stats_async()
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+    return conditional_json_response(request, {"success": True, "data": stats})
+
+
+@router.get("/timeseries")
+async def get_dashboard_timeseries(
+    request: Request,
+    granularity: str = Query("month", pattern="^(day|month|fy)$"),
+    fy: Optional[str] = None,
+):
+    """Get revenue and invoice-count trend from the rollup buckets."""
+    try:
+        series = await dashboard_service.get_timeseries_async(granularity, fy)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return conditional_json_response(request, {"success": True, "data": series})
@@ -1,15 +1,33 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Header, HTTPException, Query, Request, Response
+from pydantic import BaseModel, ValidationError
 from typing import List, Dict, Any, Optional
 from app.services.invoice_service import InvoiceService
+from app.services.pdf_service import get_pdf_renderer
+from app.services.pdf_cache import get_pdf_cache, pdf_cache_key
+from app.services.pdf_pool import (
+    PdfRenderOverloaded,
+    PdfRenderTimeout,
+    get_pdf_render_pool,
+)
+from starlette.concurrency import run_in_threadpool
+from app.utils.http_cache import (
+    conditional_json_response,
+    etag_matches,
+    format_etag,
+    latest_timestamp,
+)
+from app.services.invoice_export import stream_invoice_pdf_zip
+from app.utils.invoice_utils import get_financial_year_range, parse_invoice_date
+from app.utils.metrics import TimedRoute, record_phases
+from app.schemas.common import PaginatedResponse
+from app.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 import logging
-from pathlib import Path
 
-from app.core.firebase import get_firestore
+from app.core.firebase import get_firestore_async
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(route_class=TimedRoute)
 invoice_service = InvoiceService()
 
 
@@ -55,7 +73,7 @@ class CreateInvoiceRequest(BaseModel):
 
 
 @router.get("/preview-invoice-number")
-def get_preview_invoice_number():
+async def get_preview_invoice_number():
     """
     Get a preview invoice number for the form.
     This is used when the add invoice page loads.
@@ -65,7 +83,7 @@ def get_preview_invoice_number():
 
     """
     try:
-        result = invoice_service.get_invoice_number_preview()
+        result = await invoice_service.get_invoice_number_preview_async()
         return result
     except Exception as e:
         logger.error(f"Error getting preview invoice number: {str(e)}")
@@ -73,7 +91,7 @@ def get_preview_invoice_number():
 
 
 @router.post("/")
-def create_invoice(invoice_request: CreateInvoiceRequest):
+async def create_invoice(invoice_request: CreateInvoiceRequest):
     """
     Create a new invoice.
 
@@ -93,7 +111,10 @@ def create_invoice(invoice_request: CreateInvoiceRequest):
         invoice_data = invoice_request.model_dump()
 
         # Create invoice
-        result = invoice_service.create_invoice(invoice_data)
+        # The counter allocator batches commits across threads
+        result = await run_in_threadpool(
+            invoice_service.create_invoice, invoice_data
+        )
 
         return {
             "success": True,
@@ -105,20 +126,180 @@ def create_invoice(invoice_request: CreateInvoiceRequest):
         raise HTTPException(status_code=400, detail=str(e))
 
 
+# Most invoices accepted by one bulk request
+BULK_MAX_INVOICES = 10000
+
+
+@router.post("/bulk")
+async def create_invoices_bulk(invoices: List[Dict[str, Any]]):
+    """
+    Create many invoices in one request (imports and migrations).
+
+    Each row is validated like POST /invoices. Valid rows get consecutive
+    invoice numbers, in request order, from one counter transaction and are
+    written in batched commits.
+
+    Returns:
+    - One result per row (index, success, id, invoice_number, error)
+    """
+    if len(invoices) > BULK_MAX_INVOICES:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {BULK_MAX_INVOICES} invoices per bulk request",
+        )
+
+    results = [None] * len(invoices)
+    valid_rows = []
+    valid_indexes = []
+    for index, row in enumerate(invoices):
+        try:
+            valid_rows.append(CreateInvoiceRequest.model_validate(row).model_dump())
+            valid_indexes.append(index)
+        except ValidationError as e:
+            results[index] = {
+                "index": index,
+                "success": False,
+                "id": None,
+                "invoice_number": None,
+                "error": str(e),
+            }
+
+    try:
+        created = await run_in_threadpool(
+            invoice_service.create_invoices_bulk, valid_rows
+        )
+    except Exception as e:
+        logger.error(f"Error creating invoices in bulk: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for index, result in zip(valid_indexes, created):
+        results[index] = {"index": index, **result}
+
+    succeeded = sum(1 for result in results if result["success"])
+    return {
+        "success": succeeded == len(invoices),
+        "message": f"{succeeded} of {len(invoices)} invoices created",
+        "data": results,
+    }
+
+
 # ---------------------------
-# Get All invoices and sort by date descending
+# Get All invoices and sort by date descending (cursor paginated)
 # ---------------------------
-@router.get("/")
-def get_all_invoices():
-    db = get_firestore()
-    invoices_ref = db.collection("invoices")
-    # Create_at field is inside meta
-    invoices = invoices_ref.order_by("meta.created_at", direction="DESCENDING").stream()
-    return {"invoices": [doc.to_dict() for doc in invoices]}
+@router.get("/", response_model=PaginatedResponse)
+async def get_all_invoices(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    view: Optional[str] = Query(None, pattern="^(full|summary)$"),
+    fields: Optional[str] = None,
+    buyer_id: Optional[str] = None,
+    buyer_gstin: Optional[str] = None,
+    po_number: Optional[str] = None,
+    number_prefix: Optional[str] = None,
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    total_min: Optional[float] = None,
+    total_max: Optional[float] = None,
+):
+    """
+    List invoices one page at a time, optionally filtered.
+
+    Args:
+        limit: Page size
+        after: next_cursor from the previous page (omit for the first page)
+        view: "summary" returns only the fields the list view needs
+        fields: Comma separated field paths to return (overrides view)
+        buyer_id: Only invoices of this buyer
+        buyer_gstin: Only invoices of the buyer with this GSTIN
+        po_number: Only invoices with this PO number
+        number_prefix: Invoice number prefix (e.g. "INV/25-26/")
+        date_from: First invoice_date to include (YYYY-MM-DD)
+        date_to: Last invoice_date to include (YYYY-MM-DD)
+        total_min: Smallest invoice total to include
+        total_max: Largest invoice total to include
+
+    Only one of number_prefix, the date range and the total range can be
+    used at a time; results are then sorted by that field, otherwise newest
+    first.
+
+    Returns:
+        PaginatedResponse with next_cursor set when more invoices exist
+    """
+    try:
+        projection = invoice_service.resolve_invoice_fields(view=view, fields=fields)
+        filters = invoice_service.build_invoice_filters(
+            buyer_id=buyer_id,
+            buyer_gstin=buyer_gstin,
+            po_number=po_number,
+            number_prefix=number_prefix,
+            date_from=date_from,
+            date_to=date_to,
+            total_min=total_min,
+            total_max=total_max,
+        )
+        result = await invoice_service.list_invoices_async(
+            limit=limit, after=after, fields=projection, filters=filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return conditional_json_response(
+        request,
+        PaginatedResponse(
+            message="Invoices fetched successfully",
+            data=result["invoices"],
+            page_size=limit,
+            next_cursor=result["next_cursor"],
+            has_more=result["has_more"],
+        ),
+    )
+
+
+@router.get("/export/pdf")
+async def export_invoice_pdfs(
+    date_from: Optional[str] = Query(None, alias="from"),
+    date_to: Optional[str] = Query(None, alias="to"),
+    fy: Optional[str] = None,
+):
+    """
+    Export the PDFs of all invoices in a date range as one ZIP archive.
+
+    The archive is streamed while invoices are still being rendered, so
+    memory use stays flat however many invoices are exported.
+
+    Args:
+        date_from: First invoice_date to include (YYYY-MM-DD)
+        date_to: Last invoice_date to include (YYYY-MM-DD)
+        fy: Financial year "YYYY-YYYY", used instead of from/to
+
+    Returns:
+        ZIP archive with one PDF per invoice
+    """
+    from fastapi.responses import StreamingResponse
+
+    try:
+        if fy:
+            start, end = get_financial_year_range(fy)
+        else:
+            start, end = parse_invoice_date(date_from), parse_invoice_date(date_to)
+            if start is None or end is None:
+                raise ValueError("Provide from and to dates (YYYY-MM-DD) or fy")
+        if start > end:
+            raise ValueError("from must not be after to")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filename = f"invoices_{start.isoformat()}_{end.isoformat()}.zip"
+    return StreamingResponse(
+        stream_invoice_pdf_zip(invoice_service, start.isoformat(), end.isoformat()),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
 @router.get("/{invoice_id}")
-def get_invoice(invoice_id: str):
+async def get_invoice(invoice_id: str, request: Request):
     """
     Get a specific invoice by ID.
 
@@ -126,20 +307,25 @@ def get_invoice(invoice_id: str):
         invoice_id: The invoice document ID
 
     Returns:
-        Invoice document with all details
+        Invoice document with all details (304 if the client's copy is current)
     """
     try:
-        db = get_firestore()
+        db = get_firestore_async()
         invoice_ref = db.collection("invoices").document(invoice_id)
-        invoice_doc = invoice_ref.get()
+        invoice_doc = await invoice_ref.get()
 
         if not invoice_doc.exists:
             raise HTTPException(status_code=404, detail="Invoice not found")
 
-        return {
-            "success": True,
-            "data": invoice_doc.to_dict(),
-        }
+        invoice_data = invoice_doc.to_dict()
+        meta = invoice_data.get("meta") or {}
+        return conditional_json_response(
+            request,
+            {"success": True, "data": invoice_data},
+            last_modified=latest_timestamp(
+                meta.get("created_at"), meta.get("updated_at")
+            ),
+        )
     except HTTPException:
         raise
     except Exception as e:
@@ -148,7 +334,9 @@ def get_invoice(invoice_id: str):
 
 
 @router.put("/{invoice_id}")
-def update_invoice(invoice_id: str, invoice_request: CreateInvoiceRequest):
+async def update_invoice(
+    invoice_id: str, invoice_request: CreateInvoiceRequest
+):
     """
     Update an existing invoice.
 
@@ -160,31 +348,18 @@ def update_invoice(invoice_id: str, invoice_request: CreateInvoiceRequest):
         Updated invoice document
     """
     try:
-        db = get_firestore()
-        invoice_ref = db.collection("invoices").document(invoice_id)
-        invoice_doc = invoice_ref.get()
-
-        if not invoice_doc.exists:
-            raise HTTPException(status_code=404, detail="Invoice not found")
-
-        # Prepare updated data
-        from datetime import datetime, timezone
-
         invoice_data = invoice_request.model_dump()
-        invoice_data["meta"] = {
-            "created_at": invoice_doc.to_dict().get("meta", {}).get("created_at"),
-            "updated_at": datetime.now(timezone.utc),
-        }
-
-        # Update the invoice
-        invoice_ref.update(invoice_data)
 
-        logger.info(f"Invoice updated: {invoice_id}")
+        # Update the invoice (and dashboard stats) in one transaction
+        result = await run_in_threadpool(
+            invoice_service.update_invoice, invoice_id, invoice_data
+        )
+        get_pdf_cache().invalidate(invoice_id)
 
         return {
             "success": True,
             "message": "Invoice updated successfully",
-            "data": {**invoice_doc.to_dict(), **invoice_data},
+            "data": result,
         }
     except HTTPException:
         raise
@@ -194,7 +369,7 @@ def update_invoice(invoice_id: str, invoice_request: CreateInvoiceRequest):
 
 
 @router.delete("/{invoice_id}")
-def delete_invoice(invoice_id: str):
+async def delete_invoice(invoice_id: str):
     """
     Delete an invoice by ID.
 
@@ -205,17 +380,9 @@ def delete_invoice(invoice_id: str):
         Success message
     """
     try:
-        db = get_firestore()
-        invoice_ref = db.collection("invoices").document(invoice_id)
-        invoice_doc = invoice_ref.get()
-
-        if not invoice_doc.exists:
-            raise HTTPException(status_code=404, detail="Invoice not found")
-
-        # Delete the invoice
-        invoice_ref.delete()
-
-        logger.info(f"Invoice deleted: {invoice_id}")
+        # Delete the invoice (and update dashboard stats) in one transaction
+        await run_in_threadpool(invoice_service.delete_invoice, invoice_id)
+        get_pdf_cache().invalidate(invoice_id)
 
         return {
             "success": True,
@@ -229,10 +396,22 @@ def delete_invoice(invoice_id: str):
 
 
 @router.get("/{invoice_id}/pdf")
-async def get_invoice_pdf(invoice_id: str, download: bool = False):
+async def get_invoice_pdf(
+    invoice_id: str,
+    download: bool = False,
+    if_none_match: Optional[str] = Header(None),
+):
     """
     Generate and return PDF for an invoice using WeasyPrint
 
+    PDFs are cached by a hash of the invoice document, template and
+    stylesheet; that hash is also the response's strong ETag, so a client
+    sending a matching If-None-Match gets 304 without any rendering.
+
+    Blocking work runs off the event loop: the Firestore read on the async
+    client, cache I/O in the threadpool, the render in the bounded PDF worker pool (503 when
+    it is saturated).
+
     Args:
         invoice_id: The invoice document ID
 
@@ -240,73 +419,53 @@ async def get_invoice_pdf(invoice_id: str, download: bool = False):
         PDF file as bytes
     """
     try:
-        from fastapi.responses import StreamingResponse
-        from jinja2 import Environment, FileSystemLoader
-        from weasyprint import HTML, CSS
-
         # Get invoice from Firestore
-        db = get_firestore()
+        db = get_firestore_async()
         invoice_ref = db.collection("invoices").document(invoice_id)
-        invoice_doc = invoice_ref.get()
+        invoice_doc = await invoice_ref.get()
 
         if not invoice_doc.exists:
             raise HTTPException(status_code=404, detail="Invoice not found")
 
         invoice_data = invoice_doc.to_dict()
 
-        # Company details (same as in React template)
-        company_details = {
-            "name": "SPM ENGINEERING",
-            "address": "347, SANGANUR ROAD, GANAPATHY, COIMBATORE",
-            "gstin": "33AFHPE4773N1Z6",
-            "state": "Tamil Nadu",
-            "state_code": "33",
-        }
+        renderer = get_pdf_renderer()
+        pdf_cache = get_pdf_cache()
+        cache_key = pdf_cache_key(invoice_data, renderer.fingerprint())
+        etag = format_etag(cache_key)
 
-        # Prepare data for template
-        template_data = {
-            "company": company_details,
-            "invoice": invoice_data,
+        filename = f"invoice_{invoice_data.get('invoice_number', 'document')}.pdf"
+        disposition = "attachment" if download else "inline"
+        headers = {
+            "Content-Disposition": f'{disposition}; filename="{filename}"',
+            "ETag": etag,
+            "Cache-Control": "private, no-cache",
         }
 
-        # Setup Jinja2 environment with absolute path
-        backend_root = Path(__file__).resolve().parents[3]
-        template_dir = backend_root / "app" / "templates"
-        template_name = "SPM_bill.html"
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
 
-        if not (template_dir / template_name).exists():
-            raise HTTPException(
-                status_code=500,
-                detail=f"Template not found: {template_name} in {template_dir}",
-            )
-
-        env = Environment(loader=FileSystemLoader(str(template_dir)))
-        template = env.get_template(template_name)
-
-        # Render HTML from Jinja2 template
-        html_content = template.render(template_data)
-
-        # Get CSS
-        css_path = template_dir / "spm_bill.css"
-        css = CSS(string=css_path.read_text(encoding="utf-8"))
-
-        # Generate PDF using WeasyPrint
-        pdf_bytes = HTML(string=html_content).write_pdf(stylesheets=[css])
-
-        filename = f"invoice_{invoice_data.get('invoice_number', 'document')}.pdf"
-        disposition = "attachment" if download else "inline"
+        pdf_bytes = await run_in_threadpool(pdf_cache.get, cache_key)
+        if pdf_bytes is not None:
+            headers["X-Cache"] = "HIT"
+        else:
+            # Render in a warmed worker with the cached template and stylesheet
+            pdf_bytes, timings = await get_pdf_render_pool().render(invoice_data)
+            await run_in_threadpool(pdf_cache.put, cache_key, invoice_id, pdf_bytes)
+            headers["X-Cache"] = "MISS"
+            record_phases(timings)
 
         # Return PDF
-        return StreamingResponse(
-            iter([pdf_bytes]),
-            media_type="application/pdf",
-            headers={
-                "Content-Disposition": f'{disposition}; filename="{filename}"'
-            },
-        )
+        return Response(content=pdf_bytes, media_type="application/pdf", headers=headers)
 
     except HTTPException:
         raise
+    except PdfRenderOverloaded as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": "5"}
+        )
+    except PdfRenderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         logger.error(f"Error generating PDF: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating PDF: {str(e)}")
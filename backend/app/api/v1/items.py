@@ -1,9 +1,27 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request
 from pydantic import BaseModel
 from datetime import datetime, timezone
-from app.core.firebase import get_firestore
-
-router = APIRouter()
+from app.core.firebase import get_firestore_async
+from app.services.stats_service import ensure_stats_seeded, record_master_change
+from app.services.master_data_replica import get_master_data_replica
+from app.services.search_index import (
+    DEFAULT_SEARCH_LIMIT,
+    MAX_SEARCH_LIMIT,
+    SearchIndex,
+)
+from app.utils.cache import TTLCache
+from app.utils.http_cache import conditional_json_response, latest_timestamp
+from app.utils.metrics import TimedRoute
+from app.storage import async_transactional
+from starlette.concurrency import run_in_threadpool
+
+router = APIRouter(route_class=TimedRoute)
+
+# Read-through cache of the item master data, invalidated on every write
+items_cache = TTLCache("items")
+items_index = SearchIndex(
+    "items", "item_id", {"name": 3, "hsn_sac": 2, "description": 1}, code_fields=("hsn_sac",)
+)
 
 
 # ---------------------------
@@ -31,27 +49,34 @@ class ItemUpdate(BaseModel):
 # Create Item
 # ---------------------------
 @router.post("/")
-def create_item(payload: ItemCreate):
+async def create_item(payload: ItemCreate):
     try:
-        db = get_firestore()
+        db = get_firestore_async()
         doc_ref = db.collection("items").document()
 
         now = datetime.now(timezone.utc)
 
-        doc_ref.set(
-            {
-                "id": doc_ref.id,
-                "name": payload.name,
-                "hsn_sac": payload.hsn_sac,
-                "uom": payload.uom,
-                "rate": payload.rate,
-                "gst_percentage": payload.gst_percentage,
-                "description": payload.description,
-                "is_active": True,
-                "created_at": now,
-                "updated_at": None,
-            }
-        )
+        item_data = {
+            "id": doc_ref.id,
+            "name": payload.name,
+            "hsn_sac": payload.hsn_sac,
+            "uom": payload.uom,
+            "rate": payload.rate,
+            "gst_percentage": payload.gst_percentage,
+            "description": payload.description,
+            "is_active": True,
+            "created_at": now,
+            "updated_at": None,
+        }
+
+        # Write the document and bump the dashboard counter atomically
+        await run_in_threadpool(ensure_stats_seeded)
+        batch = db.batch()
+        batch.set(doc_ref, item_data)
+        record_master_change(batch, db, "items", 1)
+        await batch.commit()
+        items_cache.invalidate("all")
+        items_index.upsert(doc_ref.id, item_data)
 
         return {
             "success": True,
@@ -66,11 +91,11 @@ def create_item(payload: ItemCreate):
 # Update Item
 # ---------------------------
 @router.put("/{item_id}")
-def update_item(item_id: str, payload: ItemUpdate):
-    db = get_firestore()
+async def update_item(item_id: str, payload: ItemUpdate):
+    db = get_firestore_async()
     print(item_id)
     doc_ref = db.collection("items").document(item_id)
-    doc = doc_ref.get()
+    doc = await doc_ref.get()
 
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -79,7 +104,9 @@ def update_item(item_id: str, payload: ItemUpdate):
 
     update_data["updated_at"] = datetime.now(timezone.utc)
 
-    doc_ref.update(update_data)
+    await doc_ref.update(update_data)
+    items_cache.invalidate("all", item_id)
+    items_index.patch(item_id, update_data)
 
     return {"success": True}
 
@@ -88,20 +115,33 @@ def update_item(item_id: str, payload: ItemUpdate):
 # Delete Item (Soft Delete)
 # ---------------------------
 @router.delete("/{item_id}")
-def delete_item(item_id: str):
-    db = get_firestore()
+async def delete_item(item_id: str):
+    db = get_firestore_async()
     doc_ref = db.collection("items").document(item_id)
-    doc = doc_ref.get()
+    transaction = db.transaction()
+    await run_in_threadpool(ensure_stats_seeded)
 
-    if not doc.exists:
-        raise HTTPException(status_code=404, detail="Item not found")
+    @async_transactional
+    async def delete_in_transaction(transaction):
+        doc = await doc_ref.get(transaction=transaction)
 
-    doc_ref.update(
-        {
-            "is_active": False,
-            "updated_at": datetime.now(timezone.utc),
-        }
-    )
+        if not doc.exists:
+            raise HTTPException(status_code=404, detail="Item not found")
+
+        transaction.update(
+            doc_ref,
+            {
+                "is_active": False,
+                "updated_at": datetime.now(timezone.utc),
+            },
+        )
+        # Only count the first soft delete of an active item
+        if (doc.to_dict() or {}).get("is_active", True):
+            record_master_change(transaction, db, "items", -1)
+
+    await delete_in_transaction(transaction)
+    items_cache.invalidate("all", item_id)
+    items_index.remove(item_id)
 
     return {"success": True}
 
@@ -110,8 +150,17 @@ def delete_item(item_id: str):
 # Get All Items (Active Only) and sort by date descending
 # ---------------------------
 @router.get("/")
-def get_all_items():
-    db = get_firestore()
+async def get_all_items(request: Request):
+    replica = get_master_data_replica()
+    if replica is not None and replica.is_ready("items"):
+        items = replica.list_active("items", "item_id")
+    else:
+        items = await items_cache.get_or_load_async("all", _load_active_items)
+    return conditional_json_response(request, {"items": items})
+
+
+async def _load_active_items() -> list:
+    db = get_firestore_async()
     items_ref = db.collection("items")
     query = items_ref.where("is_active", "==", True).order_by(
         "created_at", direction="DESCENDING"
@@ -119,25 +168,61 @@ def get_all_items():
     docs = query.stream()
 
     items = []
-    for doc in docs:
+    async for doc in docs:
         item_data = doc.to_dict()
         item_data["item_id"] = doc.id
         items.append(item_data)
 
-    return {"items": items}
+    return items
 
 
 # ---------------------------
+# Search Items (by name, HSN/SAC code or description)
+# ---------------------------
+@router.get("/search")
+async def search_items(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
+):
+    replica = get_master_data_replica()
+    if replica is not None and replica.is_ready("items"):
+        items_index.follow(replica)
+    else:
+        await items_index.ensure_built_async(_load_active_items)
+
+    items = items_index.search(q, limit)
+    return conditional_json_response(request, {"items": items})
 
 
 # ---------------------------
 # Get Item by ID
 # ---------------------------
 @router.get("/{item_id}")
-def get_item_by_id(item_id: str):
-    db = get_firestore()
+async def get_item_by_id(item_id: str, request: Request):
+    replica = get_master_data_replica()
+    if replica is not None and replica.is_ready("items"):
+        item_data = replica.get("items", item_id)
+        if item_data is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+    else:
+        item_data = await items_cache.get_or_load_async(
+            item_id, lambda: _load_item(item_id)
+        )
+
+    return conditional_json_response(
+        request,
+        {"item": item_data},
+        last_modified=latest_timestamp(
+            item_data.get("created_at"), item_data.get("updated_at")
+        ),
+    )
+
+
+async def _load_item(item_id: str) -> dict:
+    db = get_firestore_async()
     doc_ref = db.collection("items").document(item_id)
-    doc = doc_ref.get()
+    doc = await doc_ref.get()
 
     if not doc.exists:
         raise HTTPException(status_code=404, detail="Item not found")
@@ -145,7 +230,7 @@ def get_item_by_id(item_id: str):
     item_data = doc.to_dict()
     item_data["id"] = doc.id
 
-    return {"item": item_data}
+    return item_data
 
 
 # ---------------------------
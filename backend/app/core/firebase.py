@@ -1,16 +1,24 @@
 import os
 import json
+import inspect
 import logging
+import time
 
 import dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
+
+from app.storage import (
+    get_async_document_client,
+    get_document_client,
+    get_storage_backend,
+)
+from app.utils.metrics import record_rpc
 
 dotenv.load_dotenv()
 
 logger = logging.getLogger(__name__)
 
 _db = None
+_async_db = None
 
 
 # Test/local function (commented as requested).
@@ -41,11 +49,11 @@ _db = None
 # ----------------------------------Firestore Production Initialization----------------------------------
 # Production function for Vercel.
 # Set env var: FIREBASE_ADMINSDK_JSON with the full Firebase service account JSON.
-def get_firestore():
-    global _db
-
-    if _db:
-        return _db
+def _initialize_app():
+    # firebase_admin pulls in google-auth, requests and cryptography, so it
+    # is imported when the first Firestore client is created, not at start-up
+    import firebase_admin
+    from firebase_admin import credentials
 
     firebase_adminsdk_json = os.getenv("FIREBASE_ADMINSDK_JSON")
     if not firebase_adminsdk_json:
@@ -63,5 +71,133 @@ def get_firestore():
         firebase_admin.initialize_app(cred)
         logger.info("Firebase initialized (production env)")
 
-    _db = firestore.client()
+
+# ---------------------------
+# RPC instrumentation
+# ---------------------------
+# Streaming RPCs and the response field marking one document read; an
+# aggregation is billed as one read per result
+_STREAMING_RPCS = {
+    "batch_get_documents": "found",
+    "run_query": "document",
+    "run_aggregation_query": "result",
+}
+_UNARY_RPCS = ("commit", "begin_transaction", "rollback", "batch_write")
+
+
+def _count_reads(response, field: str) -> int:
+    return int(field in response)
+
+
+def _instrument_stream(name: str, rpc, field: str):
+    def stream(*args, **kwargs):
+        started = time.perf_counter()
+        result = rpc(*args, **kwargs)
+
+        if not inspect.isawaitable(result):
+
+            def responses():
+                reads = 0
+                try:
+                    for response in result:
+                        reads += _count_reads(response, field)
+                        yield response
+                finally:
+                    record_rpc(name, time.perf_counter() - started, reads=reads)
+
+            return responses()
+
+        async def async_responses():
+            reads = 0
+            try:
+                async for response in await result:
+                    reads += _count_reads(response, field)
+                    yield response
+            finally:
+                record_rpc(name, time.perf_counter() - started, reads=reads)
+
+        # The async GAPIC client returns an awaitable resolving to the stream
+        async def open_stream():
+            return async_responses()
+
+        return open_stream()
+
+    return stream
+
+
+def _instrument_unary(name: str, rpc):
+    def writes_of(kwargs) -> int:
+        request = kwargs.get("request") or {}
+        writes = request.get("writes") if isinstance(request, dict) else None
+        return len(writes or ())
+
+    if inspect.iscoroutinefunction(rpc):
+
+        async def async_call(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await rpc(*args, **kwargs)
+            finally:
+                record_rpc(
+                    name, time.perf_counter() - started, writes=writes_of(kwargs)
+                )
+
+        return async_call
+
+    def call(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return rpc(*args, **kwargs)
+        finally:
+            record_rpc(name, time.perf_counter() - started, writes=writes_of(kwargs))
+
+    return call
+
+
+def _instrument(client):
+    """
+    Wrap the RPCs of a Firestore client's GAPIC API so each call records its
+    duration and the documents it read or wrote (app.utils.metrics).
+    """
+    api = client._firestore_api
+    for name, field in _STREAMING_RPCS.items():
+        setattr(api, name, _instrument_stream(name, getattr(api, name), field))
+    for name in _UNARY_RPCS:
+        setattr(api, name, _instrument_unary(name, getattr(api, name)))
+    return client
+
+
+def get_firestore():
+    global _db
+
+    if _db:
+        return _db
+
+    if get_storage_backend() != "firestore":
+        _db = get_document_client()
+        return _db
+
+    _initialize_app()
+    from firebase_admin import firestore
+
+    _db = _instrument(firestore.client())
     return _db
+
+
+# Async client for `async def` handlers: requests await their RPCs on the
+# event loop instead of each holding a threadpool thread.
+def get_firestore_async():
+    global _async_db
+
+    if _async_db:
+        return _async_db
+
+    if get_storage_backend() != "firestore":
+        _async_db = get_async_document_client()
+        return _async_db
+
+    _initialize_app()
+    from firebase_admin import firestore_async
+
+    _async_db = _instrument(firestore_async.client())
+    return _async_db
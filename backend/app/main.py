@@ -1,13 +1,79 @@
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from app.api.v1 import api
+from app.services.master_data_replica import (
+    get_master_data_replica,
+    stop_master_data_replica,
+)
+from app.services.invoice_counter import get_allocator_stats
+from app.services.pdf_cache import get_pdf_cache
+from app.services.pdf_pool import (
+    get_pdf_render_pool,
+    shutdown_pdf_render_pool,
+    start_pdf_render_pool,
+)
+from app.utils.cache import get_cache_stats
+from app.utils.compression import SelectiveCompressionMiddleware
+from app.utils.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    RequestMetricsMiddleware,
+    registry,
+)
+from app.utils.response import ORJSONResponse
+
+try:
+    # Optional: brotli-asgi serves br to clients that accept it, gzip otherwise
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
+
+# Responses smaller than this are not worth compressing
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1000))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Launch the PDF render workers before any client or listener thread
+    # exists, so the first render finds them warm
+    start_pdf_render_pool()
+    # Attach the master data listeners early so the first reads are local
+    get_master_data_replica()
+    yield
+    stop_master_data_replica()
+    # Stop PDF render worker processes
+    shutdown_pdf_render_pool()
+
 
 app = FastAPI(
     title="SPM Billing Software API",
     description="FastAPI backend for billing management system",
     version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
+# PDFs and ZIP exports are sent as they are (see app.utils.compression)
+if BrotliMiddleware is not None:
+    app.add_middleware(
+        SelectiveCompressionMiddleware,
+        compressor=BrotliMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        gzip_fallback=True,
+    )
+else:
+    # Level 6 gets most of level 9's ratio for a fraction of the CPU
+    app.add_middleware(
+        SelectiveCompressionMiddleware,
+        compressor=GZipMiddleware,
+        minimum_size=COMPRESSION_MIN_SIZE,
+        compresslevel=6,
+    )
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # simple app
@@ -16,6 +82,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so Server-Timing covers the other middleware too
+app.add_middleware(RequestMetricsMiddleware)
+
 
 # Include API routers
 app.include_router(api.router, prefix="/api/v1")
@@ -26,6 +95,106 @@ async def health_check():
     return {"status": "healthy"}
 
 
+def _service_metrics() -> list:
+    """Cache, PDF and invoice counter stats as Prometheus metric families."""
+    caches = get_cache_stats()
+    pdf_cache = get_pdf_cache().stats()
+    pdf_pool = get_pdf_render_pool().stats()
+    allocator = get_allocator_stats()
+
+    def per_cache(key):
+        return [
+            ({"cache": name}, stats[key]) for name, stats in sorted(caches.items())
+        ]
+
+    return [
+        (
+            "spm_cache_hits_total",
+            "counter",
+            "Read-through cache hits",
+            per_cache("hits"),
+        ),
+        (
+            "spm_cache_misses_total",
+            "counter",
+            "Read-through cache misses",
+            per_cache("misses"),
+        ),
+        (
+            "spm_cache_invalidations_total",
+            "counter",
+            "Read-through cache invalidations",
+            per_cache("invalidations"),
+        ),
+        ("spm_cache_entries", "gauge", "Entries held per cache", per_cache("entries")),
+        (
+            "spm_pdf_cache_hits_total",
+            "counter",
+            "Rendered PDF cache hits",
+            [
+                ({"tier": "memory"}, pdf_cache["memory_hits"]),
+                ({"tier": "disk"}, pdf_cache["disk_hits"]),
+            ],
+        ),
+        (
+            "spm_pdf_cache_misses_total",
+            "counter",
+            "Rendered PDF cache misses",
+            [({}, pdf_cache["misses"])],
+        ),
+        (
+            "spm_pdf_cache_evictions_total",
+            "counter",
+            "PDFs evicted from the cache",
+            [
+                ({"tier": "memory"}, pdf_cache["evictions"]),
+                ({"tier": "disk"}, pdf_cache["disk_evictions"]),
+            ],
+        ),
+        (
+            "spm_pdf_cache_bytes",
+            "gauge",
+            "PDF bytes held by the cache (disk: estimate of this process)",
+            [
+                ({"tier": "memory"}, pdf_cache["bytes"]),
+                ({"tier": "disk"}, pdf_cache["disk_bytes"]),
+            ],
+        ),
+        (
+            "spm_pdf_render_workers",
+            "gauge",
+            "PDF render worker processes",
+            [({}, pdf_pool["workers"])],
+        ),
+        (
+            "spm_pdf_render_pending",
+            "gauge",
+            "PDF renders queued or running",
+            [({}, pdf_pool["pending"])],
+        ),
+        (
+            "spm_invoice_counter_transactions_total",
+            "counter",
+            "Invoice counter transactions",
+            [({}, allocator["transactions"])],
+        ),
+        (
+            "spm_invoice_numbers_allocated_total",
+            "counter",
+            "Invoice numbers allocated",
+            [({}, allocator["allocated"])],
+        ),
+    ]
+
+
+registry.register_collector(_service_metrics)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
 
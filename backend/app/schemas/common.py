@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Any
+from typing import Any, Optional
 
 
 class SuccessResponse(BaseModel):
@@ -18,6 +18,9 @@ class PaginatedResponse(BaseModel):
     status: str = "success"
     message: str
     data: list
-    total: int
-    page: int
+    total: Optional[int] = None
+    page: Optional[int] = None
     page_size: int
+    # Keyset pagination: pass next_cursor back as `after` to fetch the next page
+    next_cursor: Optional[str] = None
+    has_more: bool = False
@@ -0,0 +1,27 @@
+"""
+Rebuild the materialized dashboard stats document and the revenue rollup
+buckets from scratch.
+
+Usage (from the backend directory):
+    python -m app.scripts.rebuild_stats
+"""
+
+import logging
+
+from app.services.dashboard_service import STATS_COUNTERS, DashboardService
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    dashboard_service = DashboardService()
+
+    stats = dashboard_service.rebuild_stats()
+    for key in STATS_COUNTERS:
+        print(f"{key}: {stats[key]}")
+
+    scanned = dashboard_service.rebuild_rollups()
+    print(f"rollups rebuilt from {scanned} invoices")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+"""
+Set the login PIN in the configured storage backend (Login/pin), e.g. for
+a fresh SQLite install.
+
+Usage (from the backend directory):
+    STORAGE_BACKEND=sqlite python -m app.scripts.set_pin 1234
+"""
+
+import sys
+
+from app.core.firebase import get_firestore
+
+
+def main():
+    if len(sys.argv) != 2 or not sys.argv[1].strip():
+        print("usage: python -m app.scripts.set_pin <pin>")
+        sys.exit(2)
+
+    get_firestore().collection("Login").document("pin").set(
+        {"login_pin": sys.argv[1].strip()}, merge=True
+    )
+    print("login PIN updated")
+
+
+if __name__ == "__main__":
+    main()
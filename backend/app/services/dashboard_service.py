@@ -1,46 +1,469 @@
+import asyncio
 import logging
-from app.core.firebase import get_firestore
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from app.core.firebase import get_firestore, get_firestore_async
+from app.services.stats_service import (
+    ROLLUPS_SEEDED_FIELD,
+    SEEDED_FIELD,
+    ensure_stats_seeded,
+    get_stats_ref,
+    is_seeded,
+)
+from app.services.rollup_service import (
+    GRANULARITIES,
+    ROLLUPS_COLLECTION,
+    bucket_id,
+    financial_year_bucket_keys,
+    invoice_buckets,
+)
+from app.utils.invoice_utils import get_current_financial_year, invoice_revenue
+from starlette.concurrency import run_in_threadpool
 
 logger = logging.getLogger(__name__)
 
+# Firestore limit on writes per batch commit
+BATCH_LIMIT = 500
+
+
+# Seconds each dashboard aggregation query may take before it is reported
+# as missing instead of holding up the whole response
+STATS_QUERY_TIMEOUT = float(os.getenv("DASHBOARD_QUERY_TIMEOUT", 5))
+
+STATS_COUNTERS = ("total_invoices", "total_customers", "total_items", "total_revenue")
+
+
+def _complete() -> dict:
+    return {"partial": False, "errors": {}}
+
+
+def _aggregation_unsupported() -> tuple:
+    """Errors meaning the client library or backend cannot run aggregation queries."""
+    # google.api_core loads grpc; imported on first use to keep start-up fast
+    from google.api_core import exceptions as google_exceptions
+
+    return (
+        AttributeError,
+        NotImplementedError,
+        google_exceptions.MethodNotImplemented,
+        google_exceptions.InvalidArgument,
+    )
+
+
+def _describe_error(error: BaseException) -> str:
+    from google.api_core import exceptions as google_exceptions
+
+    if isinstance(error, (asyncio.TimeoutError, google_exceptions.DeadlineExceeded)):
+        return f"timed out after {STATS_QUERY_TIMEOUT:g}s"
+    return str(error) or type(error).__name__
+
 
 class DashboardService:
-    def __init__(self):
-        self.db = get_firestore()
+    # Clients are created on first use, like InvoiceService's
+    @cached_property
+    def db(self):
+        return get_firestore()
+
+    @cached_property
+    def async_db(self):
+        return get_firestore_async()
 
     def get_stats(self) -> dict:
-        """Fetch dashboard counters for invoices, customers, and items."""
+        """
+        Fetch dashboard counters for invoices, customers, and items.
+
+        Reads the materialized Stats/dashboard document. If it has not been
+        seeded yet (fresh project or first deploy), it is rebuilt from the
+        collections.
+        """
         try:
-            count_doc = self.db.collection("Count").document("count").get()
-            count_data = count_doc.to_dict() if count_doc.exists else {}
-
-            total_invoices = int(count_data.get("inv_no", 0) or 0)
-            total_customers = len(
-                list(
-                    self.db.collection("customers")
-                    .where("is_active", "==", True)
-                    .stream()
-                )
-            )
-            total_items = len(
-                list(
-                    self.db.collection("items").where("is_active", "==", True).stream()
+            stats_doc = get_stats_ref(self.db).get()
+            if not is_seeded(stats_doc):
+                logger.info("Dashboard stats document not seeded, rebuilding")
+                return self.rebuild_stats()
+
+            return self._stats_from_doc(stats_doc)
+        except Exception as e:
+            logger.error(f"Error fetching dashboard stats: {str(e)}")
+            raise Exception(f"Failed to fetch dashboard stats: {str(e)}")
+
+    async def get_stats_async(self) -> dict:
+        """
+        get_stats on the async client.
+
+        A document that is not seeded is recomputed with the concurrent aggregation
+        queries of compute_stats_async and only stored when every query
+        succeeded; otherwise the partial counters are returned as they are.
+        """
+        from google.cloud import firestore
+
+        try:
+            stats_doc = await get_stats_ref(self.async_db).get()
+            if is_seeded(stats_doc):
+                return self._stats_from_doc(stats_doc)
+
+            logger.info("Dashboard stats document not seeded, rebuilding")
+            stats = await self.compute_stats_async()
+            if not stats["partial"]:
+                counters = self._counters(stats)
+                await get_stats_ref(self.async_db).set(
+                    {
+                        **counters,
+                        SEEDED_FIELD: True,
+                        "updated_at": firestore.SERVER_TIMESTAMP,
+                    },
+                    merge=True,
                 )
-            )
-            # calculate the total fiels in totals metadata of all invoices
-            invoices = self.db.collection("invoices").stream()
-            total_revenue = 0
-            for invoice in invoices:
-                invoice_data = invoice.to_dict()
-                totals = invoice_data.get("totals", {})
-                total_revenue += float(totals.get("total", 0) or 0)
-
-            return {
-                "total_invoices": total_invoices,
-                "total_customers": total_customers,
-                "total_items": total_items,
-                "total_revenue": total_revenue,
-            }
+            return stats
         except Exception as e:
             logger.error(f"Error fetching dashboard stats: {str(e)}")
             raise Exception(f"Failed to fetch dashboard stats: {str(e)}")
+
+    def _stats_from_doc(self, stats_doc) -> dict:
+        data = stats_doc.to_dict() or {}
+        return {
+            "total_invoices": int(data.get("total_invoices", 0) or 0),
+            "total_customers": int(data.get("total_customers", 0) or 0),
+            "total_items": int(data.get("total_items", 0) or 0),
+            "total_revenue": float(data.get("total_revenue", 0) or 0),
+            **_complete(),
+        }
+
+    def compute_stats(self) -> dict:
+        """
+        Recompute the dashboard counters from the collections.
+
+        Uses server-side count()/sum() aggregation queries so only scalars come
+        back over the wire; the queries run concurrently, each bounded by
+        STATS_QUERY_TIMEOUT, so the latency is that of the slowest one. Falls
+        back to streaming every document when the client library or backend
+        (e.g. an old emulator) cannot aggregate.
+
+        Returns:
+            dict: The counters, plus "partial" and the "errors" of any query
+            that failed or timed out (its counters are reported as 0)
+        """
+        try:
+            queries = self._stats_queries(self.db)
+        except _aggregation_unsupported() as e:
+            # Clients without count()/sum() fail while the query is built
+            logger.warning(
+                f"Aggregation queries unavailable ({str(e)}), scanning collections"
+            )
+            return {**self._compute_stats_streamed(), **_complete()}
+        results, errors = {}, {}
+
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            futures = {
+                name: executor.submit(self._aggregate, query)
+                for name, query in queries.items()
+            }
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except _aggregation_unsupported() as e:
+                    logger.warning(
+                        f"Aggregation queries unavailable ({str(e)}), "
+                        "scanning collections"
+                    )
+                    return {**self._compute_stats_streamed(), **_complete()}
+                except Exception as e:
+                    errors[name] = _describe_error(e)
+
+        return self._stats_from_aggregates(results, errors)
+
+    async def compute_stats_async(self) -> dict:
+        """compute_stats on the async client, fanned out with asyncio.gather."""
+        try:
+            queries = self._stats_queries(self.async_db)
+        except _aggregation_unsupported() as e:
+            logger.warning(
+                f"Aggregation queries unavailable ({str(e)}), scanning collections"
+            )
+            streamed = await run_in_threadpool(self._compute_stats_streamed)
+            return {**streamed, **_complete()}
+
+        async def run(query):
+            return await asyncio.wait_for(
+                self._aggregate_async(query), STATS_QUERY_TIMEOUT
+            )
+
+        outcomes = await asyncio.gather(
+            *(run(query) for query in queries.values()), return_exceptions=True
+        )
+
+        results, errors = {}, {}
+        for name, outcome in zip(queries, outcomes):
+            if isinstance(outcome, _aggregation_unsupported()):
+                logger.warning(
+                    f"Aggregation queries unavailable ({str(outcome)}), "
+                    "scanning collections"
+                )
+                streamed = await run_in_threadpool(self._compute_stats_streamed)
+                return {**streamed, **_complete()}
+            if isinstance(outcome, BaseException):
+                errors[name] = _describe_error(outcome)
+            else:
+                results[name] = outcome
+
+        return self._stats_from_aggregates(results, errors)
+
+    def _stats_queries(self, db) -> dict:
+        """The independent aggregation queries behind the dashboard counters."""
+        return {
+            "customers": db.collection("customers")
+            .where("is_active", "==", True)
+            .count(alias="total_customers"),
+            "items": db.collection("items")
+            .where("is_active", "==", True)
+            .count(alias="total_items"),
+            "invoices": db.collection("invoices")
+            .count(alias="total_invoices")
+            .sum("totals.total", alias="total_revenue"),
+        }
+
+    def _aggregate(self, aggregation_query) -> dict:
+        """Run an aggregation query and return its results keyed by alias."""
+        values = {}
+        for result in aggregation_query.get(timeout=STATS_QUERY_TIMEOUT):
+            for aggregation in result:
+                values[aggregation.alias] = aggregation.value
+        return values
+
+    async def _aggregate_async(self, aggregation_query) -> dict:
+        values = {}
+        for result in await aggregation_query.get(timeout=STATS_QUERY_TIMEOUT):
+            for aggregation in result:
+                values[aggregation.alias] = aggregation.value
+        return values
+
+    def _stats_from_aggregates(self, results: dict, errors: dict) -> dict:
+        if errors:
+            logger.warning(f"Dashboard stats incomplete: {errors}")
+
+        customers = results.get("customers", {})
+        items = results.get("items", {})
+        invoices = results.get("invoices", {})
+        return {
+            "total_invoices": int(invoices.get("total_invoices") or 0),
+            "total_customers": int(customers.get("total_customers") or 0),
+            "total_items": int(items.get("total_items") or 0),
+            "total_revenue": float(invoices.get("total_revenue") or 0),
+            "partial": bool(errors),
+            "errors": errors,
+        }
+
+    def _counters(self, stats: dict) -> dict:
+        """Just the counter fields of a stats result."""
+        return {key: stats[key] for key in STATS_COUNTERS}
+
+    def _compute_stats_streamed(self) -> dict:
+        total_customers = len(
+            list(self.db.collection("customers").where("is_active", "==", True).stream())
+        )
+        total_items = len(
+            list(self.db.collection("items").where("is_active", "==", True).stream())
+        )
+        # calculate the total fiels in totals metadata of all invoices
+        total_invoices = 0
+        total_revenue = 0
+        for invoice in self.db.collection("invoices").stream():
+            invoice_data = invoice.to_dict()
+            totals = invoice_data.get("totals", {})
+            total_revenue += float(totals.get("total", 0) or 0)
+            total_invoices += 1
+
+        return {
+            "total_invoices": total_invoices,
+            "total_customers": total_customers,
+            "total_items": total_items,
+            "total_revenue": total_revenue,
+        }
+
+    def rebuild_stats(self) -> dict:
+        """
+        Recompute the dashboard counters from scratch and overwrite the
+        materialized stats document.
+
+        Writes that land while the scan is running may be lost; run this when
+        the counters are suspected to have drifted, not on every request.
+        """
+        from google.cloud import firestore
+
+        stats = self.compute_stats()
+        if stats["partial"]:
+            raise Exception(
+                f"Dashboard stats could not be fully recomputed: {stats['errors']}"
+            )
+        get_stats_ref(self.db).set(
+            {
+                **self._counters(stats),
+                SEEDED_FIELD: True,
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            },
+            merge=True,
+        )
+        logger.info(f"Dashboard stats rebuilt: {self._counters(stats)}")
+        return stats
+
+    def get_timeseries(self, granularity: str, fy: str | None = None) -> dict:
+        """
+        Revenue and invoice-count trend for a financial year.
+
+        Reads the pre-aggregated rollup buckets (at most one document per
+        day/month of the FY), seeding them first on an install that has
+        none; buckets without invoices are returned as zeros.
+
+        Args:
+            granularity: "day", "month" or "fy"
+            fy: Financial year "YYYY-YYYY"; defaults to the current FY.
+                With granularity "fy" and no fy, every FY bucket is returned.
+
+        Returns:
+            dict: granularity, fy and a time-ordered list of points
+
+        Raises:
+            ValueError: If the granularity or financial year is invalid
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity: {granularity}")
+
+        # Existing installs have no buckets for invoices older than the deploy
+        ensure_stats_seeded(self.db)
+        collection = self.db.collection(ROLLUPS_COLLECTION)
+
+        if granularity == "fy" and not fy:
+            docs = collection.where("granularity", "==", "fy").stream()
+            snapshots = {doc.id: doc for doc in docs}
+            keys = sorted(doc.to_dict().get("bucket") for doc in snapshots.values())
+        else:
+            fy = fy or get_current_financial_year()
+            keys = financial_year_bucket_keys(granularity, fy)
+            refs = [collection.document(bucket_id(granularity, key)) for key in keys]
+            snapshots = {doc.id: doc for doc in self.db.get_all(refs)}
+
+        return self._timeseries(granularity, fy, keys, snapshots)
+
+    async def get_timeseries_async(
+        self, granularity: str, fy: str | None = None
+    ) -> dict:
+        """get_timeseries on the async client."""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"Invalid granularity: {granularity}")
+
+        await run_in_threadpool(ensure_stats_seeded, self.db)
+        collection = self.async_db.collection(ROLLUPS_COLLECTION)
+
+        if granularity == "fy" and not fy:
+            docs = collection.where("granularity", "==", "fy").stream()
+            snapshots = {doc.id: doc async for doc in docs}
+            keys = sorted(doc.to_dict().get("bucket") for doc in snapshots.values())
+        else:
+            fy = fy or get_current_financial_year()
+            keys = financial_year_bucket_keys(granularity, fy)
+            refs = [collection.document(bucket_id(granularity, key)) for key in keys]
+            snapshots = {doc.id: doc async for doc in self.async_db.get_all(refs)}
+
+        return self._timeseries(granularity, fy, keys, snapshots)
+
+    def _timeseries(self, granularity: str, fy, keys: list, snapshots: dict) -> dict:
+        points = []
+        for key in keys:
+            doc = snapshots.get(bucket_id(granularity, key))
+            data = (doc.to_dict() or {}) if doc is not None and doc.exists else {}
+            points.append(
+                {
+                    "bucket": key,
+                    "invoice_count": int(data.get("invoice_count", 0) or 0),
+                    "revenue": float(data.get("revenue", 0) or 0),
+                }
+            )
+
+        return {"granularity": granularity, "fy": fy, "points": points}
+
+    def rebuild_rollups(self) -> int:
+        """
+        Recompute every rollup bucket from the invoices collection.
+
+        The buckets are first computed in memory from a projected scan of the
+        invoices (only the fields that feed them are read), then written over
+        the existing ones with set() (no merge), and only then are buckets
+        that no longer hold any invoice deleted. The dashboard never sees an
+        empty collection, and a crash part-way leaves every bucket either as
+        it was or rebuilt.
+
+        Invoice writes that commit while the scan runs can be lost or counted
+        twice, so pause invoice writes while running it by hand. Marks the
+        rollups seeded once every bucket is written.
+
+        Returns:
+            int: Number of invoices scanned
+        """
+        from google.cloud import firestore
+
+        collection = self.db.collection(ROLLUPS_COLLECTION)
+
+        # Accumulate in memory and write each bucket once
+        buckets = {}
+        scanned = 0
+        invoices = (
+            self.db.collection("invoices")
+            .select(["invoice_date", "totals.total", "meta.created_at"])
+            .stream()
+        )
+        for doc in invoices:
+            scanned += 1
+            invoice = doc.to_dict()
+            revenue = invoice_revenue(invoice)
+            for granularity, key, fy in invoice_buckets(invoice):
+                bucket = buckets.setdefault(
+                    bucket_id(granularity, key),
+                    {
+                        "granularity": granularity,
+                        "bucket": key,
+                        "fy": fy,
+                        "invoice_count": 0,
+                        "revenue": 0.0,
+                    },
+                )
+                bucket["invoice_count"] += 1
+                bucket["revenue"] += revenue
+
+        stale = [
+            doc.reference
+            for doc in collection.select(["granularity"]).stream()
+            if doc.id not in buckets
+        ]
+
+        batch = self.db.batch()
+        pending = 0
+
+        def staged():
+            nonlocal batch, pending
+            pending += 1
+            if pending == BATCH_LIMIT:
+                batch.commit()
+                batch = self.db.batch()
+                pending = 0
+
+        # Overwrite first, delete stale buckets last
+        for doc_id, data in buckets.items():
+            batch.set(
+                collection.document(doc_id),
+                {**data, "updated_at": firestore.SERVER_TIMESTAMP},
+            )
+            staged()
+        for reference in stale:
+            batch.delete(reference)
+            staged()
+        if pending:
+            batch.commit()
+
+        get_stats_ref(self.db).set({ROLLUPS_SEEDED_FIELD: True}, merge=True)
+
+        logger.info(
+            f"Rollups rebuilt from {scanned} invoices: {len(buckets)} buckets, "
+            f"{len(stale)} stale buckets removed"
+        )
+        return scanned
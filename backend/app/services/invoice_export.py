@@ -0,0 +1,162 @@
+"""
+Bulk export of invoice PDFs as a single streamed ZIP archive.
+
+Invoices are fetched page by page, rendered in parallel through the PDF
+worker pool (reusing the PDF cache) and written into the archive in invoice
+order as soon as each one is ready. Only a small window of PDFs is held in
+memory at any time, and the first bytes reach the client while later
+invoices are still rendering.
+"""
+
+import asyncio
+import logging
+import re
+import zipfile
+from collections import deque
+from datetime import datetime
+
+from starlette.concurrency import run_in_threadpool
+
+from app.services.pdf_cache import get_pdf_cache, pdf_cache_key
+from app.services.pdf_pool import PdfRenderOverloaded, get_pdf_render_pool
+from app.services.pdf_service import get_pdf_renderer
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PAGE_SIZE = 100
+# Seconds to wait before retrying a render the pool rejected as overloaded
+OVERLOAD_RETRY_DELAY = 0.5
+
+
+class _ZipSink:
+    """Write-only, non-seekable file object that buffers ZIP output chunks."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def export_filename(invoice_data: dict) -> str:
+    """File name of an invoice inside the archive, e.g. INV-25-26-0001.pdf."""
+    number = invoice_data.get("invoice_number") or invoice_data.get("id") or "invoice"
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", str(number)) + ".pdf"
+
+
+async def _render_invoice(invoice_data: dict) -> bytes:
+    pdf_cache = get_pdf_cache()
+    cache_key = pdf_cache_key(invoice_data, get_pdf_renderer().fingerprint())
+
+    pdf_bytes = await run_in_threadpool(pdf_cache.get, cache_key)
+    if pdf_bytes is not None:
+        return pdf_bytes
+
+    pool = get_pdf_render_pool()
+    while True:
+        try:
+            pdf_bytes, _ = await pool.render(invoice_data)
+            break
+        except PdfRenderOverloaded:
+            # Interactive requests share the pool; back off instead of failing
+            await asyncio.sleep(OVERLOAD_RETRY_DELAY)
+
+    await run_in_threadpool(
+        pdf_cache.put, cache_key, invoice_data.get("id", ""), pdf_bytes
+    )
+    return pdf_bytes
+
+
+async def stream_invoice_pdf_zip(invoice_service, date_from: str, date_to: str):
+    """
+    Yield a ZIP archive of the PDFs of every invoice dated in a range.
+
+    Args:
+        invoice_service: InvoiceService used to page through the invoices
+        date_from: First invoice_date to include (YYYY-MM-DD)
+        date_to: Last invoice_date to include (YYYY-MM-DD)
+
+    Yields:
+        bytes: Consecutive chunks of the ZIP archive
+    """
+    pool = get_pdf_render_pool()
+    window = max(2, pool.workers * 2)
+
+    sink = _ZipSink()
+    in_flight = deque()
+    failures = []
+    exported = 0
+
+    def write_entry(zip_file, invoice_data, pdf_bytes):
+        info = zipfile.ZipInfo(
+            export_filename(invoice_data), date_time=datetime.now().timetuple()[:6]
+        )
+        # PDFs are already compressed internally
+        info.compress_type = zipfile.ZIP_STORED
+        zip_file.writestr(info, pdf_bytes)
+
+    async def finish_oldest(zip_file):
+        nonlocal exported
+        invoice_data, task = in_flight.popleft()
+        try:
+            pdf_bytes = await task
+        except Exception as e:
+            logger.error(f"Export: failed to render {invoice_data.get('id')}: {str(e)}")
+            failures.append(f"{export_filename(invoice_data)}: {str(e)}")
+            return
+        write_entry(zip_file, invoice_data, pdf_bytes)
+        exported += 1
+
+    with zipfile.ZipFile(sink, mode="w") as zip_file:
+        try:
+            after = None
+            while True:
+                page = await run_in_threadpool(
+                    invoice_service.list_invoices_by_date,
+                    date_from,
+                    date_to,
+                    EXPORT_PAGE_SIZE,
+                    after,
+                )
+
+                for invoice_data in page["invoices"]:
+                    task = asyncio.ensure_future(_render_invoice(invoice_data))
+                    in_flight.append((invoice_data, task))
+                    if len(in_flight) >= window:
+                        await finish_oldest(zip_file)
+                        yield sink.drain()
+
+                after = page["next_cursor"]
+                if not after:
+                    break
+
+            while in_flight:
+                await finish_oldest(zip_file)
+                yield sink.drain()
+
+            if failures:
+                zip_file.writestr("export_errors.txt", "\n".join(failures) + "\n")
+        finally:
+            # Client went away or paging failed: stop outstanding renders
+            for _, task in in_flight:
+                task.cancel()
+
+    logger.info(
+        f"Exported {exported} invoice PDFs ({len(failures)} failed) "
+        f"for {date_from}..{date_to}"
+    )
+    yield sink.drain()
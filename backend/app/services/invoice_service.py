@@ -1,15 +1,101 @@
 from datetime import timezone
+from functools import cached_property
 import logging
-from app.core.firebase import get_firestore
-from app.utils.invoice_utils import get_current_financial_year, format_invoice_number
-from google.cloud import firestore
+from app.core.firebase import get_firestore, get_firestore_async
+from app.utils.invoice_utils import (
+    get_current_financial_year,
+    format_invoice_number,
+    parse_invoice_date,
+)
+from app.utils.pagination import clamp_page_size, encode_cursor, decode_cursor
+from app.utils.exceptions import NotFoundError
+from app.services.stats_service import (
+    ensure_stats_seeded,
+    record_invoice_change,
+)
+from app.services.rollup_service import invoice_buckets
+from app.services.invoice_counter import BATCH_LIMIT, get_invoice_number_allocator
+from app.services.master_data_replica import get_master_data_replica
+from app.storage import transactional
 
 logger = logging.getLogger(__name__)
 
+# Fields needed by the invoice list view. meta.created_at is always kept so
+# the pagination cursor can be built from a projected document.
+INVOICE_SUMMARY_FIELDS = [
+    "id",
+    "invoice_number",
+    "invoice_date",
+    "po_number",
+    "buyer.name",
+    "consignee.name",
+    "totals.total",
+    "totals.rounded_total",
+    "meta.created_at",
+]
+
+# Top-level invoice fields that may be requested through a projection
+INVOICE_FIELDS = {
+    "id",
+    "invoice_number",
+    "invoice_date",
+    "po_number",
+    "buyer",
+    "consignee",
+    "items",
+    "totals",
+    "meta",
+}
+
+# Firestore limit on writes per batch commit
+def _staged_writes(invoice_docs: list) -> int:
+    """Writes staged by creating invoice_docs: the invoices and their rollup buckets."""
+    buckets = {
+        (granularity, key)
+        for invoice_doc in invoice_docs
+        for granularity, key, _ in invoice_buckets(invoice_doc)
+    }
+    return len(invoice_docs) + len(buckets)
+
+
+def _chunk_for_batch(docs: list):
+    """
+    Split (ref, invoice_doc) pairs into chunks whose counter transaction,
+    including the counter, the stats document and every rollup bucket it
+    touches, stays within BATCH_LIMIT writes.
+    """
+    chunk = []
+    buckets = set()
+    for invoice_ref, invoice_doc in docs:
+        doc_buckets = {
+            (granularity, key) for granularity, key, _ in invoice_buckets(invoice_doc)
+        }
+        merged = buckets | doc_buckets
+        # invoices + counter + stats document + rollup buckets
+        if chunk and len(chunk) + 1 + 1 + 1 + len(merged) > BATCH_LIMIT:
+            yield chunk
+            chunk = []
+            merged = doc_buckets
+        chunk.append((invoice_ref, invoice_doc))
+        buckets = merged
+    if chunk:
+        yield chunk
+
 
 class InvoiceService:
-    def __init__(self):
-        self.db = get_firestore()
+    # Clients are created on first use, so importing the routers (and
+    # serving /health on a cold start) does not initialize Firebase
+    @cached_property
+    def db(self):
+        return get_firestore()
+
+    @cached_property
+    def async_db(self):
+        return get_firestore_async()
+
+    @cached_property
+    def counter(self):
+        return get_invoice_number_allocator(self.db)
 
     def get_invoice_number_preview(self) -> dict:
         """
@@ -24,52 +110,81 @@ class InvoiceService:
             Exception: If unable to generate invoice number
         """
         try:
-            current_fy = get_current_financial_year()
-            count_ref = self.db.collection("Count").document("count")
+            return self._preview_from_counter(self._read_counter())
+        except Exception as e:
+            logger.error(f"Error generating invoice number: {str(e)}")
+            raise Exception(f"Failed to generate invoice number: {str(e)}")
 
-            # Read current document (no update)
-            doc = count_ref.get()
+    async def get_invoice_number_preview_async(self) -> dict:
+        """get_invoice_number_preview on the async client."""
+        try:
+            return self._preview_from_counter(await self._read_counter_async())
+        except Exception as e:
+            logger.error(f"Error generating invoice number: {str(e)}")
+            raise Exception(f"Failed to generate invoice number: {str(e)}")
 
-            if not doc.exists:
-                # Document doesn't exist, start from 1
-                inv_no = 1
-                fy = current_fy
+    def _preview_from_counter(self, data: dict | None) -> dict:
+        current_fy = get_current_financial_year()
+
+        if data is None:
+            # Document doesn't exist, start from 1
+            inv_no = 1
+            fy = current_fy
+        else:
+            # Document exists, check financial year
+            stored_fy = data.get("fy")
+            inv_no = data.get("inv_no", 0)
+
+            if stored_fy == current_fy:
+                # Same FY, show next number (without updating)
+                inv_no += 1
             else:
-                # Document exists, convert to dict and check financial year
-                data = doc.to_dict() or {}
-                stored_fy = data.get("fy")
-                inv_no = data.get("inv_no", 0)
+                # Different FY, show 1
+                inv_no = 1
 
-                if stored_fy == current_fy:
-                    # Same FY, show next number (without updating)
-                    inv_no += 1
-                else:
-                    # Different FY, show 1
-                    inv_no = 1
+            fy = current_fy
 
-                fy = current_fy
+        # Format and return invoice number
+        invoice_number = format_invoice_number(inv_no, fy)
 
-            # Format and return invoice number
-            invoice_number = format_invoice_number(inv_no, fy)
+        logger.info(f"Generated preview invoice number: {invoice_number} for FY: {fy}")
 
-            logger.info(
-                f"Generated preview invoice number: {invoice_number} for FY: {fy}"
-            )
-
-            return {
-                "invoice_number": invoice_number,
-                "financial_year": fy,
-                "sequence_number": inv_no,
-            }
+        return {
+            "invoice_number": invoice_number,
+            "financial_year": fy,
+            "sequence_number": inv_no,
+        }
 
-        except Exception as e:
-            logger.error(f"Error generating invoice number: {str(e)}")
-            raise Exception(f"Failed to generate invoice number: {str(e)}")
+    def _read_counter(self) -> dict | None:
+        """
+        Current Count/count data (None if missing), from the listener
+        replica when it is enabled and synced, otherwise from Firestore.
+        """
+        replica = get_master_data_replica()
+        if replica is not None and replica.is_ready("Count"):
+            return replica.get_counter()
+
+        # Read current document (no update)
+        doc = self.db.collection("Count").document("count").get()
+        if not doc.exists:
+            return None
+        return doc.to_dict() or {}
+
+    async def _read_counter_async(self) -> dict | None:
+        replica = get_master_data_replica()
+        if replica is not None and replica.is_ready("Count"):
+            return replica.get_counter()
+
+        doc = await self.async_db.collection("Count").document("count").get()
+        if not doc.exists:
+            return None
+        return doc.to_dict() or {}
 
     def increment_invoice_counter(self) -> dict:
         """
         Increment the invoice counter in Firebase when an invoice is actually created.
-        Uses Firestore transaction for thread-safe concurrent operations.
+        Uses the commit-batched allocator, which runs one Firestore transaction
+        for all requests arriving together.
 
         Returns:
             dict: Contains the saved invoice_number, financial_year, and sequence_number
@@ -78,44 +193,8 @@ class InvoiceService:
             Exception: If unable to increment counter
         """
         try:
-            current_fy = get_current_financial_year()
-            count_ref = self.db.collection("Count").document("count")
-
-            # Define and execute transaction function
-            transaction = self.db.transaction()
-
-            @firestore.transactional
-            def update_in_transaction(transaction):
-                # Read current document using transaction
-                doc = count_ref.get(transaction=transaction)
-
-                if not doc.exists:
-                    # Document doesn't exist, create it with inv_no = 1
-                    initial_data = {"inv_no": 1, "fy": current_fy}
-                    transaction.set(count_ref, initial_data)
-                    inv_no = 1
-                    fy = current_fy
-                else:
-                    # Document exists, convert to dict and check financial year
-                    data = doc.to_dict() or {}
-                    stored_fy = data.get("fy")
-                    inv_no = data.get("inv_no", 0)
-
-                    if stored_fy == current_fy:
-                        # Same FY, increment invoice number
-                        inv_no += 1
-                    else:
-                        # Different FY, reset to 1
-                        inv_no = 1
-
-                    # Update the document
-                    transaction.update(count_ref, {"inv_no": inv_no, "fy": current_fy})
-                    fy = current_fy
-
-                return inv_no, fy
-
-            # Execute transaction
-            inv_no, fy = update_in_transaction(transaction)
+            # Reserve the next number through the commit-batched allocator
+            inv_no, fy = self.counter.allocate()
 
             # Format and return invoice number
             invoice_number = format_invoice_number(inv_no, fy)
@@ -135,7 +214,8 @@ class InvoiceService:
     def create_invoice(self, invoice_data: dict) -> dict:
         """
         Create a new invoice and save it to Firestore.
-        Also increments the invoice counter.
+        The invoice counter bump, the invoice document and the dashboard
+        stats/rollups are committed in a single transaction.
 
         Args:
             invoice_data: Invoice data containing buyer, consignee, items, totals
@@ -150,71 +230,506 @@ class InvoiceService:
             from datetime import datetime
             import uuid
 
+            ensure_stats_seeded(self.db)
+
             # Generate invoice ID and number
             # invoice_id = (
             #     f"inv_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
             # )
 
-            # Get and increment invoice counter
-            current_fy = get_current_financial_year()
-            count_ref = self.db.collection("Count").document("count")
+            invoice_ref = self.db.collection("invoices").document()
+            # The number is filled in once the counter transaction reserves it
+            draft = self._build_invoice_doc(
+                invoice_ref.id, None, invoice_data, datetime.now(timezone.utc)
+            )
+            created = {}
+
+            def write_invoice(transaction, inv_no, fy):
+                # Runs inside the counter transaction (possibly more than once
+                # on retry), so the number is only consumed if the invoice,
+                # stats and rollups are committed with it
+                invoice_number = format_invoice_number(inv_no, fy)
+                invoice_doc = {**draft, "invoice_number": invoice_number}
+                transaction.set(invoice_ref, invoice_doc)
+                created["invoice"] = invoice_doc
+                # The allocator applies the stats and rollup deltas of the
+                # whole batch at once
+                return [(None, invoice_doc)]
+
+            # Reserve the invoice number and write the invoice in one
+            # transaction; concurrent creates share it through the allocator
+            self.counter.allocate(write=write_invoice, writes=_staged_writes([draft]))
+
+            invoice_doc = created["invoice"]
+
+            logger.info(
+                f"Invoice created: {invoice_doc['invoice_number']} with ID: {invoice_ref.id}"
+            )
+
+            return invoice_doc
+
+        except Exception as e:
+            logger.error(f"Error creating invoice: {str(e)}")
+            raise Exception(f"Failed to create invoice: {str(e)}")
+
+    def _build_invoice_doc(
+        self, invoice_id: str, invoice_number: str, invoice_data: dict, created_at
+    ) -> dict:
+        """Prepare the Firestore document of a new invoice."""
+        return {
+            "id": invoice_id,
+            "invoice_number": invoice_number,
+            "invoice_date": invoice_data.get("invoice_date"),
+            "po_number": invoice_data.get("po_number", ""),
+            "buyer": invoice_data.get("buyer", {}),
+            "consignee": invoice_data.get("consignee", {}),
+            "items": invoice_data.get("items", []),
+            "totals": invoice_data.get("totals", {}),
+            "meta": {
+                "created_at": created_at,
+                "updated_at": None,
+            },
+        }
+
+    def create_invoices_bulk(self, invoices_data: list) -> list:
+        """
+        Create many invoices at once (imports and migrations).
 
-            # Define and execute transaction function for creating invoice
+        The invoices are written in chunks, each committed in its own counter
+        transaction through the allocator: the chunk reserves a contiguous
+        range of invoice numbers and writes its invoices with their combined
+        dashboard stats and rollup deltas in the same commit. Numbers follow
+        the order of invoices_data.
+
+        If a chunk fails, its invoices are reported as failed and the counter
+        is not advanced for them, so the invoice series stays gap-free; the
+        other chunks are unaffected.
+
+        Args:
+            invoices_data: Validated invoice payloads
+
+        Returns:
+            list: One result per input row with success, id, invoice_number
+            or error
+
+        Raises:
+            Exception: If the dashboard stats cannot be seeded
+        """
+        if not invoices_data:
+            return []
+
+        from datetime import datetime
+
+        try:
+            ensure_stats_seeded(self.db)
+        except Exception as e:
+            logger.error(f"Error preparing dashboard stats for bulk create: {str(e)}")
+            raise Exception(f"Failed to create invoices: {str(e)}")
+
+        created_at = datetime.now(timezone.utc)
+        collection = self.db.collection("invoices")
+        # Numbers are filled in when each chunk reserves its range; the
+        # rollup buckets (and so the chunking) do not depend on them
+        docs = []
+        for invoice_data in invoices_data:
+            invoice_ref = collection.document()
+            invoice_doc = self._build_invoice_doc(
+                invoice_ref.id, None, invoice_data, created_at
+            )
+            docs.append((invoice_ref, invoice_doc))
+
+        results = []
+        fy = None
+        for chunk in _chunk_for_batch(docs):
+            written = {}
+
+            def write_chunk(transaction, start, chunk_fy, chunk=chunk, written=written):
+                # May run again on retry; rebuild everything from the arguments
+                written.clear()
+                for offset, (invoice_ref, invoice_doc) in enumerate(chunk):
+                    invoice_number = format_invoice_number(start + offset, chunk_fy)
+                    transaction.set(
+                        invoice_ref, {**invoice_doc, "invoice_number": invoice_number}
+                    )
+                    written[invoice_ref.id] = invoice_number
+                return [(None, doc) for _, doc in chunk]
+
+            try:
+                _, fy = self.counter.allocate(
+                    count=len(chunk),
+                    write=write_chunk,
+                    writes=_staged_writes([doc for _, doc in chunk]),
+                )
+                error = None
+            except Exception as e:
+                logger.error(f"Bulk invoice chunk of {len(chunk)} failed: {str(e)}")
+                error = str(e)
+
+            for invoice_ref, _ in chunk:
+                results.append(
+                    {
+                        "success": error is None,
+                        "id": invoice_ref.id if error is None else None,
+                        "invoice_number": (
+                            written[invoice_ref.id] if error is None else None
+                        ),
+                        "error": error,
+                    }
+                )
+
+        created = sum(1 for result in results if result["success"])
+        logger.info(f"Bulk created {created}/{len(invoices_data)} invoices for FY {fy}")
+
+        return results
+
+    def update_invoice(self, invoice_id: str, invoice_data: dict) -> dict:
+        """
+        Update an existing invoice and the dashboard stats in one transaction.
+
+        Args:
+            invoice_id: The invoice document ID
+            invoice_data: Updated invoice fields
+
+        Returns:
+            dict: The invoice document after the update
+
+        Raises:
+            NotFoundError: If the invoice does not exist
+            Exception: If unable to update invoice
+        """
+        try:
+            from datetime import datetime
+
+            ensure_stats_seeded(self.db)
+            invoice_ref = self.db.collection("invoices").document(invoice_id)
             transaction = self.db.transaction()
 
-            @firestore.transactional
+            @transactional
             def update_in_transaction(transaction):
-                doc = count_ref.get(transaction=transaction)
+                invoice_doc = invoice_ref.get(transaction=transaction)
+                if not invoice_doc.exists:
+                    raise NotFoundError("Invoice not found")
+
+                old_invoice = invoice_doc.to_dict()
+                update_data = {
+                    **invoice_data,
+                    "meta": {
+                        "created_at": old_invoice.get("meta", {}).get("created_at"),
+                        "updated_at": datetime.now(timezone.utc),
+                    },
+                }
+                new_invoice = {**old_invoice, **update_data}
+
+                transaction.update(invoice_ref, update_data)
+                record_invoice_change(
+                    transaction, self.db, old_invoice=old_invoice, new_invoice=new_invoice
+                )
+                return new_invoice
+
+            new_invoice = update_in_transaction(transaction)
+
+            logger.info(f"Invoice updated: {invoice_id}")
+
+            return new_invoice
+
+        except NotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"Error updating invoice: {str(e)}")
+            raise Exception(f"Failed to update invoice: {str(e)}")
 
-                if not doc.exists:
-                    initial_data = {"inv_no": 1, "fy": current_fy}
-                    transaction.set(count_ref, initial_data)
-                    inv_no = 1
-                else:
-                    data = doc.to_dict() or {}
-                    stored_fy = data.get("fy")
-                    inv_no = data.get("inv_no", 0)
+    def delete_invoice(self, invoice_id: str) -> None:
+        """
+        Delete an invoice and remove it from the dashboard stats in one transaction.
 
-                    if stored_fy == current_fy:
-                        inv_no += 1
-                    else:
-                        inv_no = 1
+        Args:
+            invoice_id: The invoice document ID
 
-                    transaction.update(count_ref, {"inv_no": inv_no, "fy": current_fy})
+        Raises:
+            NotFoundError: If the invoice does not exist
+            Exception: If unable to delete invoice
+        """
+        try:
+            ensure_stats_seeded(self.db)
+            invoice_ref = self.db.collection("invoices").document(invoice_id)
+            transaction = self.db.transaction()
 
-                return inv_no
+            @transactional
+            def delete_in_transaction(transaction):
+                invoice_doc = invoice_ref.get(transaction=transaction)
+                if not invoice_doc.exists:
+                    raise NotFoundError("Invoice not found")
 
-            # Execute transaction to get next invoice number
-            inv_no = update_in_transaction(transaction)
+                transaction.delete(invoice_ref)
+                record_invoice_change(
+                    transaction, self.db, old_invoice=invoice_doc.to_dict()
+                )
 
-            # Format invoice number
-            invoice_number = format_invoice_number(inv_no, current_fy)
+            delete_in_transaction(transaction)
 
-            # Save to Firestore
-            invoice_id = self.db.collection("invoices").document()
-            # Prepare invoice document
-            invoice_doc = {
-                "id": invoice_id.id,
-                "invoice_number": invoice_number,
-                "invoice_date": invoice_data.get("invoice_date"),
-                "po_number": invoice_data.get("po_number", ""),
-                "buyer": invoice_data.get("buyer", {}),
-                "consignee": invoice_data.get("consignee", {}),
-                "items": invoice_data.get("items", []),
-                "totals": invoice_data.get("totals", {}),
-                "meta": {
-                    "created_at": datetime.now(timezone.utc),
-                    "updated_at": None,
-                },
-            }
+            logger.info(f"Invoice deleted: {invoice_id}")
 
-            # Save the invoice document
-            invoice_id.set(invoice_doc)
+        except NotFoundError:
+            raise
+        except Exception as e:
+            logger.error(f"Error deleting invoice: {str(e)}")
+            raise Exception(f"Failed to delete invoice: {str(e)}")
 
-            logger.info(f"Invoice created: {invoice_number} with ID: {invoice_id.id}")
+    def resolve_invoice_fields(
+        self, view: str | None = None, fields: str | None = None
+    ) -> list | None:
+        """
+        Work out the Firestore projection for an invoice listing.
 
-            return invoice_doc
+        Args:
+            view: "summary" for the list-view fields, "full" or None for everything
+            fields: Comma separated field paths (e.g. "invoice_number,buyer.name")
 
-        except Exception as e:
-            logger.error(f"Error creating invoice: {str(e)}")
-            raise Exception(f"Failed to create invoice: {str(e)}")
+        Returns:
+            list | None: Field paths to select, or None for full documents
+
+        Raises:
+            ValueError: If an unknown field is requested
+        """
+        if fields:
+            selected = [f.strip() for f in fields.split(",") if f.strip()]
+            unknown = [f for f in selected if f.split(".")[0] not in INVOICE_FIELDS]
+            if unknown:
+                raise ValueError(f"Unknown invoice fields: {', '.join(unknown)}")
+            for required in ("id", "meta.created_at"):
+                if required not in selected:
+                    selected.append(required)
+            return selected
+
+        if view == "summary":
+            return list(INVOICE_SUMMARY_FIELDS)
+
+        return None
+
+    def build_invoice_filters(
+        self,
+        buyer_id: str | None = None,
+        buyer_gstin: str | None = None,
+        po_number: str | None = None,
+        number_prefix: str | None = None,
+        date_from: str | None = None,
+        date_to: str | None = None,
+        total_min: float | None = None,
+        total_max: float | None = None,
+    ) -> list:
+        """
+        Validate invoice listing filters and turn them into query clauses.
+
+        Any number of the equality filters (buyer, GSTIN, PO number) can be
+        combined, but Firestore only allows a range on one field per query, so
+        at most one of the invoice-number prefix, the invoice_date range and
+        the total range may be given. The range field also becomes the sort
+        order of the listing. firestore.indexes.json has a composite index
+        for every combination accepted here; keep the two in step.
+
+        Returns:
+            list: (field path, operator, value) clauses
+
+        Raises:
+            ValueError: If a filter is malformed or two range filters are given
+        """
+        clauses = []
+        for field, value in (
+            ("buyer.id", buyer_id),
+            ("buyer.gstin", buyer_gstin),
+            ("po_number", po_number),
+        ):
+            if value is not None and value.strip():
+                clauses.append((field, "==", value.strip()))
+
+        ranges = []
+        if number_prefix:
+            ranges.append("invoice number prefix")
+            # Every string starting with the prefix sorts below prefix + U+F8FF
+            clauses.append(("invoice_number", ">=", number_prefix))
+            clauses.append(("invoice_number", "<=", number_prefix + "\uf8ff"))
+        if date_from or date_to:
+            ranges.append("invoice date")
+            for op, value in ((">=", date_from), ("<=", date_to)):
+                if value:
+                    parsed = parse_invoice_date(value)
+                    if parsed is None:
+                        raise ValueError(
+                            f"Invalid date {value!r}, expected YYYY-MM-DD"
+                        )
+                    clauses.append(("invoice_date", op, parsed.isoformat()))
+        if total_min is not None or total_max is not None:
+            ranges.append("total")
+            if total_min is not None and total_max is not None:
+                if total_min > total_max:
+                    raise ValueError("total_min must not be greater than total_max")
+            for op, value in ((">=", total_min), ("<=", total_max)):
+                if value is not None:
+                    clauses.append(("totals.total", op, value))
+
+        if len(ranges) > 1:
+            raise ValueError(
+                "Only one range filter can be used at a time "
+                f"(got {' and '.join(ranges)})"
+            )
+        return clauses
+
+    def list_invoices(
+        self,
+        limit: int,
+        after: str | None = None,
+        fields: list | None = None,
+        filters: list | None = None,
+    ) -> dict:
+        """
+        Fetch one page of invoices using keyset pagination.
+
+        Without a range filter invoices are ordered newest first by
+        meta.created_at; with one (see build_invoice_filters) they are ordered
+        by that field, descending. Document ID is the tie-breaker, so each page
+        is a bounded range read over the matching invoices only, whatever the
+        size of the collection. Filtered orderings are served by the
+        composite indexes in firestore.indexes.json.
+
+        Args:
+            limit: Maximum number of invoices to return (clamped to
+                1..MAX_PAGE_SIZE)
+            after: Opaque cursor returned as next_cursor by the previous page
+            fields: Optional field paths to project with select(); line items
+                and other unselected fields are never transferred
+            filters: Clauses from build_invoice_filters
+
+        Returns:
+            dict: Contains invoices, next_cursor and has_more
+
+        Raises:
+            ValueError: If the cursor is malformed or from another ordering
+        """
+        limit = clamp_page_size(limit)
+        query, order_field = self._invoice_list_query(
+            self.db, limit, after, fields, filters
+        )
+        docs = list(query.stream())
+        return self._invoice_page(docs, limit, order_field)
+
+    async def list_invoices_async(
+        self,
+        limit: int,
+        after: str | None = None,
+        fields: list | None = None,
+        filters: list | None = None,
+    ) -> dict:
+        """list_invoices on the async client."""
+        limit = clamp_page_size(limit)
+        query, order_field = self._invoice_list_query(
+            self.async_db, limit, after, fields, filters
+        )
+        docs = [doc async for doc in query.stream()]
+        return self._invoice_page(docs, limit, order_field)
+
+    def _invoice_list_query(self, db, limit, after, fields, filters) -> tuple:
+        """Build the page query (sync or async client) and its order field."""
+        from google.cloud import firestore
+        from google.cloud.firestore_v1.field_path import FieldPath
+
+        filters = filters or []
+        range_fields = [field for field, op, _ in filters if op != "=="]
+        order_field = range_fields[0] if range_fields else "meta.created_at"
+
+        query = db.collection("invoices")
+        for field, op, value in filters:
+            query = query.where(field, op, value)
+        query = query.order_by(
+            order_field, direction=firestore.Query.DESCENDING
+        ).order_by(
+            FieldPath.document_id(),
+            direction=firestore.Query.DESCENDING,
+        )
+
+        if after:
+            values, doc_id = decode_cursor(after, order=order_field)
+            if len(values) != 1:
+                raise ValueError("Invalid pagination cursor")
+            query = query.start_after({order_field: values[0], "__name__": doc_id})
+
+        if fields:
+            if order_field not in fields:
+                # Needed to build the next cursor
+                fields = [*fields, order_field]
+            query = query.select(fields)
+
+        # Fetch one extra document to know whether another page exists
+        return query.limit(limit + 1), order_field
+
+    def _invoice_page(self, docs: list, limit: int, order_field: str) -> dict:
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+
+        next_cursor = None
+        if has_more and docs:
+            last = docs[-1]
+            next_cursor = encode_cursor(
+                [last.get(order_field)], last.id, order=order_field
+            )
+
+        return {
+            "invoices": [doc.to_dict() for doc in docs],
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }
+
+    def list_invoices_by_date(
+        self,
+        date_from: str,
+        date_to: str,
+        limit: int,
+        after: str | None = None,
+    ) -> dict:
+        """
+        Fetch one page of invoices whose invoice_date falls in a range,
+        oldest first, using keyset pagination.
+
+        Args:
+            date_from: First invoice_date to include (YYYY-MM-DD)
+            date_to: Last invoice_date to include (YYYY-MM-DD)
+            limit: Maximum number of invoices to return (clamped to
+                1..MAX_PAGE_SIZE)
+            after: Opaque cursor returned as next_cursor by the previous page
+
+        Returns:
+            dict: Contains invoices, next_cursor and has_more
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        from google.cloud.firestore_v1.field_path import FieldPath
+
+        limit = clamp_page_size(limit)
+        query = (
+            self.db.collection("invoices")
+            .where("invoice_date", ">=", date_from)
+            .where("invoice_date", "<=", date_to)
+            .order_by("invoice_date")
+            .order_by(FieldPath.document_id())
+        )
+
+        if after:
+            values, doc_id = decode_cursor(after)
+            if len(values) != 1:
+                raise ValueError("Invalid pagination cursor")
+            query = query.start_after({"invoice_date": values[0], "__name__": doc_id})
+
+        docs = list(query.limit(limit + 1).stream())
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+
+        next_cursor = None
+        if has_more and docs:
+            last = docs[-1]
+            next_cursor = encode_cursor([last.get("invoice_date")], last.id)
+
+        return {
+            "invoices": [doc.to_dict() for doc in docs],
+            "next_cursor": next_cursor,
+            "has_more": has_more,
+        }
@@ -0,0 +1,172 @@
+"""
+Listener-backed in-process replica of the master data.
+
+When MASTER_DATA_REPLICA=true, Firestore on_snapshot listeners are attached
+to the customers and items collections and to the Count/count document at
+start-up. The listeners keep a local copy that is updated from the change
+stream (typically within a second of a write on any instance), so customer
+and item reads and the invoice number preview are served without any
+Firestore RPC. Until the first snapshot of a collection arrives, or when the
+mode is off, callers fall back to their normal read path.
+"""
+
+import logging
+import os
+import threading
+
+from app.storage import get_storage_backend
+
+logger = logging.getLogger(__name__)
+
+REPLICATED_COLLECTIONS = ("customers", "items")
+
+
+class MasterDataReplica:
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._documents = {name: {} for name in REPLICATED_COLLECTIONS}
+        # Sorted active lists, rebuilt lazily after a change
+        self._active = {}
+        self._ready = {name: threading.Event() for name in REPLICATED_COLLECTIONS}
+        self._counter = None
+        self._counter_ready = threading.Event()
+        self._watches = []
+        self._listeners = []
+
+    def start(self) -> None:
+        """Attach the snapshot listeners (each runs on its own thread)."""
+        for name in REPLICATED_COLLECTIONS:
+            self._watches.append(
+                self.db.collection(name).on_snapshot(self._collection_callback(name))
+            )
+        self._watches.append(
+            self.db.collection("Count").document("count").on_snapshot(self._on_counter)
+        )
+        logger.info("Master data replica listeners attached")
+
+    def stop(self) -> None:
+        for watch in self._watches:
+            watch.unsubscribe()
+        self._watches = []
+
+    def add_listener(self, callback) -> None:
+        """
+        Register callback(collection_name, doc_id, data) for every change
+        applied to the replica; data is None when a document is removed.
+        """
+        self._listeners.append(callback)
+
+    def _collection_callback(self, name: str):
+        def on_snapshot(docs, changes, read_time):
+            applied = []
+            with self._lock:
+                documents = self._documents[name]
+                for change in changes:
+                    doc = change.document
+                    if change.type.name == "REMOVED":
+                        documents.pop(doc.id, None)
+                        applied.append((doc.id, None))
+                    else:
+                        data = doc.to_dict() or {}
+                        documents[doc.id] = data
+                        applied.append((doc.id, data))
+                self._active.pop(name, None)
+            self._ready[name].set()
+
+            for doc_id, data in applied:
+                for listener in self._listeners:
+                    try:
+                        listener(name, doc_id, data)
+                    except Exception as e:
+                        logger.error(f"Replica listener failed: {str(e)}")
+
+        return on_snapshot
+
+    def _on_counter(self, docs, changes, read_time):
+        with self._lock:
+            self._counter = None
+            for doc in docs:
+                if doc.exists:
+                    self._counter = doc.to_dict() or {}
+        self._counter_ready.set()
+
+    def is_ready(self, name: str) -> bool:
+        """True once the first snapshot of a collection (or "Count") arrived."""
+        if name == "Count":
+            return self._counter_ready.is_set()
+        return self._ready[name].is_set()
+
+    def list_active(self, name: str, id_field: str) -> list:
+        """
+        Active documents of a collection, newest first, each with its ID
+        under id_field (same shape as the Firestore list endpoints).
+        """
+        with self._lock:
+            active = self._active.get(name)
+            if active is None:
+                active = [
+                    {**data, id_field: doc_id}
+                    for doc_id, data in self._documents[name].items()
+                    if data.get("is_active") is True
+                ]
+                active.sort(key=lambda data: _created_at_sort_key(data), reverse=True)
+                self._active[name] = active
+            return [dict(data) for data in active]
+
+    def get(self, name: str, doc_id: str) -> dict | None:
+        """A document of a collection with its ID under "id", or None."""
+        with self._lock:
+            data = self._documents[name].get(doc_id)
+            if data is None:
+                return None
+            return {**data, "id": doc_id}
+
+    def get_counter(self) -> dict | None:
+        """Current Count/count data, or None if the document does not exist."""
+        with self._lock:
+            return dict(self._counter) if self._counter is not None else None
+
+
+def _created_at_sort_key(data: dict):
+    created_at = data.get("created_at")
+    return (created_at is not None, created_at.timestamp() if created_at else 0)
+
+
+_replica = None
+_replica_lock = threading.Lock()
+
+
+def replica_enabled() -> bool:
+    # Snapshot listeners only exist on Firestore; the local stores are
+    # already in-process
+    return (
+        os.getenv("MASTER_DATA_REPLICA", "false").lower() == "true"
+        and get_storage_backend() == "firestore"
+    )
+
+
+def get_master_data_replica() -> MasterDataReplica | None:
+    """
+    Return the process-wide replica, starting it on first use, or None when
+    MASTER_DATA_REPLICA is not enabled.
+    """
+    global _replica
+
+    if not replica_enabled():
+        return None
+
+    if _replica is None:
+        with _replica_lock:
+            if _replica is None:
+                from app.core.firebase import get_firestore
+
+                replica = MasterDataReplica(get_firestore())
+                replica.start()
+                _replica = replica
+    return _replica
+
+
+def stop_master_data_replica() -> None:
+    if _replica is not None:
+        _replica.stop()
@@ -0,0 +1,290 @@
+"""
+Content-addressed cache of generated invoice PDFs.
+
+A PDF is keyed by a SHA-256 of the invoice document plus the template and
+stylesheet sources, so a key always identifies exactly one rendering. PDFs
+are kept in a size-bounded in-memory LRU and, when PDF_CACHE_DIR is set, in
+an on-disk tier that survives restarts and is shared by worker processes.
+
+The disk tier has its own budget (PDF_CACHE_DISK_MAX_MB). Reads refresh a
+file's mtime, and once the files outgrow the budget the least recently used
+are removed. Keys start with the template fingerprint, so PDFs rendered from
+an older template are removed when the cache is created.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_DISK_MAX_BYTES = 512 * 1024 * 1024
+
+# Pruning frees this much more than needed, so it does not rescan the
+# directory on every write
+DISK_PRUNE_TARGET = 0.9
+
+# Leading hex digits of the template fingerprint kept in a key
+FINGERPRINT_PREFIX = 16
+
+
+def pdf_cache_key(invoice_data: dict, render_fingerprint: str) -> str:
+    """
+    Build the cache key of an invoice PDF.
+
+    Args:
+        invoice_data: Invoice document as stored in Firestore
+        render_fingerprint: Hash of the template and stylesheet sources
+
+    Returns:
+        str: Fingerprint prefix and hex SHA-256 digest, "<prefix>-<digest>"
+    """
+    canonical = json.dumps(
+        invoice_data, sort_keys=True, separators=(",", ":"), default=str
+    )
+    digest = hashlib.sha256()
+    digest.update(render_fingerprint.encode("ascii"))
+    digest.update(b"\0")
+    digest.update(canonical.encode("utf-8"))
+    return f"{render_fingerprint[:FINGERPRINT_PREFIX]}-{digest.hexdigest()}"
+
+
+class PdfCache:
+    """Size-bounded LRU of rendered PDFs with an optional disk tier."""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        disk_dir: str | None = None,
+        disk_max_bytes: int = DEFAULT_DISK_MAX_BYTES,
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        # invoice_id -> key of the most recently cached PDF of that invoice
+        self._keys_by_invoice = {}
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+        }
+        # Bytes on disk as of the last scan plus what this process wrote
+        # since; other worker processes write to the same directory
+        self._disk_size = 0
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_size = sum(size for _, size, _ in self._scan_disk())
+
+    def _disk_path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.pdf"
+
+    def _scan_disk(self) -> list:
+        """(mtime, size, path) of every cached PDF file, oldest first."""
+        files = []
+        for path in self.disk_dir.glob("*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        files.sort(key=lambda entry: entry[0])
+        return files
+
+    def _touch(self, key: str) -> None:
+        """Mark a PDF file as just used, so it is evicted from disk last."""
+        if self.disk_dir:
+            try:
+                os.utime(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+
+    def _prune_disk(self) -> None:
+        """Remove the least recently used files until under the disk budget."""
+        files = self._scan_disk()
+        size = sum(file_size for _, file_size, _ in files)
+        target = self.disk_max_bytes * DISK_PRUNE_TARGET
+        evicted = 0
+        for _, file_size, path in files:
+            if size <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            size -= file_size
+            evicted += 1
+
+        with self._lock:
+            self._disk_size = size
+            self._stats["disk_evictions"] += evicted
+
+    def remove_stale(self, render_fingerprint: str) -> int:
+        """
+        Remove on-disk PDFs rendered from another template or stylesheet.
+
+        Their keys can never be requested again, so they would only hold
+        disk space until evicted.
+
+        Args:
+            render_fingerprint: Hash of the current template and stylesheet
+
+        Returns:
+            int: Number of files removed
+        """
+        if not self.disk_dir:
+            return 0
+
+        prefix = f"{render_fingerprint[:FINGERPRINT_PREFIX]}-"
+        removed = 0
+        freed = 0
+        for _, size, path in self._scan_disk():
+            if path.name.startswith(prefix):
+                continue
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                continue
+            removed += 1
+            freed += size
+
+        with self._lock:
+            self._disk_size -= freed
+        if removed:
+            logger.info(f"Removed {removed} PDF cache files of an older template")
+        return removed
+
+    def _store_in_memory(self, key: str, pdf_bytes: bytes) -> None:
+        if len(pdf_bytes) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = pdf_bytes
+        self._size += len(pdf_bytes)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> bytes | None:
+        """Return the cached PDF for a key, or None on a miss."""
+        with self._lock:
+            pdf_bytes = self._entries.get(key)
+            if pdf_bytes is not None:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+
+        if pdf_bytes is not None:
+            self._touch(key)
+            return pdf_bytes
+
+        if self.disk_dir:
+            try:
+                pdf_bytes = self._disk_path(key).read_bytes()
+            except FileNotFoundError:
+                pdf_bytes = None
+            if pdf_bytes is not None:
+                with self._lock:
+                    self._store_in_memory(key, pdf_bytes)
+                    self._stats["disk_hits"] += 1
+                self._touch(key)
+                return pdf_bytes
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def put(self, key: str, invoice_id: str, pdf_bytes: bytes) -> None:
+        """Store a rendered PDF and remember it as the invoice's current PDF."""
+        with self._lock:
+            self._store_in_memory(key, pdf_bytes)
+            previous = self._keys_by_invoice.get(invoice_id)
+            self._keys_by_invoice[invoice_id] = key
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            try:
+                tmp_path.write_bytes(pdf_bytes)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                logger.warning(f"Could not write PDF cache file {path}: {str(e)}")
+            else:
+                with self._lock:
+                    self._disk_size += len(pdf_bytes)
+                    over_budget = self._disk_size > self.disk_max_bytes
+                if over_budget:
+                    self._prune_disk()
+
+        if previous and previous != key:
+            self._discard(previous)
+
+    def invalidate(self, invoice_id: str) -> None:
+        """Drop the cached PDF of an invoice (after it is updated or deleted)."""
+        with self._lock:
+            key = self._keys_by_invoice.pop(invoice_id, None)
+        if key:
+            self._discard(key)
+
+    def _discard(self, key: str) -> None:
+        with self._lock:
+            pdf_bytes = self._entries.pop(key, None)
+            if pdf_bytes is not None:
+                self._size -= len(pdf_bytes)
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                size = path.stat().st_size
+                path.unlink()
+            except FileNotFoundError:
+                return
+            with self._lock:
+                self._disk_size -= size
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current memory and (estimated) disk usage."""
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "disk_bytes": self._disk_size,
+            }
+
+
+_pdf_cache = None
+
+
+def get_pdf_cache() -> PdfCache:
+    """Return the process-wide PDF cache, configured from the environment."""
+    global _pdf_cache
+
+    if _pdf_cache is None:
+        # Imported here: only needed once, for the current template fingerprint
+        from app.services.pdf_service import get_pdf_renderer
+
+        max_mb = int(os.getenv("PDF_CACHE_MAX_MB", DEFAULT_MAX_BYTES // (1024 * 1024)))
+        disk_max_mb = int(
+            os.getenv("PDF_CACHE_DISK_MAX_MB", DEFAULT_DISK_MAX_BYTES // (1024 * 1024))
+        )
+        _pdf_cache = PdfCache(
+            max_bytes=max_mb * 1024 * 1024,
+            disk_dir=os.getenv("PDF_CACHE_DIR") or None,
+            disk_max_bytes=disk_max_mb * 1024 * 1024,
+        )
+        try:
+            _pdf_cache.remove_stale(get_pdf_renderer().fingerprint())
+        except OSError as e:
+            logger.warning(f"Could not clean up the PDF cache directory: {str(e)}")
+    return _pdf_cache
@@ -0,0 +1,212 @@
+"""
+Bounded worker pool for invoice PDF rendering.
+
+WeasyPrint layout is CPU-bound and holds the GIL, so renders run in a pool
+of worker processes instead of on the event loop. The pool is started with
+the application: every worker is launched then and imports WeasyPrint and
+compiles the invoice template before the first render arrives. Workers come
+from a forkserver (spawn where that is unavailable), never a plain fork of
+the server, which by then runs gRPC and allocator threads. The number
+of renders queued or running is capped; beyond that callers get
+PdfRenderOverloaded immediately rather than piling up behind a month-end
+burst.
+
+Configuration (environment):
+    PDF_RENDER_WORKERS      worker processes; 0 renders in a thread instead
+                            (default 0 on Vercel, else min(4, CPU count))
+    PDF_RENDER_MAX_PENDING  renders queued or running before rejecting
+                            (default 4 per worker)
+    PDF_RENDER_TIMEOUT      seconds to wait for one render (default 30)
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from app.services.pdf_service import get_pdf_renderer
+
+logger = logging.getLogger(__name__)
+
+
+class PdfRenderOverloaded(Exception):
+    """Raised when too many renders are already queued or running."""
+
+
+class PdfRenderTimeout(Exception):
+    """Raised when a render does not finish within the timeout."""
+
+
+def _init_worker() -> None:
+    """Warm a worker process: import WeasyPrint and compile the template."""
+    # A failing initializer would break the whole pool; let the render
+    # itself surface the error instead
+    try:
+        import weasyprint  # noqa: F401
+
+        get_pdf_renderer().warm_up()
+    except Exception as e:
+        logger.warning(f"PDF worker warm-up failed: {str(e)}")
+
+
+def _started_worker() -> int:
+    """Warm-up job: returns once its worker is up and initialized."""
+    return os.getpid()
+
+
+def _render_in_worker(invoice_data: dict) -> tuple:
+    return get_pdf_renderer().render(invoice_data)
+
+
+def _default_workers() -> int:
+    # Serverless functions cannot fork worker processes
+    if os.getenv("VERCEL"):
+        return 0
+    return min(4, os.cpu_count() or 1)
+
+
+def _mp_context():
+    # Forking a process that has started gRPC or other threads is unsafe
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
+class PdfRenderPool:
+    def __init__(
+        self,
+        workers: int | None = None,
+        max_pending: int | None = None,
+        timeout: float | None = None,
+    ):
+        if workers is None:
+            workers = int(os.getenv("PDF_RENDER_WORKERS", _default_workers()))
+        if max_pending is None:
+            max_pending = int(os.getenv("PDF_RENDER_MAX_PENDING", max(workers, 1) * 4))
+        if timeout is None:
+            timeout = float(os.getenv("PDF_RENDER_TIMEOUT", 30))
+
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=_mp_context(),
+                initializer=_init_worker,
+            )
+            logger.info(f"Started PDF render pool with {self.workers} workers")
+        return self._executor
+
+    def start(self) -> None:
+        """
+        Launch and warm every worker now instead of on the first render.
+
+        Submits one warm-up job per worker without waiting for them, so
+        start-up is not held up by the WeasyPrint import.
+        """
+        if self.workers <= 0:
+            return
+
+        executor = self._get_executor()
+        # Workers are launched on demand: queue one job for each of them
+        for _ in range(self.workers):
+            executor.submit(_started_worker).add_done_callback(self._warmed)
+
+    def _warmed(self, future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logger.warning(f"PDF worker failed to start: {future.exception()}")
+
+    def _submit(self, invoice_data: dict):
+        if self.workers <= 0:
+            loop = asyncio.get_running_loop()
+            return loop.run_in_executor(None, get_pdf_renderer().render, invoice_data)
+
+        try:
+            future = self._get_executor().submit(_render_in_worker, invoice_data)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); replace the pool and retry once
+            self._reset_executor()
+            future = self._get_executor().submit(_render_in_worker, invoice_data)
+        return asyncio.wrap_future(future)
+
+    def _reset_executor(self) -> None:
+        logger.warning("PDF render pool broken, restarting it")
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def render(self, invoice_data: dict) -> tuple:
+        """
+        Render an invoice PDF off the event loop.
+
+        Returns:
+            tuple: (pdf_bytes, timings) as returned by InvoicePdfRenderer.render
+
+        Raises:
+            PdfRenderOverloaded: If max_pending renders are already in flight
+            PdfRenderTimeout: If the render takes longer than the timeout
+        """
+        if self._pending >= self.max_pending:
+            raise PdfRenderOverloaded(
+                f"PDF renderer busy ({self._pending} renders in flight)"
+            )
+
+        self._pending += 1
+        future = self._submit(invoice_data)
+        # Release the slot when the render really ends, not when we stop
+        # waiting for it: a timed-out render still occupies a worker
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise PdfRenderTimeout(f"PDF render took longer than {self.timeout:g}s")
+        except BrokenProcessPool:
+            self._reset_executor()
+            raise
+
+    def _release(self, future) -> None:
+        self._pending -= 1
+        if not future.cancelled() and future.exception() is not None:
+            logger.debug(f"PDF render failed: {future.exception()}")
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self._pending,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pool = None
+
+
+def get_pdf_render_pool() -> PdfRenderPool:
+    """Return the process-wide PDF render pool."""
+    global _pool
+
+    if _pool is None:
+        _pool = PdfRenderPool()
+    return _pool
+
+
+def start_pdf_render_pool() -> None:
+    """Start and warm the PDF render workers (called at application start-up)."""
+    get_pdf_render_pool().start()
+
+
+def shutdown_pdf_render_pool() -> None:
+    if _pool is not None:
+        _pool.shutdown()
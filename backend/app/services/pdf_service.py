@@ -0,0 +1,199 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = Path(__file__).resolve().parents[1] / "templates"
+TEMPLATE_NAME = "SPM_bill.html"
+STYLESHEET_NAME = "spm_bill.css"
+
+# Company details (same as in React template)
+COMPANY_DETAILS = {
+    "name": "SPM ENGINEERING",
+    "address": "347, SANGANUR ROAD, GANAPATHY, COIMBATORE",
+    "gstin": "33AFHPE4773N1Z6",
+    "state": "Tamil Nadu",
+    "state_code": "33",
+}
+
+
+def _template_context(invoice_data: dict) -> dict:
+    return {"company": COMPANY_DETAILS, "invoice": invoice_data}
+
+
+class InvoicePdfRenderer:
+    """
+    Process-wide render context for invoice PDFs.
+
+    The Jinja2 environment, compiled SPM_bill.html template and parsed
+    WeasyPrint stylesheet are built once and reused by every render. When
+    auto_reload is on (the default, handy in development) the template and
+    stylesheet are rebuilt only after their file mtime changes.
+    """
+
+    def __init__(
+        self,
+        template_dir: Path = TEMPLATE_DIR,
+        template_name: str = TEMPLATE_NAME,
+        stylesheet_name: str = STYLESHEET_NAME,
+        auto_reload: bool | None = None,
+    ):
+        if auto_reload is None:
+            auto_reload = os.getenv("PDF_TEMPLATE_AUTO_RELOAD", "true").lower() != "false"
+
+        self.template_dir = Path(template_dir)
+        self.template_name = template_name
+        self.stylesheet_path = self.template_dir / stylesheet_name
+        self.auto_reload = auto_reload
+
+        self._lock = threading.Lock()
+        self._env = None
+        self._stylesheet = None
+        self._stylesheet_mtime = None
+        self._fingerprint = None
+        self._fingerprint_mtimes = None
+        self._stats = {
+            "renders": 0,
+            "environment_builds": 0,
+            "stylesheet_parses": 0,
+            "setup_ms": 0.0,
+            "html_ms": 0.0,
+            "pdf_ms": 0.0,
+        }
+
+    def _get_template(self):
+        if self._env is None:
+            with self._lock:
+                if self._env is None:
+                    from jinja2 import Environment, FileSystemLoader
+
+                    if not (self.template_dir / self.template_name).exists():
+                        raise FileNotFoundError(
+                            f"Template not found: {self.template_name} in {self.template_dir}"
+                        )
+
+                    # Jinja2 caches compiled templates and, with auto_reload,
+                    # recompiles only when the source file's mtime changes
+                    self._env = Environment(
+                        loader=FileSystemLoader(str(self.template_dir)),
+                        auto_reload=self.auto_reload,
+                    )
+                    self._stats["environment_builds"] += 1
+
+        return self._env.get_template(self.template_name)
+
+    def _get_stylesheet(self):
+        if self._stylesheet is not None and not self.auto_reload:
+            return self._stylesheet
+
+        mtime = self.stylesheet_path.stat().st_mtime
+        if self._stylesheet is not None and mtime == self._stylesheet_mtime:
+            return self._stylesheet
+
+        with self._lock:
+            if self._stylesheet is None or mtime != self._stylesheet_mtime:
+                from weasyprint import CSS
+
+                self._stylesheet = CSS(
+                    string=self.stylesheet_path.read_text(encoding="utf-8")
+                )
+                self._stylesheet_mtime = mtime
+                self._stats["stylesheet_parses"] += 1
+                logger.info(f"Parsed invoice stylesheet {self.stylesheet_path}")
+
+        return self._stylesheet
+
+    def fingerprint(self) -> str:
+        """
+        Hash of the template and stylesheet sources.
+
+        Part of the PDF cache key, so editing either file naturally misses
+        every previously cached PDF. Recomputed only when an mtime changes.
+        """
+        template_path = self.template_dir / self.template_name
+        mtimes = (template_path.stat().st_mtime, self.stylesheet_path.stat().st_mtime)
+        if self._fingerprint is None or mtimes != self._fingerprint_mtimes:
+            digest = hashlib.sha256()
+            digest.update(template_path.read_bytes())
+            digest.update(b"\0")
+            digest.update(self.stylesheet_path.read_bytes())
+            self._fingerprint = digest.hexdigest()
+            self._fingerprint_mtimes = mtimes
+        return self._fingerprint
+
+    def warm_up(self) -> None:
+        """Compile the template and parse the stylesheet ahead of the first render."""
+        self._get_template()
+        self._get_stylesheet()
+
+    def render_html(self, invoice_data: dict) -> str:
+        """Render the invoice HTML from the cached template."""
+        template = self._get_template()
+        return template.render(_template_context(invoice_data))
+
+    def render(self, invoice_data: dict) -> tuple:
+        """
+        Render an invoice document to PDF.
+
+        Args:
+            invoice_data: Invoice document as stored in Firestore
+
+        Returns:
+            tuple: (pdf_bytes, timings) where timings maps phase name to
+            milliseconds: setup (template/stylesheet lookup), html, pdf
+        """
+        from weasyprint import HTML
+
+        started = time.perf_counter()
+        template = self._get_template()
+        stylesheet = self._get_stylesheet()
+        setup_done = time.perf_counter()
+
+        html_content = template.render(_template_context(invoice_data))
+        html_done = time.perf_counter()
+
+        pdf_bytes = HTML(string=html_content).write_pdf(stylesheets=[stylesheet])
+        pdf_done = time.perf_counter()
+
+        timings = {
+            "setup": (setup_done - started) * 1000,
+            "html": (html_done - setup_done) * 1000,
+            "pdf": (pdf_done - html_done) * 1000,
+        }
+
+        with self._lock:
+            self._stats["renders"] += 1
+            self._stats["setup_ms"] += timings["setup"]
+            self._stats["html_ms"] += timings["html"]
+            self._stats["pdf_ms"] += timings["pdf"]
+
+        logger.debug(
+            "Rendered invoice PDF in %.1f ms (setup %.1f, html %.1f, pdf %.1f)",
+            sum(timings.values()),
+            timings["setup"],
+            timings["html"],
+            timings["pdf"],
+        )
+
+        return pdf_bytes, timings
+
+    def stats(self) -> dict:
+        """Cumulative render counters and per-phase time since process start."""
+        with self._lock:
+            return dict(self._stats)
+
+
+_renderer = None
+
+
+def get_pdf_renderer() -> InvoicePdfRenderer:
+    """Return the process-wide invoice PDF renderer."""
+    global _renderer
+
+    if _renderer is None:
+        _renderer = InvoicePdfRenderer()
+    return _renderer
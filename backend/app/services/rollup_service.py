@@ -0,0 +1,133 @@
+"""
+Time-bucketed revenue rollups.
+
+Each invoice contributes its count and totals.total to three bucket documents
+in the Rollups collection, keyed by its invoice_date:
+
+    day_2025-04-01, month_2025-04, fy_2025-2026
+
+The buckets are adjusted in the same transaction or batch as the invoice
+write, so trend charts read a handful of bucket documents instead of
+scanning every invoice.
+"""
+
+import logging
+from datetime import timedelta
+from app.utils.invoice_utils import (
+    get_financial_year,
+    get_financial_year_months,
+    get_financial_year_range,
+    invoice_revenue,
+    parse_financial_year,
+    parse_invoice_date,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUPS_COLLECTION = "Rollups"
+GRANULARITIES = ("day", "month", "fy")
+
+
+def bucket_id(granularity: str, key: str) -> str:
+    """Document ID of a rollup bucket, e.g. bucket_id("month", "2025-04")."""
+    return f"{granularity}_{key}"
+
+
+def invoice_buckets(invoice: dict) -> list:
+    """
+    Rollup buckets an invoice belongs to.
+
+    Invoices without a parseable invoice_date fall back to meta.created_at.
+
+    Returns:
+        list: (granularity, key, fy) tuples, empty if no date is available
+    """
+    day = parse_invoice_date(invoice.get("invoice_date"))
+    if day is None:
+        day = parse_invoice_date((invoice.get("meta") or {}).get("created_at"))
+    if day is None:
+        return []
+
+    fy = get_financial_year(day)
+    return [
+        ("day", day.isoformat(), fy),
+        ("month", day.strftime("%Y-%m"), fy),
+        ("fy", fy, fy),
+    ]
+
+
+def rollup_deltas(changes: list) -> dict:
+    """
+    Net rollup deltas of a list of invoice writes.
+
+    Args:
+        changes: (old_invoice, new_invoice) pairs; old is None for a create,
+            new is None for a delete
+
+    Returns:
+        dict: (granularity, key) -> {"fy", "count", "revenue"}
+    """
+    deltas = {}
+    for old_invoice, new_invoice in changes:
+        for invoice, sign in ((old_invoice, -1), (new_invoice, 1)):
+            if not invoice:
+                continue
+            revenue = invoice_revenue(invoice)
+            for granularity, key, fy in invoice_buckets(invoice):
+                entry = deltas.setdefault(
+                    (granularity, key), {"fy": fy, "count": 0, "revenue": 0.0}
+                )
+                entry["count"] += sign
+                entry["revenue"] += sign * revenue
+    return deltas
+
+
+def record_rollup_deltas(writer, db, deltas: dict) -> None:
+    """Stage rollup deltas (from rollup_deltas) as increments on the buckets."""
+    from google.cloud import firestore
+
+    collection = db.collection(ROLLUPS_COLLECTION)
+    for (granularity, key), entry in deltas.items():
+        if not entry["count"] and not entry["revenue"]:
+            continue
+        writer.set(
+            collection.document(bucket_id(granularity, key)),
+            {
+                "granularity": granularity,
+                "bucket": key,
+                "fy": entry["fy"],
+                "invoice_count": firestore.Increment(entry["count"]),
+                "revenue": firestore.Increment(entry["revenue"]),
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            },
+            merge=True,
+        )
+
+
+def financial_year_bucket_keys(granularity: str, financial_year: str) -> list:
+    """
+    All bucket keys of a financial year for a granularity, in time order.
+
+    Args:
+        granularity: "day", "month" or "fy"
+        financial_year: Financial year in format "YYYY-YYYY"
+
+    Returns:
+        list: Bucket keys, e.g. ["2025-04", ..., "2026-03"] for months
+    """
+    if granularity == "fy":
+        parse_financial_year(financial_year)
+        return [financial_year]
+
+    if granularity == "month":
+        return [
+            f"{year}-{month:02d}"
+            for year, month in get_financial_year_months(financial_year)
+        ]
+
+    day, last = get_financial_year_range(financial_year)
+    keys = []
+    while day <= last:
+        keys.append(day.isoformat())
+        day += timedelta(days=1)
+    return keys
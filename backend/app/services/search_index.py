@@ -0,0 +1,321 @@
+"""
+In-memory search index over the customer and item master data.
+
+Every word of the indexed text fields is stored in a prefix map
+(prefix -> document IDs), so a query is answered with a few set lookups and
+intersections. Code-like fields (GSTIN, phone, HSN/SAC) are also indexed by
+their inner substrings, so "45012" finds a phone number in the middle. Each
+entry carries a precomputed score, so ranking is a dictionary lookup per
+candidate. Only active documents are indexed.
+
+The index is built from Firestore on the first search (ensure_built) and
+updated in place by the write endpoints. It is rebuilt after MASTER_DATA_CACHE_TTL seconds to
+pick up writes made by other instances, unless it follows the listener
+replica, which streams every change into it.
+"""
+
+import heapq
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+from app.utils.cache import DEFAULT_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+# Longest indexed prefix/substring; GSTINs are 15 characters
+MAX_TERM_LENGTH = 16
+# Shortest substring matched inside (not at the start of) a code field
+MIN_INNER_LENGTH = 3
+# Matches above which a single-word query's ranking is cached
+RANK_CACHE_MIN_MATCHES = 256
+# Cached rankings kept per index, least recently used dropped first
+RANK_CACHE_MAX_QUERIES = 64
+
+_WORD_RE = re.compile(r"[0-9a-z]+")
+
+
+def _words(value) -> list:
+    if value is None:
+        return []
+    return _WORD_RE.findall(str(value).lower())
+
+
+def _compact(value) -> str:
+    """Lower-cased value with everything but letters and digits removed."""
+    return "".join(_words(value))
+
+
+class SearchIndex:
+    """Thread-safe prefix/substring index of one master data collection."""
+
+    def __init__(
+        self,
+        name: str,
+        id_field: str,
+        fields: dict,
+        code_fields: tuple = (),
+        ttl: float = DEFAULT_TTL_SECONDS,
+    ):
+        """
+        Args:
+            name: Collection name
+            id_field: Key the document ID is returned under
+            fields: Indexed field name -> ranking weight
+            code_fields: Fields matched by substring instead of word prefix
+            ttl: Seconds before the index is rebuilt from Firestore
+        """
+        self.name = name
+        self.id_field = id_field
+        self.fields = fields
+        self.code_fields = set(code_fields)
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._documents = {}
+        # term -> {document ID: score of the best field matching the term}
+        self._terms = {}
+        # document ID -> lower-cased name, for ranking ties
+        self._names = {}
+        # Full ranking of frequent single-word queries (LRU, capped at
+        # RANK_CACHE_MAX_QUERIES), dropped on every write
+        self._ranked = OrderedDict()
+        self._built_at = None
+        self._following = False
+        # Writes applied while a rebuild is loading, replayed after the swap
+        self._journal = None
+
+    # ---------------------------
+    # Building
+    # ---------------------------
+    def _keys_for(self, data: dict) -> dict:
+        """
+        Map every searchable key of a document to its score: the field
+        weight, doubled when the key is a whole word or code.
+        """
+        keys = {}
+
+        def add(key, score):
+            if keys.get(key, 0) < score:
+                keys[key] = score
+
+        for field, weight in self.fields.items():
+            value = data.get(field)
+            if not value:
+                continue
+            if field in self.code_fields:
+                compact = _compact(value)
+                for end in range(1, min(len(compact), MAX_TERM_LENGTH) + 1):
+                    add(compact[:end], weight)
+                # Inner substrings (3+ characters) so "45012" finds the
+                # middle of a phone number
+                for start in range(1, len(compact) - MIN_INNER_LENGTH + 1):
+                    stop = min(len(compact), start + MAX_TERM_LENGTH)
+                    for end in range(start + MIN_INNER_LENGTH, stop + 1):
+                        add(compact[start:end], weight)
+                add(compact[:MAX_TERM_LENGTH], weight * 2)
+            else:
+                for word in _words(value):
+                    for end in range(1, min(len(word), MAX_TERM_LENGTH) + 1):
+                        add(word[:end], weight)
+                    add(word[:MAX_TERM_LENGTH], weight * 2)
+        return keys
+
+    def _add(self, terms: dict, documents: dict, names: dict, doc_id: str, data):
+        if data.get("is_active") is not True:
+            return
+        for key, score in self._keys_for(data).items():
+            terms.setdefault(key, {})[doc_id] = score
+        documents[doc_id] = {**data, self.id_field: doc_id}
+        names[doc_id] = str(data.get("name") or "").lower()
+
+    def _remove(self, doc_id: str) -> None:
+        data = self._documents.pop(doc_id, None)
+        self._names.pop(doc_id, None)
+        if data is None:
+            return
+        for key in self._keys_for(data):
+            scores = self._terms.get(key)
+            if scores is not None:
+                scores.pop(doc_id, None)
+                if not scores:
+                    del self._terms[key]
+
+    def load(self, documents: list) -> None:
+        """Replace the index contents with a list of documents."""
+        terms, by_id, names = {}, {}, {}
+        for data in documents:
+            self._add(terms, by_id, names, data[self.id_field], data)
+
+        with self._lock:
+            self._terms, self._documents, self._names = terms, by_id, names
+            self._ranked = OrderedDict()
+            self._built_at = time.monotonic()
+            journal, self._journal = self._journal, None
+            for doc_id, data in journal or []:
+                self._apply(doc_id, data)
+
+    def _begin_rebuild(self) -> bool:
+        """Return True if the caller should (re)build the index now."""
+        with self._lock:
+            if self._built_at is not None:
+                if self._following or time.monotonic() - self._built_at < self.ttl:
+                    return False
+                if self._journal is not None:
+                    # Another request is rebuilding it; serve current contents
+                    return False
+            self._journal = []
+            return True
+
+    def _finish_rebuild(self, documents: list, started: float) -> None:
+        self.load(documents)
+        logger.info(
+            f"Built {self.name} search index with {len(self._documents)} "
+            f"documents in {(time.perf_counter() - started) * 1000:.1f} ms"
+        )
+
+    def _abort_rebuild(self) -> None:
+        with self._lock:
+            self._journal = None
+
+    def ensure_built(self, loader: Callable[[], list]) -> None:
+        """
+        Build the index on first use and after it expires.
+
+        Args:
+            loader: Function returning all active documents
+        """
+        if not self._begin_rebuild():
+            return
+        started = time.perf_counter()
+        try:
+            self._finish_rebuild(loader(), started)
+        except Exception:
+            self._abort_rebuild()
+            raise
+
+    async def ensure_built_async(self, loader: Callable[[], Awaitable[list]]) -> None:
+        """Like ensure_built, for a coroutine function loader."""
+        if not self._begin_rebuild():
+            return
+        started = time.perf_counter()
+        try:
+            self._finish_rebuild(await loader(), started)
+        except Exception:
+            self._abort_rebuild()
+            raise
+
+    def follow(self, replica) -> None:
+        """
+        Keep the index in sync from the listener replica instead of
+        periodic rebuilds. Safe to call repeatedly.
+        """
+        with self._lock:
+            if self._following:
+                return
+            self._following = True
+            self._journal = []
+        replica.add_listener(self._on_replica_change)
+        self.load(replica.list_active(self.name, self.id_field))
+
+    def _on_replica_change(self, collection_name: str, doc_id: str, data):
+        if collection_name == self.name:
+            self.upsert(doc_id, data)
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    def _apply(self, doc_id: str, data) -> None:
+        self._ranked = OrderedDict()
+        self._remove(doc_id)
+        if data is not None:
+            self._add(self._terms, self._documents, self._names, doc_id, data)
+
+    def upsert(self, doc_id: str, data) -> None:
+        """Index a document (or drop it when data is None or it is inactive)."""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((doc_id, data))
+            if self._built_at is not None:
+                self._apply(doc_id, data)
+
+    def patch(self, doc_id: str, changes: dict) -> None:
+        """Merge updated fields into an indexed document."""
+        with self._lock:
+            current = self._documents.get(doc_id)
+        if current is not None:
+            self.upsert(doc_id, {**current, **changes})
+
+    def remove(self, doc_id: str) -> None:
+        self.upsert(doc_id, None)
+
+    # ---------------------------
+    # Search
+    # ---------------------------
+    def search(self, query: str, limit: int) -> list:
+        """
+        Return the best matches for a query, most relevant first.
+
+        Every query word must match the start of a word of an indexed field
+        (or any part of a code field). Matches in heavier fields, exact word
+        matches and names starting with the query rank higher.
+
+        Call ensure_built (or ensure_built_async) first so the index is
+        loaded and current.
+
+        Args:
+            query: Free-text query
+            limit: Maximum number of results
+
+        Returns:
+            list: Matching documents with their ID under id_field
+        """
+
+        query_words = [word[:MAX_TERM_LENGTH] for word in _words(query)]
+        if not query_words:
+            return []
+        compact_query = _compact(query)[:MAX_TERM_LENGTH]
+
+        with self._lock:
+            matches = [self._terms.get(word) or {} for word in query_words]
+
+            # A code typed with separators ("29-ABCDE") is one compact term
+            if len(query_words) > 1 and compact_query in self._terms:
+                matches = [self._terms[compact_query]]
+
+            # Intersect starting from the rarest word
+            matches.sort(key=len)
+            candidates = matches[0].keys()
+            for scores in matches[1:]:
+                candidates = [doc_id for doc_id in candidates if doc_id in scores]
+
+            prefix = query.strip().lower()
+            names = self._names
+
+            def rank_key(doc_id):
+                score = sum(scores[doc_id] for scores in matches)
+                if names[doc_id].startswith(prefix):
+                    score += 1
+                return (-score, names[doc_id], doc_id)
+
+            if len(matches) == 1 and len(candidates) > RANK_CACHE_MIN_MATCHES:
+                # Short, common queries match much of the collection; rank
+                # them once and reuse the order until the next write
+                cache_key = (compact_query, prefix)
+                ranked = self._ranked.get(cache_key)
+                if ranked is None:
+                    ranked = sorted(candidates, key=rank_key)
+                    self._ranked[cache_key] = ranked
+                    if len(self._ranked) > RANK_CACHE_MAX_QUERIES:
+                        self._ranked.popitem(last=False)
+                else:
+                    self._ranked.move_to_end(cache_key)
+                top = ranked[:limit]
+            else:
+                top = heapq.nsmallest(limit, candidates, key=rank_key)
+            return [dict(self._documents[doc_id]) for doc_id in top]
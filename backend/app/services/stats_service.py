@@ -0,0 +1,154 @@
+"""
+Materialized dashboard statistics.
+
+A single Stats/dashboard document holds the dashboard counters. Every write
+path that changes them (invoice create/update/delete, customer and item
+create/soft-delete) applies an increment to this document in the same
+transaction or batch as the write itself, so reading the dashboard is one
+document read instead of a scan of every collection.
+
+The document is only trusted once a full rebuild has written its "seeded"
+flag, and the revenue rollups once a full rollup rebuild has set
+"rollups_seeded" on it. Write paths call ensure_stats_seeded() before their
+transaction, so on an existing install the first increment after a deploy
+lands on counters and buckets built from the collections rather than
+creating documents holding just its own delta; reads seed them the same way.
+"""
+
+import logging
+import threading
+from app.services.rollup_service import record_rollup_deltas, rollup_deltas
+from app.utils.invoice_utils import invoice_revenue
+
+logger = logging.getLogger(__name__)
+
+STATS_COLLECTION = "Stats"
+STATS_DOCUMENT = "dashboard"
+
+# Counter field kept in the stats document for each master collection
+MASTER_COUNTERS = {
+    "customers": "total_customers",
+    "items": "total_items",
+}
+
+# Written by a full rebuild only; increments never set them
+SEEDED_FIELD = "seeded"
+ROLLUPS_SEEDED_FIELD = "rollups_seeded"
+
+# Whether this process has seen a seeded stats document
+_seeded = False
+_seed_lock = threading.Lock()
+
+
+def get_stats_ref(db):
+    """Return the reference of the materialized dashboard stats document."""
+    return db.collection(STATS_COLLECTION).document(STATS_DOCUMENT)
+
+
+def is_seeded(stats_doc, field: str = SEEDED_FIELD) -> bool:
+    """
+    Whether a stats snapshot says the counters (or, with ROLLUPS_SEEDED_FIELD,
+    the rollup buckets) were built from the collections.
+    """
+    return stats_doc.exists and bool((stats_doc.to_dict() or {}).get(field))
+
+
+def ensure_stats_seeded(db=None) -> None:
+    """
+    Rebuild the stats document and the rollup buckets from the collections
+    unless they are seeded.
+
+    Call before a transaction or batch that records stats or rollup deltas.
+    Checked once per process; later calls return without reading.
+
+    Args:
+        db: Firestore client to seed through (defaults to get_firestore())
+
+    Raises:
+        Exception: If the counters cannot be fully recomputed
+    """
+    global _seeded
+    if _seeded:
+        return
+
+    with _seed_lock:
+        if _seeded:
+            return
+        # Imported here: the dashboard service imports this module
+        from app.services.dashboard_service import DashboardService
+
+        dashboard_service = DashboardService()
+        if db is not None:
+            dashboard_service.db = db
+        stats_doc = get_stats_ref(dashboard_service.db).get()
+        if not is_seeded(stats_doc, ROLLUPS_SEEDED_FIELD):
+            logger.info("Revenue rollups not seeded, rebuilding")
+            dashboard_service.rebuild_rollups()
+        if not is_seeded(stats_doc):
+            logger.info("Dashboard stats document not seeded, rebuilding")
+            dashboard_service.rebuild_stats()
+        _seeded = True
+
+
+def record_invoice_change(writer, db, old_invoice=None, new_invoice=None) -> None:
+    """
+    Apply the stats and rollup deltas of an invoice write.
+
+    Pass only new_invoice for a create, both for an update and only
+    old_invoice for a delete.
+
+    Args:
+        writer: Firestore transaction or write batch the invoice write belongs to
+        db: Firestore client
+        old_invoice: Invoice document before the write
+        new_invoice: Invoice document after the write
+    """
+    record_invoice_changes(writer, db, [(old_invoice, new_invoice)])
+
+
+def record_invoice_changes(writer, db, changes: list) -> None:
+    """
+    Apply the combined stats and rollup deltas of several invoice writes,
+    touching the stats document and each rollup bucket only once.
+
+    Args:
+        writer: Firestore transaction or write batch the invoice writes belong to
+        db: Firestore client
+        changes: (old_invoice, new_invoice) pairs, as for record_invoice_change
+    """
+    from google.cloud import firestore
+
+    count_delta = 0
+    revenue_delta = 0.0
+    for old_invoice, new_invoice in changes:
+        count_delta += int(new_invoice is not None) - int(old_invoice is not None)
+        revenue_delta += invoice_revenue(new_invoice) - invoice_revenue(old_invoice)
+
+    update = {"updated_at": firestore.SERVER_TIMESTAMP}
+    if count_delta:
+        update["total_invoices"] = firestore.Increment(count_delta)
+    if revenue_delta:
+        update["total_revenue"] = firestore.Increment(revenue_delta)
+
+    writer.set(get_stats_ref(db), update, merge=True)
+    record_rollup_deltas(writer, db, rollup_deltas(changes))
+
+
+def record_master_change(writer, db, collection_name: str, delta: int) -> None:
+    """
+    Apply a change in the number of active customers or items.
+
+    Args:
+        writer: Firestore transaction or write batch the master write belongs to
+        db: Firestore client
+        collection_name: "customers" or "items"
+        delta: +1 for a create, -1 for a soft delete
+    """
+    from google.cloud import firestore
+
+    field = MASTER_COUNTERS[collection_name]
+    writer.set(
+        get_stats_ref(db),
+        {field: firestore.Increment(delta), "updated_at": firestore.SERVER_TIMESTAMP},
+        merge=True,
+    )
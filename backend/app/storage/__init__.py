@@ -0,0 +1,104 @@
+"""
+Pluggable document storage.
+
+STORAGE_BACKEND selects what get_firestore()/get_firestore_async() return:
+
+- "firestore" (default): the Firebase Admin Firestore clients
+- "memory": a Firestore-compatible client over a thread-safe in-process
+  store, for load tests and profiling without a Firebase project
+- "sqlite": the same client over a SQLite database at SQLITE_DATABASE_PATH,
+  for single-site installs that run offline
+
+Code that runs transactions uses transactional/async_transactional from
+here instead of the firestore decorators, so it works with either backend.
+
+Nothing from google-cloud-firestore is imported until a client or
+transaction needs it, which keeps it out of the serverless cold start.
+"""
+
+import functools
+import os
+import threading
+
+STORAGE_BACKENDS = ("firestore", "memory", "sqlite")
+
+_client = None
+_async_client = None
+_client_lock = threading.Lock()
+
+
+def get_storage_backend() -> str:
+    backend = os.getenv("STORAGE_BACKEND", "firestore").strip().lower()
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(
+            f"Unknown STORAGE_BACKEND {backend!r}; expected one of "
+            f"{', '.join(STORAGE_BACKENDS)}"
+        )
+    return backend
+
+
+def _create_store(backend: str):
+    if backend == "sqlite":
+        from app.storage.sqlite import SQLiteDocumentStore
+
+        return SQLiteDocumentStore(os.getenv("SQLITE_DATABASE_PATH", "spm_billing.db"))
+
+    from app.storage.memory import MemoryDocumentStore
+
+    return MemoryDocumentStore()
+
+
+def get_document_client():
+    """Process-wide DocumentClient of the configured local store."""
+    global _client
+    from app.storage.documents import DocumentClient
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = DocumentClient(_create_store(get_storage_backend()))
+    return _client
+
+
+def get_async_document_client():
+    """AsyncDocumentClient sharing the store of get_document_client()."""
+    global _async_client
+    from app.storage.documents import AsyncDocumentClient
+
+    if _async_client is None:
+        _async_client = AsyncDocumentClient(get_document_client())
+    return _async_client
+
+
+def transactional(to_wrap):
+    """firestore.transactional that also runs on the local stores."""
+
+    @functools.wraps(to_wrap)
+    def wrapper(transaction, *args, **kwargs):
+        from google.cloud import firestore
+
+        from app.storage.documents import Transaction, run_transaction
+
+        if isinstance(transaction, Transaction):
+            return run_transaction(to_wrap, transaction, *args, **kwargs)
+        return firestore.transactional(to_wrap)(transaction, *args, **kwargs)
+
+    return wrapper
+
+
+def async_transactional(to_wrap):
+    """firestore.async_transactional that also runs on the local stores."""
+
+    @functools.wraps(to_wrap)
+    async def wrapper(transaction, *args, **kwargs):
+        from google.cloud import firestore
+
+        from app.storage.documents import AsyncTransaction, run_async_transaction
+
+        if isinstance(transaction, AsyncTransaction):
+            return await run_async_transaction(to_wrap, transaction, *args, **kwargs)
+        return await firestore.async_transactional(to_wrap)(
+            transaction, *args, **kwargs
+        )
+
+    return wrapper
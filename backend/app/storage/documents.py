@@ -0,0 +1,903 @@
+"""
+Firestore-compatible document client over a local document store.
+
+Implements the part of the google-cloud-firestore client API the app uses
+(collections, document references, where/order_by/start_after/select/limit
+queries, count and sum aggregations, write batches, transactions, Increment,
+SERVER_TIMESTAMP and DELETE_FIELD), so the services and routers run
+unchanged on top of an in-process store. A store only has to keep whole
+documents and answer queries; the write semantics (merge, field-path updates,
+transforms, atomic commits) live here and are shared by every store.
+"""
+
+import asyncio
+import contextvars
+import functools
+import heapq
+import time
+from datetime import date, datetime, timezone
+
+from google.api_core import exceptions as google_exceptions
+from google.cloud.firestore_v1 import transforms
+from google.cloud.firestore_v1.base_aggregation import AggregationResult
+from google.cloud.firestore_v1.base_collection import _auto_id
+
+from app.utils.metrics import record_rpc
+from starlette.concurrency import run_in_threadpool
+
+DOCUMENT_ID = "__name__"
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+RANGE_OPERATORS = ("<", "<=", ">", ">=")
+OPERATORS = RANGE_OPERATORS + (
+    "==",
+    "!=",
+    "in",
+    "not-in",
+    "array_contains",
+    "array_contains_any",
+)
+
+
+# ---------------------------
+# Values
+# ---------------------------
+_TYPE_RANKS = {
+    type(None): 0,
+    bool: 1,
+    int: 2,
+    float: 2,
+    datetime: 3,
+    str: 4,
+    bytes: 5,
+    list: 8,
+    dict: 9,
+}
+
+
+def copy_value(value):
+    """Copy nested maps and lists; leaves (and sentinels) are shared."""
+    if isinstance(value, dict):
+        return {key: copy_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [copy_value(item) for item in value]
+    return value
+
+
+def _type_rank(value) -> int:
+    # Firestore's cross-type order: null, bool, number, timestamp, string,
+    # bytes, reference, array, map
+    rank = _TYPE_RANKS.get(type(value))
+    if rank is not None:
+        return rank
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, (datetime, date)):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, bytes):
+        return 5
+    if isinstance(value, DocumentReference):
+        return 6
+    if isinstance(value, list):
+        return 8
+    return 9
+
+
+def value_key(value):
+    """Sort key that orders any two document values the way Firestore does."""
+    rank = _type_rank(value)
+    if rank == 0:
+        return (0, 0)
+    if rank == 3:
+        if not isinstance(value, datetime):
+            value = datetime(value.year, value.month, value.day)
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return (3, value.timestamp())
+    if rank == 6:
+        return (6, value.path)
+    if rank == 8:
+        return (8, tuple(value_key(item) for item in value))
+    if rank == 9:
+        return (9, tuple(sorted((key, value_key(item)) for key, item in value.items())))
+    return (rank, value)
+
+
+@functools.total_ordering
+class _Descending:
+    """Inverts the order of a sort key."""
+
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+def get_field(data: dict, field_path: str):
+    """Return (True, value) for a dotted field path, or (False, None) if unset."""
+    return _get_parts(data, field_path.split("."))
+
+
+def _get_parts(data: dict, parts: list):
+    value = data
+    for part in parts:
+        if not isinstance(value, dict) or part not in value:
+            return False, None
+        value = value[part]
+    return True, value
+
+
+def _matches(value, op: str, operand, operand_key) -> bool:
+    """Evaluate a filter; operand_key is value_key(operand) for scalar operators."""
+    if op == "==":
+        return value_key(value) == operand_key
+    if op == "!=":
+        return value is not None and value_key(value) != operand_key
+    if op == "in":
+        return any(value_key(value) == value_key(item) for item in operand)
+    if op == "not-in":
+        return value is not None and all(
+            value_key(value) != value_key(item) for item in operand
+        )
+    if op == "array_contains":
+        return isinstance(value, list) and any(
+            value_key(item) == operand_key for item in value
+        )
+    if op == "array_contains_any":
+        return isinstance(value, list) and any(
+            value_key(item) == value_key(candidate)
+            for item in value
+            for candidate in operand
+        )
+
+    # Range filters only match values of the same type
+    left = value_key(value)
+    if left[0] != operand_key[0]:
+        return False
+    if op == "<":
+        return left < operand_key
+    if op == "<=":
+        return left <= operand_key
+    if op == ">":
+        return left > operand_key
+    return left >= operand_key
+
+
+def run_query(
+    documents,
+    filters: tuple,
+    orders: tuple,
+    cursor: tuple | None = None,
+    limit: int | None = None,
+) -> list:
+    """
+    Evaluate a query over (doc_id, data) pairs in Python.
+
+    Args:
+        documents: Iterable of (doc_id, data)
+        filters: (field_path, op, value) triples, all of which must match
+        orders: (field_path, direction) pairs, ending with DOCUMENT_ID
+        cursor: Values of the order fields to start after, or None
+        limit: Maximum number of results, or None
+
+    Returns:
+        list: Matching (doc_id, data) pairs in query order
+    """
+    # All-descending orders (the usual newest-first listing) compare plain
+    # keys and reverse, which is much faster than inverted keys
+    reverse = all(direction == DESCENDING for _, direction in orders)
+
+    # Split field paths and key the operands once, not per document
+    compiled = [
+        (
+            None if field_path == DOCUMENT_ID else field_path.split("."),
+            op,
+            operand,
+            (6, operand) if field_path == DOCUMENT_ID else value_key(operand),
+        )
+        for field_path, op, operand in filters
+    ]
+    order_specs = [
+        (
+            None if field_path == DOCUMENT_ID else field_path.split("."),
+            direction == DESCENDING and not reverse,
+        )
+        for field_path, direction in orders
+    ]
+
+    keyed = []
+    for doc_id, data in documents:
+        for parts, op, operand, operand_key in compiled:
+            if parts is None:
+                found, value = True, doc_id
+            else:
+                found, value = _get_parts(data, parts)
+            if not found or not _matches(value, op, operand, operand_key):
+                break
+        else:
+            key = []
+            for parts, invert in order_specs:
+                if parts is None:
+                    part = (6, doc_id)
+                else:
+                    found, value = _get_parts(data, parts)
+                    if not found:
+                        # Like Firestore, documents without an order field
+                        # are left out
+                        break
+                    part = value_key(value)
+                key.append(_Descending(part) if invert else part)
+            else:
+                keyed.append((tuple(key), doc_id, data))
+
+    if cursor is not None:
+        position = []
+        for value, (field_path, direction) in zip(cursor, orders):
+            part = (6, value) if field_path == DOCUMENT_ID else value_key(value)
+            if direction == DESCENDING and not reverse:
+                part = _Descending(part)
+            position.append(part)
+        position = tuple(position)
+        size = len(position)
+        # A cursor with fewer values than orders skips every document that
+        # equals it on those fields
+        if reverse:
+            keyed = [item for item in keyed if item[0][:size] < position]
+        else:
+            keyed = [item for item in keyed if item[0][:size] > position]
+
+    def sort_key(item):
+        return item[0]
+
+    if limit is not None:
+        select = heapq.nlargest if reverse else heapq.nsmallest
+        keyed = select(limit, keyed, key=sort_key)
+    else:
+        keyed.sort(key=sort_key, reverse=reverse)
+    return [(doc_id, data) for _, doc_id, data in keyed]
+
+
+def run_aggregation(documents: list, aggregations: tuple) -> list:
+    """
+    Evaluate ("count", None) and ("sum", field_path) aggregations over the
+    (doc_id, data) pairs a query returned.
+    """
+    values = []
+    for kind, field_path in aggregations:
+        if kind == "count":
+            values.append(len(documents))
+            continue
+        total = 0
+        for _, data in documents:
+            number = get_field(data, field_path)[1]
+            if isinstance(number, (int, float)) and not isinstance(number, bool):
+                total += number
+        values.append(total)
+    return values
+
+
+def _project(data: dict, field_paths: list) -> dict:
+    projected = {}
+    for field_path in field_paths:
+        found, value = get_field(data, field_path)
+        if found:
+            _set_field(projected, field_path.split("."), value)
+    return projected
+
+
+# ---------------------------
+# Writes
+# ---------------------------
+def _set_field(data: dict, parts: list, value) -> None:
+    for part in parts[:-1]:
+        child = data.get(part)
+        if not isinstance(child, dict):
+            child = data[part] = {}
+        data = child
+    data[parts[-1]] = value
+
+
+def _delete_field(data: dict, parts: list) -> None:
+    for part in parts[:-1]:
+        data = data.get(part)
+        if not isinstance(data, dict):
+            return
+    data.pop(parts[-1], None)
+
+
+def _transform(value, current):
+    """Resolve a write value against the field's current value."""
+    if value is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, transforms.Increment):
+        if isinstance(current, (int, float)) and not isinstance(current, bool):
+            return current + value.value
+        return value.value
+    if isinstance(value, transforms.ArrayUnion):
+        items = list(current) if isinstance(current, list) else []
+        return items + [item for item in value.values if item not in items]
+    if isinstance(value, transforms.ArrayRemove):
+        items = list(current) if isinstance(current, list) else []
+        return [item for item in items if item not in value.values]
+    if isinstance(value, dict):
+        return {
+            key: _transform(item, None)
+            for key, item in value.items()
+            if item is not transforms.DELETE_FIELD
+        }
+    if isinstance(value, list):
+        return [_transform(item, None) for item in value]
+    return value
+
+
+def _merge(current: dict, data: dict) -> dict:
+    """set(..., merge=True): nested maps are merged field by field."""
+    for key, value in data.items():
+        existing = current.get(key)
+        if value is transforms.DELETE_FIELD:
+            current.pop(key, None)
+        elif isinstance(value, dict) and isinstance(existing, dict):
+            current[key] = _merge(existing, value)
+        else:
+            current[key] = _transform(value, existing)
+    return current
+
+
+def _apply_write(current, write: tuple):
+    """Return the document data after a write (None when deleted)."""
+    op, reference, data, merge = write
+    if op == "delete":
+        return None
+    if op == "create":
+        if current is not None:
+            raise google_exceptions.AlreadyExists(
+                f"Document already exists: {reference.path}"
+            )
+        return _transform(data, None)
+    if op == "set":
+        if merge and current is not None:
+            return _merge(copy_value(current), data)
+        return _transform(data, None)
+
+    if current is None:
+        raise google_exceptions.NotFound(f"No document to update: {reference.path}")
+    updated = copy_value(current)
+    for field_path, value in data.items():
+        parts = field_path.split(".")
+        if value is transforms.DELETE_FIELD:
+            _delete_field(updated, parts)
+        else:
+            _set_field(updated, parts, _transform(value, get_field(updated, field_path)[1]))
+    return updated
+
+
+# ---------------------------
+# Snapshots and references
+# ---------------------------
+class DocumentSnapshot:
+    def __init__(self, reference, data: dict | None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def to_dict(self) -> dict | None:
+        return copy_value(self._data) if self._data is not None else None
+
+    def get(self, field_path: str):
+        found, value = get_field(self._data or {}, field_path)
+        if not found:
+            raise KeyError(f"'{field_path}' is not contained in the data")
+        return copy_value(value)
+
+
+class DocumentReference:
+    def __init__(self, client, collection_id: str, document_id: str):
+        self._client = client
+        self.collection_id = collection_id
+        self.id = document_id
+
+    @property
+    def path(self) -> str:
+        return f"{self.collection_id}/{self.id}"
+
+    @property
+    def parent(self):
+        return self._client.collection(self.collection_id)
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    def get(self, field_paths=None, transaction=None, **kwargs) -> DocumentSnapshot:
+        started = time.perf_counter()
+        data = self._client._store.get(self.collection_id, self.id)
+        # Named after the Firestore RPCs so /metrics reads the same on every backend
+        record_rpc(
+            "batch_get_documents",
+            time.perf_counter() - started,
+            reads=int(data is not None),
+        )
+        if data is not None and field_paths is not None:
+            data = _project(data, list(field_paths))
+        return DocumentSnapshot(self, data)
+
+    def create(self, document_data: dict):
+        self._write("create", document_data)
+
+    def set(self, document_data: dict, merge: bool = False):
+        self._write("set", document_data, merge)
+
+    def update(self, field_updates: dict, option=None):
+        self._write("update", field_updates)
+
+    def delete(self, option=None):
+        self._write("delete")
+
+    def _write(self, op: str, data=None, merge: bool = False):
+        batch = self._client.batch()
+        batch._writes.append((op, self, copy_value(data), merge))
+        batch.commit()
+
+    def on_snapshot(self, callback):
+        raise NotImplementedError("Snapshot listeners need the Firestore backend")
+
+
+# ---------------------------
+# Queries
+# ---------------------------
+class Query:
+    def __init__(
+        self,
+        client,
+        collection_id: str,
+        filters: tuple = (),
+        orders: tuple = (),
+        projection: list | None = None,
+        limit: int | None = None,
+        cursor=None,
+    ):
+        self._client = client
+        self._collection_id = collection_id
+        self._filters = filters
+        self._orders = orders
+        self._projection = projection
+        self._limit = limit
+        self._cursor = cursor
+
+    def _copy(self, **changes) -> "Query":
+        state = {
+            "filters": self._filters,
+            "orders": self._orders,
+            "projection": self._projection,
+            "limit": self._limit,
+            "cursor": self._cursor,
+            **changes,
+        }
+        return Query(self._client, self._collection_id, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, *, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        if op_string not in OPERATORS:
+            raise ValueError(f"Operator {op_string!r} is not supported")
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING):
+        if direction not in (ASCENDING, DESCENDING):
+            raise ValueError(f"Invalid direction {direction!r}")
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def select(self, field_paths):
+        return self._copy(projection=list(field_paths))
+
+    def limit(self, count: int):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=document_fields_or_snapshot)
+
+    def _effective_orders(self) -> tuple:
+        """Explicit orders plus the implicit ones Firestore adds."""
+        orders = self._orders
+        if not orders:
+            for field_path, op, _ in self._filters:
+                if op in RANGE_OPERATORS:
+                    orders = ((field_path, ASCENDING),)
+                    break
+        if not any(field == DOCUMENT_ID for field, _ in orders):
+            direction = orders[-1][1] if orders else ASCENDING
+            orders = orders + ((DOCUMENT_ID, direction),)
+        return orders
+
+    def _cursor_values(self, orders: tuple) -> tuple | None:
+        cursor = self._cursor
+        if cursor is None:
+            return None
+        values = []
+        for field_path, _ in orders:
+            if isinstance(cursor, DocumentSnapshot):
+                value = cursor.id if field_path == DOCUMENT_ID else cursor.get(field_path)
+            elif field_path in cursor:
+                value = cursor[field_path]
+            else:
+                break
+            if field_path == DOCUMENT_ID:
+                # Firestore accepts a document ID, reference or snapshot here
+                value = getattr(value, "id", value)
+            values.append(value)
+        return tuple(values)
+
+    def _execute(self, limit: int | None) -> list:
+        orders = self._effective_orders()
+        started = time.perf_counter()
+        documents = self._client._store.query(
+            self._collection_id,
+            self._filters,
+            orders,
+            self._cursor_values(orders),
+            limit,
+        )
+        record_rpc("run_query", time.perf_counter() - started, reads=len(documents))
+        return documents
+
+    def stream(self, transaction=None, **kwargs):
+        collection = self._client.collection(self._collection_id)
+        for doc_id, data in self._execute(self._limit):
+            if self._projection is not None:
+                data = _project(data, self._projection)
+            yield DocumentSnapshot(collection.document(doc_id), data)
+
+    def get(self, transaction=None, **kwargs) -> list:
+        return list(self.stream(transaction=transaction))
+
+    def count(self, alias: str | None = None):
+        return AggregationQuery(self).count(alias=alias)
+
+    def sum(self, field_ref: str, alias: str | None = None):
+        return AggregationQuery(self).sum(field_ref, alias=alias)
+
+
+class CollectionReference(Query):
+    def __init__(self, client, collection_id: str):
+        super().__init__(client, collection_id)
+        self.id = collection_id
+
+    def document(self, document_id: str | None = None) -> DocumentReference:
+        return DocumentReference(self._client, self.id, document_id or _auto_id())
+
+
+class AggregationQuery:
+    def __init__(self, query: Query, aggregations: tuple = ()):
+        self._query = query
+        self._aggregations = aggregations
+
+    def _add(self, kind: str, field_ref, alias):
+        alias = alias or f"field_{len(self._aggregations) + 1}"
+        return AggregationQuery(self._query, self._aggregations + ((kind, field_ref, alias),))
+
+    def count(self, alias: str | None = None):
+        return self._add("count", None, alias)
+
+    def sum(self, field_ref: str, alias: str | None = None):
+        return self._add("sum", field_ref, alias)
+
+    def get(self, transaction=None, retry=None, timeout=None, **kwargs) -> list:
+        query = self._query
+        orders = query._effective_orders()
+        started = time.perf_counter()
+        values = query._client._store.aggregate(
+            query._collection_id,
+            query._filters,
+            orders,
+            query._cursor_values(orders),
+            query._limit,
+            tuple((kind, field_ref) for kind, field_ref, _ in self._aggregations),
+        )
+        # Firestore bills an aggregation as at least one read
+        record_rpc("run_aggregation_query", time.perf_counter() - started, reads=1)
+        return [
+            [
+                AggregationResult(alias=alias, value=value)
+                for (_, _, alias), value in zip(self._aggregations, values)
+            ]
+        ]
+
+
+# ---------------------------
+# Batches and transactions
+# ---------------------------
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def create(self, reference: DocumentReference, document_data: dict):
+        self._writes.append(("create", reference, copy_value(document_data), False))
+
+    def set(self, reference: DocumentReference, document_data: dict, merge: bool = False):
+        self._writes.append(("set", reference, copy_value(document_data), merge))
+
+    def update(self, reference: DocumentReference, field_updates: dict, option=None):
+        self._writes.append(("update", reference, copy_value(field_updates), False))
+
+    def delete(self, reference: DocumentReference, option=None):
+        self._writes.append(("delete", reference, None, False))
+
+    def __len__(self):
+        return len(self._writes)
+
+    def commit(self, **kwargs) -> list:
+        """Apply every staged write atomically; none is applied on error."""
+        writes, self._writes = self._writes, []
+        store = self._client._store
+        started = time.perf_counter()
+        with store.atomic():
+            staged = {}
+            for write in writes:
+                reference = write[1]
+                key = (reference.collection_id, reference.id)
+                current = (
+                    staged[key]
+                    if key in staged
+                    else store.get(reference.collection_id, reference.id)
+                )
+                staged[key] = _apply_write(current, write)
+            store.write(staged)
+        record_rpc("commit", time.perf_counter() - started, writes=len(writes))
+        return []
+
+
+class Transaction(WriteBatch):
+    """
+    Reads see the store directly: transactional() holds the store's lock
+    for the whole function, so nothing can change underneath it.
+    """
+
+
+def run_transaction(to_wrap, transaction: Transaction, *args, **kwargs):
+    """Run a transactional function against a store and commit its writes."""
+    with transaction._client._store.atomic():
+        transaction._writes = []
+        result = to_wrap(transaction, *args, **kwargs)
+        transaction.commit()
+    return result
+
+
+class DocumentClient:
+    """Firestore-style client over a document store."""
+
+    def __init__(self, store):
+        self._store = store
+
+    def collection(self, collection_id: str) -> CollectionReference:
+        return CollectionReference(self, collection_id)
+
+    def document(self, document_path: str) -> DocumentReference:
+        collection_id, document_id = document_path.split("/")
+        return DocumentReference(self, collection_id, document_id)
+
+    def batch(self) -> WriteBatch:
+        return WriteBatch(self)
+
+    def transaction(self, **kwargs) -> Transaction:
+        return Transaction(self)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        for reference in references:
+            yield reference.get(field_paths=field_paths)
+
+
+# ---------------------------
+# Async facade
+# ---------------------------
+# Mirrors firestore_async on top of the synchronous classes above. Calls on an
+# in-memory store are quick and run on the event loop directly; a store that
+# sets `blocking` (disk I/O, locks shared with other processes) is called
+# from the threadpool so waiting on it never stalls the loop.
+
+# Set on the worker thread that runs an async transaction on a blocking store
+_in_store_thread = contextvars.ContextVar("in_store_thread", default=False)
+
+
+def _sync(value):
+    return getattr(value, "_sync", value)
+
+
+def _is_blocking(store) -> bool:
+    return getattr(store, "blocking", False) and not _in_store_thread.get()
+
+
+async def _call(store, function, *args, **kwargs):
+    """Call into the store, off the event loop if the store blocks."""
+    if _is_blocking(store):
+        return await run_in_threadpool(function, *args, **kwargs)
+    return function(*args, **kwargs)
+
+
+def _async_snapshot(snapshot: DocumentSnapshot) -> DocumentSnapshot:
+    snapshot.reference = AsyncDocumentReference(snapshot.reference)
+    return snapshot
+
+
+class AsyncDocumentReference:
+    def __init__(self, reference: DocumentReference):
+        self._sync = reference
+        self._store = reference._client._store
+        self.id = reference.id
+        self.path = reference.path
+
+    async def get(self, field_paths=None, transaction=None, **kwargs):
+        snapshot = await _call(self._store, self._sync.get, field_paths=field_paths)
+        return _async_snapshot(snapshot)
+
+    async def create(self, document_data: dict):
+        await _call(self._store, self._sync.create, document_data)
+
+    async def set(self, document_data: dict, merge: bool = False):
+        await _call(self._store, self._sync.set, document_data, merge=merge)
+
+    async def update(self, field_updates: dict, option=None):
+        await _call(self._store, self._sync.update, field_updates)
+
+    async def delete(self, option=None):
+        await _call(self._store, self._sync.delete)
+
+
+class AsyncAggregationQuery:
+    def __init__(self, query: AggregationQuery):
+        self._sync = query
+        self._store = query._query._client._store
+
+    def count(self, alias: str | None = None):
+        return AsyncAggregationQuery(self._sync.count(alias=alias))
+
+    def sum(self, field_ref: str, alias: str | None = None):
+        return AsyncAggregationQuery(self._sync.sum(field_ref, alias=alias))
+
+    async def get(self, transaction=None, retry=None, timeout=None, **kwargs):
+        return await _call(self._store, self._sync.get)
+
+
+class AsyncQuery:
+    def __init__(self, query: Query):
+        self._sync = query
+        self._store = query._client._store
+
+    def where(self, *args, **kwargs):
+        return AsyncQuery(self._sync.where(*args, **kwargs))
+
+    def order_by(self, field_path: str, direction: str = ASCENDING):
+        return AsyncQuery(self._sync.order_by(field_path, direction=direction))
+
+    def select(self, field_paths):
+        return AsyncQuery(self._sync.select(field_paths))
+
+    def limit(self, count: int):
+        return AsyncQuery(self._sync.limit(count))
+
+    def start_after(self, document_fields_or_snapshot):
+        return AsyncQuery(self._sync.start_after(document_fields_or_snapshot))
+
+    async def stream(self, transaction=None, **kwargs):
+        for snapshot in await _call(self._store, self._sync.get):
+            yield _async_snapshot(snapshot)
+
+    async def get(self, transaction=None, **kwargs) -> list:
+        snapshots = await _call(self._store, self._sync.get)
+        return [_async_snapshot(snapshot) for snapshot in snapshots]
+
+    def count(self, alias: str | None = None):
+        return AsyncAggregationQuery(self._sync.count(alias=alias))
+
+    def sum(self, field_ref: str, alias: str | None = None):
+        return AsyncAggregationQuery(self._sync.sum(field_ref, alias=alias))
+
+
+class AsyncCollectionReference(AsyncQuery):
+    def __init__(self, collection: CollectionReference):
+        super().__init__(collection)
+        self.id = collection.id
+
+    def document(self, document_id: str | None = None) -> AsyncDocumentReference:
+        return AsyncDocumentReference(self._sync.document(document_id))
+
+
+class AsyncWriteBatch:
+    def __init__(self, batch: WriteBatch):
+        self._sync = batch
+        self._store = batch._client._store
+
+    def create(self, reference, document_data: dict):
+        self._sync.create(_sync(reference), document_data)
+
+    def set(self, reference, document_data: dict, merge: bool = False):
+        self._sync.set(_sync(reference), document_data, merge=merge)
+
+    def update(self, reference, field_updates: dict, option=None):
+        self._sync.update(_sync(reference), field_updates)
+
+    def delete(self, reference, option=None):
+        self._sync.delete(_sync(reference))
+
+    async def commit(self, **kwargs) -> list:
+        return await _call(self._store, self._sync.commit)
+
+
+class AsyncTransaction(AsyncWriteBatch):
+    pass
+
+
+async def run_async_transaction(to_wrap, transaction: AsyncTransaction, *args, **kwargs):
+    """
+    Async counterpart of run_transaction. The store lock is held across the
+    function, which is safe because awaiting this facade never suspends.
+
+    On a blocking store the whole function runs on a worker thread with an
+    event loop of its own: the store's lock and connection belong to the
+    thread that opened the transaction, and waiting for them (another
+    request's commit, another process's write lock) must not stall the
+    server's loop.
+    """
+    store = transaction._store
+    if _is_blocking(store):
+        return await run_in_threadpool(
+            _run_transaction_in_thread, to_wrap, transaction, args, kwargs
+        )
+
+    with store.atomic():
+        transaction._sync._writes = []
+        result = await to_wrap(transaction, *args, **kwargs)
+        transaction._sync.commit()
+    return result
+
+
+def _run_transaction_in_thread(to_wrap, transaction, args, kwargs):
+    token = _in_store_thread.set(True)
+    try:
+        return asyncio.run(
+            run_async_transaction(to_wrap, transaction, *args, **kwargs)
+        )
+    finally:
+        _in_store_thread.reset(token)
+
+
+class AsyncDocumentClient:
+    """firestore_async-style client sharing a DocumentClient's store."""
+
+    def __init__(self, client: DocumentClient):
+        self._sync = client
+        self._store = client._store
+
+    def collection(self, collection_id: str) -> AsyncCollectionReference:
+        return AsyncCollectionReference(self._sync.collection(collection_id))
+
+    def document(self, document_path: str) -> AsyncDocumentReference:
+        return AsyncDocumentReference(self._sync.document(document_path))
+
+    def batch(self) -> AsyncWriteBatch:
+        return AsyncWriteBatch(self._sync.batch())
+
+    def transaction(self, **kwargs) -> AsyncTransaction:
+        return AsyncTransaction(self._sync.transaction())
+
+    async def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        references = [_sync(reference) for reference in references]
+        snapshots = await _call(
+            self._store, lambda: list(self._sync.get_all(references, field_paths))
+        )
+        for snapshot in snapshots:
+            yield _async_snapshot(snapshot)
@@ -0,0 +1,69 @@
+"""
+Thread-safe in-process document store.
+
+Documents live in one dict per collection and are lost when the process
+exits. Meant for load tests, profiling and local runs without a Firebase
+project: every read and write costs a dictionary operation instead of a
+Firestore RPC.
+"""
+
+import threading
+
+from app.storage.documents import run_aggregation, run_query
+
+
+class MemoryDocumentStore:
+    def __init__(self):
+        # Re-entrant so a transaction can commit while holding it
+        self._lock = threading.RLock()
+        self._collections = {}
+
+    def atomic(self):
+        """Context manager that excludes every other reader and writer."""
+        return self._lock
+
+    def get(self, collection_id: str, document_id: str) -> dict | None:
+        """
+        Stored data of a document, or None. The dict is shared: callers copy
+        it before handing it out and never modify it.
+        """
+        with self._lock:
+            return self._collections.get(collection_id, {}).get(document_id)
+
+    def write(self, documents: dict) -> None:
+        """Store {(collection_id, document_id): data} (None deletes)."""
+        with self._lock:
+            for (collection_id, document_id), data in documents.items():
+                collection = self._collections.setdefault(collection_id, {})
+                if data is None:
+                    collection.pop(document_id, None)
+                else:
+                    collection[document_id] = data
+
+    def query(
+        self,
+        collection_id: str,
+        filters: tuple,
+        orders: tuple,
+        cursor: tuple | None = None,
+        limit: int | None = None,
+    ) -> list:
+        with self._lock:
+            documents = list(self._collections.get(collection_id, {}).items())
+        return run_query(documents, filters, orders, cursor, limit)
+
+    def aggregate(
+        self,
+        collection_id: str,
+        filters: tuple,
+        orders: tuple,
+        cursor: tuple | None,
+        limit: int | None,
+        aggregations: tuple,
+    ) -> list:
+        documents = self.query(collection_id, filters, orders, cursor, limit)
+        return run_aggregation(documents, aggregations)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._collections.clear()
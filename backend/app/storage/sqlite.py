@@ -0,0 +1,402 @@
+"""
+SQLite document store for single-site installs.
+
+Every document is one row of the `documents` table, keyed by collection and
+ID, with its data kept as JSON in the same shape as in Firestore. Timestamps
+are stored as UTC ISO strings tagged with a private-use character, so they
+sort chronologically and come back as datetimes. Queries are translated to
+SQL on json_extract() expressions; the expression indexes below cover the
+list endpoints (active customers/items by created_at, invoices by
+created_at, invoice date, number and buyer), so reads stay sub-millisecond
+without a network round trip.
+
+The database runs in WAL mode: readers use one connection per thread and
+never wait on the writer, and writes and transactions take the write lock
+up front (BEGIN IMMEDIATE), which also serializes the invoice counter
+transaction across worker processes.
+"""
+
+import contextlib
+import logging
+import re
+import sqlite3
+import threading
+from datetime import datetime, timezone
+
+import orjson
+
+from app.storage.documents import (
+    DESCENDING,
+    DOCUMENT_ID,
+    run_aggregation,
+    run_query,
+)
+
+logger = logging.getLogger(__name__)
+
+# Prefix of stored timestamps; U+E000 is a private-use character that does
+# not occur in billing data
+TIMESTAMP_TAG = "\ue000"
+TIMESTAMP_TAG_END = "\ue001"
+
+BUSY_TIMEOUT_MS = 5000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (collection, id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS documents_active_created_at ON documents (
+    collection,
+    json_extract(data, '$.is_active'),
+    json_extract(data, '$.created_at')
+);
+CREATE INDEX IF NOT EXISTS documents_created_at ON documents (
+    collection, json_extract(data, '$.created_at')
+);
+CREATE INDEX IF NOT EXISTS documents_meta_created_at ON documents (
+    collection, json_extract(data, '$.meta.created_at')
+);
+CREATE INDEX IF NOT EXISTS documents_invoice_date ON documents (
+    collection, json_extract(data, '$.invoice_date')
+);
+CREATE INDEX IF NOT EXISTS documents_invoice_number ON documents (
+    collection, json_extract(data, '$.invoice_number')
+);
+CREATE INDEX IF NOT EXISTS documents_buyer_id ON documents (
+    collection,
+    json_extract(data, '$.buyer.id'),
+    json_extract(data, '$.meta.created_at')
+);
+"""
+
+_FIELD_NAME_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_NUMBER_TYPES = "('integer', 'real')"
+
+
+class _Unsupported(Exception):
+    """A query part that has no SQL translation; evaluated in Python instead."""
+
+
+# ---------------------------
+# Encoding
+# ---------------------------
+def _encode_default(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return TIMESTAMP_TAG + value.astimezone(timezone.utc).isoformat(
+            timespec="microseconds"
+        )
+    raise TypeError(f"Cannot store value of type {type(value).__name__}")
+
+
+def encode_document(data: dict) -> str:
+    return orjson.dumps(
+        data, default=_encode_default, option=orjson.OPT_PASSTHROUGH_DATETIME
+    ).decode()
+
+
+def _decode_value(value):
+    if isinstance(value, str):
+        if value.startswith(TIMESTAMP_TAG):
+            return datetime.fromisoformat(value[1:])
+        return value
+    if isinstance(value, dict):
+        return {key: _decode_value(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode_value(item) for item in value]
+    return value
+
+
+def decode_document(text: str) -> dict:
+    return _decode_value(orjson.loads(text))
+
+
+# ---------------------------
+# Query translation
+# ---------------------------
+def _field_sql(field_path: str) -> str:
+    if field_path == DOCUMENT_ID:
+        return "id"
+    parts = field_path.split(".")
+    if not all(_FIELD_NAME_RE.match(part) for part in parts):
+        raise _Unsupported(field_path)
+    # Literal paths (not parameters) so the expression indexes apply
+    return f"json_extract(data, '$.{field_path}')"
+
+
+def _type_sql(field_path: str, value) -> tuple:
+    """SQL restricting a field to the type of value, and the encoded value."""
+    if field_path == DOCUMENT_ID:
+        if not isinstance(value, str):
+            raise _Unsupported(field_path)
+        return "", value
+    json_type = f"json_type(data, '$.{field_path}')"
+    expression = _field_sql(field_path)
+    if isinstance(value, bool):
+        return f"{json_type} = '{'true' if value else 'false'}'", int(value)
+    if isinstance(value, (int, float)):
+        return f"{json_type} IN {_NUMBER_TYPES}", value
+    if isinstance(value, datetime):
+        return (
+            f"{expression} >= '{TIMESTAMP_TAG}' AND {expression} < '{TIMESTAMP_TAG_END}'",
+            _encode_default(value),
+        )
+    if isinstance(value, str):
+        return (
+            f"{json_type} = 'text' AND substr({expression}, 1, 1) != '{TIMESTAMP_TAG}'",
+            value,
+        )
+    raise _Unsupported(field_path)
+
+
+def _filter_sql(field_path: str, op: str, value) -> tuple:
+    expression = _field_sql(field_path)
+    if op == "==" and value is None:
+        return f"json_type(data, '$.{field_path}') = 'null'", []
+    if op not in ("==", "<", "<=", ">", ">="):
+        raise _Unsupported(op)
+    type_clause, encoded = _type_sql(field_path, value)
+    operator = "=" if op == "==" else op
+    clause = f"{expression} {operator} ?"
+    if type_clause:
+        clause = f"{clause} AND {type_clause}"
+    return clause, [encoded]
+
+
+def _cursor_value(field_path: str, value):
+    if field_path == DOCUMENT_ID:
+        return value
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return _encode_default(value)
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    raise _Unsupported(field_path)
+
+
+def _after_sql(expression: str, direction: str, value) -> tuple:
+    """Rows strictly after the cursor in one order column; null sorts first."""
+    # Comparisons with NULL are neither true nor false, so nulls are
+    # handled explicitly on both sides of the comparison
+    if direction == DESCENDING:
+        if value is None:
+            return "0", []
+        return f"({expression} < ? OR {expression} IS NULL)", [value]
+    if value is None:
+        return f"{expression} IS NOT NULL", []
+    return f"{expression} > ?", [value]
+
+
+def _equal_sql(expression: str, value) -> tuple:
+    if value is None:
+        return f"{expression} IS NULL", []
+    return f"{expression} = ?", [value]
+
+
+def _cursor_sql(orders: tuple, cursor: tuple) -> tuple:
+    orders = orders[: len(cursor)]
+    expressions = [_field_sql(field_path) for field_path, _ in orders]
+    values = [
+        _cursor_value(field_path, value) for (field_path, _), value in zip(orders, cursor)
+    ]
+    directions = {direction for _, direction in orders}
+    if (
+        len(directions) == 1
+        and None not in values
+        and all(field_path == DOCUMENT_ID for field_path, _ in orders[1:])
+    ):
+        # A row value comparison lets SQLite seek the index to the cursor;
+        # only the first column can hold nulls
+        operator = "<" if DESCENDING in directions else ">"
+        placeholders = ", ".join("?" for _ in values)
+        clause = f"({', '.join(expressions)}) {operator} ({placeholders})"
+        if DESCENDING in directions and orders[0][0] != DOCUMENT_ID:
+            clause = f"({clause} OR {expressions[0]} IS NULL)"
+        return clause, values
+
+    terms, params = [], []
+    for index, (_, direction) in enumerate(orders):
+        parts = []
+        for expression, value in zip(expressions[:index], values[:index]):
+            part, part_params = _equal_sql(expression, value)
+            parts.append(part)
+            params.extend(part_params)
+        part, part_params = _after_sql(expressions[index], direction, values[index])
+        parts.append(part)
+        params.extend(part_params)
+        terms.append(f"({' AND '.join(parts)})")
+    return f"({' OR '.join(terms)})", params
+
+
+def _compile(collection_id: str, filters: tuple, orders: tuple, cursor) -> tuple:
+    """Translate a query to (WHERE, ORDER BY, params), or raise _Unsupported."""
+    clauses, params = ["collection = ?"], [collection_id]
+    for field_path, op, value in filters:
+        clause, values = _filter_sql(field_path, op, value)
+        clauses.append(clause)
+        params.extend(values)
+    for field_path, _ in orders:
+        if field_path != DOCUMENT_ID:
+            # Like Firestore, documents without an order field are left out
+            clauses.append(f"json_type(data, '$.{field_path}') IS NOT NULL")
+    if cursor:
+        clause, values = _cursor_sql(orders, cursor)
+        clauses.append(clause)
+        params.extend(values)
+
+    order_by = ", ".join(
+        f"{_field_sql(field_path)} {'DESC' if direction == DESCENDING else 'ASC'}"
+        for field_path, direction in orders
+    )
+    return " AND ".join(clauses), order_by, params
+
+
+class SQLiteDocumentStore:
+    # Calls can wait on disk and on other processes' write locks, so the
+    # async client runs them off the event loop
+    blocking = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        # Serializes this process's writers; BEGIN IMMEDIATE does the same
+        # across processes
+        self._lock = threading.RLock()
+        self._depth = 0
+
+        connection = self._connection()
+        mode = connection.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        connection.executescript(_SCHEMA)
+        logger.info(f"SQLite document store at {path} (journal_mode={mode})")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.path, isolation_level=None, check_same_thread=False
+            )
+            connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    @contextlib.contextmanager
+    def atomic(self):
+        """
+        Run the block in one write transaction; nested calls join the
+        outermost one.
+        """
+        with self._lock:
+            connection = self._connection()
+            outermost = self._depth == 0
+            if outermost:
+                connection.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if outermost:
+                    connection.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if outermost:
+                connection.execute("COMMIT")
+
+    def get(self, collection_id: str, document_id: str) -> dict | None:
+        row = (
+            self._connection()
+            .execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?",
+                (collection_id, document_id),
+            )
+            .fetchone()
+        )
+        return decode_document(row[0]) if row is not None else None
+
+    def write(self, documents: dict) -> None:
+        """Store {(collection_id, document_id): data} (None deletes)."""
+        upserts, deletes = [], []
+        for (collection_id, document_id), data in documents.items():
+            if data is None:
+                deletes.append((collection_id, document_id))
+            else:
+                upserts.append((collection_id, document_id, encode_document(data)))
+
+        with self.atomic():
+            connection = self._connection()
+            if upserts:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO documents (collection, id, data) "
+                    "VALUES (?, ?, ?)",
+                    upserts,
+                )
+            if deletes:
+                connection.executemany(
+                    "DELETE FROM documents WHERE collection = ? AND id = ?", deletes
+                )
+
+    def _scan(self, collection_id: str) -> list:
+        rows = self._connection().execute(
+            "SELECT id, data FROM documents WHERE collection = ?", (collection_id,)
+        )
+        return [(document_id, decode_document(data)) for document_id, data in rows]
+
+    def query(
+        self,
+        collection_id: str,
+        filters: tuple,
+        orders: tuple,
+        cursor: tuple | None = None,
+        limit: int | None = None,
+    ) -> list:
+        try:
+            where, order_by, params = _compile(collection_id, filters, orders, cursor)
+        except _Unsupported:
+            return run_query(self._scan(collection_id), filters, orders, cursor, limit)
+
+        sql = f"SELECT id, data FROM documents WHERE {where} ORDER BY {order_by}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self._connection().execute(sql, params)
+        return [(document_id, decode_document(data)) for document_id, data in rows]
+
+    def aggregate(
+        self,
+        collection_id: str,
+        filters: tuple,
+        orders: tuple,
+        cursor: tuple | None,
+        limit: int | None,
+        aggregations: tuple,
+    ) -> list:
+        try:
+            where, order_by, params = _compile(collection_id, filters, orders, cursor)
+            columns = []
+            for kind, field_path in aggregations:
+                if kind == "count":
+                    columns.append("COUNT(*)")
+                else:
+                    columns.append(
+                        f"COALESCE(SUM(CASE WHEN json_type(data, '$.{field_path}') "
+                        f"IN {_NUMBER_TYPES} THEN {_field_sql(field_path)} END), 0)"
+                    )
+        except _Unsupported:
+            documents = run_query(
+                self._scan(collection_id), filters, orders, cursor, limit
+            )
+            return run_aggregation(documents, aggregations)
+
+        source = f"SELECT data FROM documents WHERE {where}"
+        if limit is not None:
+            source += f" ORDER BY {order_by} LIMIT ?"
+            params.append(limit)
+        sql = f"SELECT {', '.join(columns)} FROM ({source})"
+        return list(self._connection().execute(sql, params).fetchone())
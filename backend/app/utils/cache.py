@@ -0,0 +1,100 @@
+"""
+Process-level read-through cache with TTL and explicit invalidation
+"""
+
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Hashable
+
+DEFAULT_TTL_SECONDS = float(os.getenv("MASTER_DATA_CACHE_TTL", 300))
+
+_registry = {}
+
+
+class TTLCache:
+    """
+    Small thread-safe read-through cache.
+
+    Values are loaded on a miss and kept for `ttl` seconds or until they are
+    invalidated by a write. Intended for small, read-mostly data such as the
+    customer and item master lists.
+    """
+
+    def __init__(self, name: str, ttl: float = DEFAULT_TTL_SECONDS):
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        # Bumped on every invalidation so a load that raced with a write is
+        # not stored over the newer state
+        self._generation = 0
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        _registry[name] = self
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for key, calling loader() on a miss.
+
+        Args:
+            key: Cache key
+            loader: Zero-argument function producing the value
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+            generation = self._generation
+
+        value = loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    async def get_or_load_async(
+        self, key: Hashable, loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Like get_or_load, for a coroutine function loader."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+            generation = self._generation
+
+        value = await loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """Drop the given keys, or every entry when called without keys."""
+        with self._lock:
+            if keys:
+                for key in keys:
+                    self._entries.pop(key, None)
+            else:
+                self._entries.clear()
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters of every cache in this process, keyed by name."""
+    return {name: cache.stats() for name, cache in _registry.items()}
@@ -0,0 +1,67 @@
+"""
+Response compression that leaves already-compressed formats alone.
+
+PDFs and ZIP archives do not shrink any further, and re-encoding them would
+give the same URL different bytes per Accept-Encoding, so the PDF endpoint's
+strong ETag would no longer identify one representation. Neither Starlette's
+GZipMiddleware (as pinned) nor brotli-asgi can exclude content types, so
+SelectiveCompressionMiddleware wraps either of them: once the response starts
+it sends responses of an excluded type straight to the client, bypassing the
+compressor, and everything else through it.
+"""
+
+from starlette.datastructures import Headers
+
+# Content types sent as they are
+UNCOMPRESSED_CONTENT_TYPES = ("application/pdf", "application/zip")
+
+# Scope key holding the client-facing send of the current request
+_CLIENT_SEND = "spm.client_send"
+
+
+class SelectiveCompressionMiddleware:
+    """ASGI middleware applying a compression middleware by content type."""
+
+    def __init__(
+        self,
+        app,
+        compressor,
+        exclude_content_types: tuple = UNCOMPRESSED_CONTENT_TYPES,
+        **options,
+    ):
+        """
+        Args:
+            app: ASGI application
+            compressor: Compression middleware class (GZipMiddleware or
+                BrotliMiddleware)
+            exclude_content_types: Media types never compressed
+            **options: Passed to the compressor
+        """
+        self.app = app
+        self.exclude_content_types = frozenset(exclude_content_types)
+        self.compressed = compressor(self._dispatch, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        await self.compressed({**scope, _CLIENT_SEND: send}, receive, send)
+
+    async def _dispatch(self, scope, receive, send):
+        """Run the app behind the compressor, routing its messages by type."""
+        client_send = scope[_CLIENT_SEND]
+        target = send
+
+        async def send_by_content_type(message):
+            nonlocal target
+            if message["type"] == "http.response.start":
+                content_type = Headers(raw=message.get("headers", [])).get(
+                    "content-type", ""
+                )
+                media_type = content_type.split(";", 1)[0].strip().lower()
+                if media_type in self.exclude_content_types:
+                    target = client_send
+            await target(message)
+
+        await self.app(scope, receive, send_by_content_type)
@@ -0,0 +1,144 @@
+"""
+Helpers for HTTP conditional requests (ETag / Last-Modified validators)
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+from app.utils.response import ORJSONResponse
+
+
+def format_etag(value: str, weak: bool = False) -> str:
+    """Quote a validator value as an ETag header value."""
+    return f'{"W/" if weak else ""}"{value}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check an If-None-Match request header against an ETag.
+
+    Uses the weak comparison required for If-None-Match (RFC 9110 13.1.2),
+    so W/"x" matches "x".
+
+    Args:
+        if_none_match: Raw If-None-Match header value (may be None)
+        etag: Current ETag of the resource, quoted
+
+    Returns:
+        bool: True if the client's copy is current
+    """
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    current = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == current:
+            return True
+    return False
+
+
+# ---------------------------
+# Conditional JSON responses
+# ---------------------------
+# Browsers keep the response but revalidate it on every use, and the edge
+# never shares it between clients
+DEFAULT_CACHE_CONTROL = os.getenv("HTTP_CACHE_CONTROL", "private, no-cache")
+
+
+def content_etag(body: bytes) -> str:
+    """
+    Weak ETag derived from a response body.
+
+    Weak because the same JSON may be sent with different content encodings.
+    """
+    return format_etag(hashlib.sha256(body).hexdigest()[:32], weak=True)
+
+
+def latest_timestamp(*values) -> datetime | None:
+    """Most recent of the given datetimes (None values are ignored)."""
+    timestamps = [value for value in values if isinstance(value, datetime)]
+    if not timestamps:
+        return None
+    return max(
+        value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        for value in timestamps
+    )
+
+
+def not_modified_since(if_modified_since: str | None, last_modified: datetime) -> bool:
+    """
+    Check an If-Modified-Since request header against a modification time.
+
+    HTTP dates have one-second resolution, so sub-second differences are
+    ignored. An unparsable header is treated as absent.
+    """
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return int(last_modified.timestamp()) <= int(since.timestamp())
+
+
+def conditional_json_response(
+    request: Request,
+    content,
+    last_modified: datetime | None = None,
+    cache_control: str = DEFAULT_CACHE_CONTROL,
+) -> Response:
+    """
+    Serialize content as JSON with validators, answering 304 when the
+    client's cached copy is still current.
+
+    The ETag is a hash of the serialized body, so it changes whenever any
+    returned field does. Last-Modified is only sent when the caller passes
+    the resource's modification time; list endpoints should not, since a
+    removed entry does not move the newest timestamp. If-None-Match takes
+    precedence over If-Modified-Since (RFC 9110 13.2.2).
+
+    Args:
+        request: Incoming request (for its conditional headers)
+        content: JSON-compatible response content
+        last_modified: Modification time of a single resource, if known
+        cache_control: Cache-Control header value
+
+    Returns:
+        Response: 200 with the JSON body, or an empty 304
+    """
+    response = ORJSONResponse(content=content)
+    etag = content_etag(response.body)
+
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(
+            last_modified.astimezone(timezone.utc), usegmt=True
+        )
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = etag_matches(if_none_match, etag)
+    elif last_modified is not None:
+        not_modified = not_modified_since(
+            request.headers.get("if-modified-since"), last_modified
+        )
+    else:
+        not_modified = False
+
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return response
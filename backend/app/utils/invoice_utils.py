@@ -2,8 +2,8 @@
 Utility functions for invoice generation and management
 """
 
-from datetime import datetime
-from typing import Tuple
+from datetime import date, datetime
+from typing import List, Tuple
 
 
 def get_current_financial_year() -> str:
@@ -17,18 +17,30 @@ def get_current_financial_year() -> str:
     Returns:
         str: Financial year in format "YYYY-YYYY"
     """
-    today = datetime.now()
-    current_year = today.year
-    current_month = today.month
+    return get_financial_year(datetime.now())
 
-    # If current date is on or after April 1, FY starts this calendar year
-    if current_month >= 4:
-        fy_start = current_year
-        fy_end = current_year + 1
-    # If current date is before April 1, FY started last calendar year
+
+def get_financial_year(day: date) -> str:
+    """
+    Get the Indian financial year a given date falls in.
+
+    Args:
+        day: Date or datetime
+
+    Returns:
+        str: Financial year in format "YYYY-YYYY"
+    """
+    year = day.year
+    month = day.month
+
+    # If the date is on or after April 1, FY starts this calendar year
+    if month >= 4:
+        fy_start = year
+        fy_end = year + 1
+    # If the date is before April 1, FY started last calendar year
     else:
-        fy_start = current_year - 1
-        fy_end = current_year
+        fy_start = year - 1
+        fy_end = year
 
     return f"{fy_start}-{fy_end}"
 
@@ -52,3 +64,84 @@ def format_invoice_number(inv_no: int, financial_year: str) -> str:
     inv_seq = str(inv_no).zfill(4)
 
     return f"INV/{fy_short}/{inv_seq}"
+
+
+def invoice_revenue(invoice: dict | None) -> float:
+    """Revenue contributed by one invoice document (totals.total)."""
+    if not invoice:
+        return 0.0
+    totals = invoice.get("totals") or {}
+    return float(totals.get("total", 0) or 0)
+
+
+def parse_invoice_date(value) -> date | None:
+    """
+    Parse an invoice_date value (YYYY-MM-DD string or datetime) into a date.
+
+    Returns:
+        date | None: Parsed date, or None if the value is missing or invalid
+    """
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str):
+        try:
+            return date.fromisoformat(value[:10])
+        except ValueError:
+            return None
+    return None
+
+
+def parse_financial_year(financial_year: str) -> Tuple[int, int]:
+    """
+    Validate a financial year string and return its start and end years.
+
+    Args:
+        financial_year: Financial year in format "YYYY-YYYY"
+
+    Returns:
+        tuple: (start_year, end_year)
+
+    Raises:
+        ValueError: If the string is not a valid financial year
+    """
+    try:
+        start, end = (int(part) for part in financial_year.split("-"))
+    except (ValueError, AttributeError):
+        raise ValueError(f"Invalid financial year: {financial_year}")
+
+    if end != start + 1:
+        raise ValueError(f"Invalid financial year: {financial_year}")
+
+    return start, end
+
+
+def get_financial_year_range(financial_year: str) -> Tuple[date, date]:
+    """
+    First and last day of a financial year.
+
+    Args:
+        financial_year: Financial year in format "YYYY-YYYY"
+
+    Returns:
+        tuple: (April 1 of the start year, March 31 of the end year)
+    """
+    start, end = parse_financial_year(financial_year)
+    return date(start, 4, 1), date(end, 3, 31)
+
+
+def get_financial_year_months(financial_year: str) -> List[Tuple[int, int]]:
+    """
+    List the (year, month) pairs of a financial year, April to March.
+
+    Args:
+        financial_year: Financial year in format "YYYY-YYYY"
+
+    Returns:
+        list: Twelve (year, month) tuples in calendar order
+    """
+    start, end = parse_financial_year(financial_year)
+    return [(start, month) for month in range(4, 13)] + [
+        (end, month) for month in range(1, 4)
+    ]
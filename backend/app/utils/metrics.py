@@ -0,0 +1,394 @@
+"""
+Per-request timing and storage instrumentation, exported as Server-Timing
+headers and Prometheus metrics.
+
+RequestMetricsMiddleware opens a RequestMetrics for every HTTP request and
+keeps it in a context variable, so it follows the request into the
+threadpool and into gathered coroutines. The storage clients record every
+RPC (documents read and written, time spent) with record_rpc(), TimedRoute
+splits the route handler into validation, endpoint and serialization, and
+other code adds its own phases with record_phases(). When the response
+starts the request's totals go out as a Server-Timing header and are added
+to the process-wide counters rendered at /metrics.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from typing import Callable
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Route label of RPCs made outside any request (listeners, scripts)
+BACKGROUND_ROUTE = "background"
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+class RequestMetrics:
+    """Storage RPCs and phase timings of one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.endpoint_span = None
+        # RPC method -> [calls, seconds, documents read, documents written]
+        self.rpcs = {}
+        # Phase name -> seconds
+        self.phases = {}
+        # RPCs can be recorded from several threads of the same request
+        self._lock = threading.Lock()
+
+    def add_rpc(self, method: str, seconds: float, reads: int, writes: int) -> None:
+        with self._lock:
+            totals = self.rpcs.setdefault(method, [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] += reads
+            totals[3] += writes
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def storage_totals(self) -> tuple:
+        """(RPCs, seconds, documents read, documents written) of the request."""
+        with self._lock:
+            totals = list(self.rpcs.values())
+        return (
+            sum(total[0] for total in totals),
+            sum(total[1] for total in totals),
+            sum(total[2] for total in totals),
+            sum(total[3] for total in totals),
+        )
+
+    def server_timing(self) -> str:
+        rpcs, seconds, reads, writes = self.storage_totals()
+        entries = {"total": time.perf_counter() - self.started}
+        with self._lock:
+            entries.update(self.phases)
+        timing = format_server_timing(
+            {name: value * 1000 for name, value in entries.items()}
+        )
+        return (
+            f'{timing}, db;dur={seconds * 1000:.1f};desc="{rpcs} rpc, '
+            f'{reads} read, {writes} write"'
+        )
+
+
+def format_server_timing(timings: dict) -> str:
+    """Format phase timings (ms) as a Server-Timing header value."""
+    return ", ".join(f"{name};dur={duration:.1f}" for name, duration in timings.items())
+
+
+def current_request_metrics() -> RequestMetrics | None:
+    return _current.get()
+
+
+def record_rpc(method: str, seconds: float, reads: int = 0, writes: int = 0) -> None:
+    """Record one storage RPC against the current request (or the background)."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_rpc(method, seconds, reads, writes)
+    else:
+        registry.observe_rpcs(BACKGROUND_ROUTE, {method: [1, seconds, reads, writes]})
+
+
+def record_phases(timings: dict) -> None:
+    """Add phase timings in milliseconds (e.g. PDF html/pdf) to the current request."""
+    metrics = _current.get()
+    if metrics is not None:
+        for name, duration in timings.items():
+            metrics.add_phase(name, duration / 1000)
+
+
+# ---------------------------
+# Process-wide registry
+# ---------------------------
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    """Counters and histograms aggregated over every request of the process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (method, route, status) -> count
+        self._requests = {}
+        # (method, route) -> [bucket counts..., sum, count]
+        self._durations = {}
+        # (route, phase) -> [seconds, count]
+        self._phases = {}
+        # (route, rpc) -> [calls, seconds, reads, writes]
+        self._rpcs = {}
+        self._collectors = []
+
+    def observe_request(
+        self, method: str, route: str, status: int, metrics: RequestMetrics
+    ) -> None:
+        elapsed = time.perf_counter() - metrics.started
+        with self._lock:
+            key = (method, route, status)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+            histogram = self._durations.setdefault(
+                (method, route), [0] * len(DURATION_BUCKETS) + [0.0, 0]
+            )
+            for index, bound in enumerate(DURATION_BUCKETS):
+                if elapsed <= bound:
+                    histogram[index] += 1
+            histogram[-2] += elapsed
+            histogram[-1] += 1
+
+            for phase, seconds in metrics.phases.items():
+                totals = self._phases.setdefault((route, phase), [0.0, 0])
+                totals[0] += seconds
+                totals[1] += 1
+        self.observe_rpcs(route, metrics.rpcs)
+
+    def observe_rpcs(self, route: str, rpcs: dict) -> None:
+        with self._lock:
+            for method, values in rpcs.items():
+                totals = self._rpcs.setdefault((route, method), [0, 0.0, 0, 0])
+                for index, value in enumerate(values):
+                    totals[index] += value
+
+    def register_collector(self, collector: Callable[[], list]) -> None:
+        """
+        Add a function returning extra metric families to render, each as
+        (name, type, help, [(labels, value), ...]).
+        """
+        self._collectors.append(collector)
+
+    def _families(self) -> list:
+        with self._lock:
+            requests = dict(self._requests)
+            durations = {key: list(value) for key, value in self._durations.items()}
+            phases = {key: list(value) for key, value in self._phases.items()}
+            rpcs = {key: list(value) for key, value in self._rpcs.items()}
+
+        duration_samples = []
+        for (method, route), histogram in sorted(durations.items()):
+            labels = {"method": method, "route": route}
+            for bound, count in zip(DURATION_BUCKETS, histogram):
+                duration_samples.append(
+                    ("_bucket", {**labels, "le": _format_value(bound)}, count)
+                )
+            duration_samples.append(
+                ("_bucket", {**labels, "le": "+Inf"}, histogram[-1])
+            )
+            duration_samples.append(("_sum", labels, histogram[-2]))
+            duration_samples.append(("_count", labels, histogram[-1]))
+
+        def rpc_samples(index):
+            return [
+                ({"route": route, "rpc": method}, values[index])
+                for (route, method), values in sorted(rpcs.items())
+            ]
+
+        return [
+            (
+                "spm_http_requests_total",
+                "counter",
+                "HTTP requests by route and status",
+                [
+                    ({"method": method, "route": route, "status": status}, count)
+                    for (method, route, status), count in sorted(requests.items())
+                ],
+            ),
+            (
+                "spm_http_request_duration_seconds",
+                "histogram",
+                "HTTP request duration",
+                duration_samples,
+            ),
+            (
+                "spm_request_phase_seconds_total",
+                "counter",
+                "Time spent per request phase (validate, endpoint, serialize, html, pdf)",
+                [
+                    ({"route": route, "phase": phase}, values[0])
+                    for (route, phase), values in sorted(phases.items())
+                ],
+            ),
+            ("spm_storage_rpcs_total", "counter", "Storage RPCs", rpc_samples(0)),
+            (
+                "spm_storage_rpc_seconds_total",
+                "counter",
+                "Time spent waiting on storage RPCs",
+                rpc_samples(1),
+            ),
+            (
+                "spm_storage_documents_read_total",
+                "counter",
+                "Documents returned by storage reads",
+                rpc_samples(2),
+            ),
+            (
+                "spm_storage_documents_written_total",
+                "counter",
+                "Documents written or deleted",
+                rpc_samples(3),
+            ),
+        ]
+
+    def render(self) -> str:
+        """Prometheus text exposition of every metric."""
+        families = self._families()
+        for collector in self._collectors:
+            families.extend(collector())
+
+        lines = []
+        for name, metric_type, help_text, samples in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for sample in samples:
+                if len(sample) == 3:
+                    suffix, labels, value = sample
+                else:
+                    suffix, (labels, value) = "", sample
+                lines.append(f"{name}{suffix}{_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# ---------------------------
+# Middleware and route class
+# ---------------------------
+def _route_label(scope) -> str:
+    """Route template of a request, e.g. /api/v1/invoices/{invoice_id}."""
+    if scope.get("route") is None:
+        return "unmatched"
+    # Rebuilt from the path: scope["route"] may not carry the router prefixes
+    names = {str(value): name for name, value in scope.get("path_params", {}).items()}
+    return "/".join(
+        f"{{{names[segment]}}}" if segment in names else segment
+        for segment in scope["path"].split("/")
+    )
+
+
+class RequestMetricsMiddleware:
+    """
+    ASGI middleware that collects a RequestMetrics per HTTP request, sends
+    it as a Server-Timing header and adds it to the registry.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", []))
+                headers = MutableHeaders(raw=message["headers"])
+                headers["Server-Timing"] = metrics.server_timing()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            registry.observe_request(
+                scope["method"], _route_label(scope), status, metrics
+            )
+
+
+def _timed_endpoint(endpoint):
+    """Wrap an endpoint so the request records when it started and ended."""
+    if getattr(endpoint, "_timed", False):
+        # include_router re-creates the route with the wrapped endpoint
+        return endpoint
+
+    if asyncio.iscoroutinefunction(endpoint):
+
+        @functools.wraps(endpoint)
+        async def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                metrics = _current.get()
+                if metrics is not None:
+                    metrics.endpoint_span = (started, time.perf_counter())
+
+        timed._timed = True
+        return timed
+
+    @functools.wraps(endpoint)
+    def timed_sync(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            metrics = _current.get()
+            if metrics is not None:
+                metrics.endpoint_span = (started, time.perf_counter())
+
+    timed_sync._timed = True
+    return timed_sync
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that splits handler time into validate (parameter parsing and
+    Pydantic validation), endpoint and serialize (response model and
+    encoding) phases of the current RequestMetrics.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        super().__init__(path, _timed_endpoint(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            metrics = _current.get()
+            if metrics is None:
+                return await handler(request)
+
+            started = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                finished = time.perf_counter()
+                span = metrics.endpoint_span
+                if span is None:
+                    # Rejected before the endpoint ran (e.g. a 422)
+                    metrics.add_phase("validate", finished - started)
+                else:
+                    metrics.add_phase("validate", span[0] - started)
+                    metrics.add_phase("endpoint", span[1] - span[0])
+                    metrics.add_phase("serialize", finished - span[1])
+
+        return timed_handler
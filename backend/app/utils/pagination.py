@@ -0,0 +1,80 @@
+"""
+Utility functions for keyset (cursor) pagination over Firestore queries
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict) and "$dt" in value:
+        return datetime.fromisoformat(value["$dt"])
+    return value
+
+
+def encode_cursor(values: List[Any], doc_id: str, order: str | None = None) -> str:
+    """
+    Build an opaque cursor from the order-by values of the last document on a page.
+
+    Args:
+        values: Values of the order-by fields, in query order
+        doc_id: Document ID, used as the tie-breaker
+        order: Optional name of the ordering, checked when the cursor is
+            decoded so a cursor cannot be replayed against a different sort
+
+    Returns:
+        str: URL-safe cursor string
+    """
+    payload = {"v": [_encode_value(v) for v in values], "id": doc_id}
+    if order:
+        payload["o"] = order
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, order: str | None = None) -> Tuple[List[Any], str]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor: Cursor string
+        order: Ordering the cursor must have been created for, if any
+
+    Returns:
+        tuple: (order-by values, document ID)
+
+    Raises:
+        ValueError: If the cursor is malformed or belongs to another ordering
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        values = [_decode_value(v) for v in payload["v"]]
+        doc_id = payload["id"]
+    except Exception as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+    if not isinstance(doc_id, str) or not doc_id:
+        raise ValueError("Invalid pagination cursor")
+    if order and payload.get("o", order) != order:
+        raise ValueError("Pagination cursor does not match the requested filters")
+
+    return values, doc_id
+
+
+def clamp_page_size(limit: int | None) -> int:
+    """Clamp a requested page size to the allowed range."""
+    if not limit or limit < 1:
+        return DEFAULT_PAGE_SIZE
+    return min(limit, MAX_PAGE_SIZE)
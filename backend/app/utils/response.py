@@ -1,4 +1,11 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any
+
+import orjson
 from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
 from app.schemas.common import SuccessResponse, ErrorResponse
 
 
@@ -15,3 +22,32 @@ def error_response(
         status_code=status_code,
         detail={"status": "error", "message": message, "detail": detail},
     )
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Serialize the types orjson does not handle itself."""
+    # Firestore timestamps are DatetimeWithNanoseconds, a datetime subclass
+    # orjson rejects; emit the same ISO format jsonable_encoder produces
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, Decimal):
+        return float(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson.
+
+    Accepts Firestore documents and Pydantic models as they are, so handlers
+    that build the response themselves can skip jsonable_encoder entirely.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS
+        )
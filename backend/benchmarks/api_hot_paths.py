@@ -0,0 +1,394 @@
+"""
+API hot path benchmark.
+
+Runs the FastAPI app in-process (Starlette TestClient, no network) on a
+local storage backend and times the requests the UI depends on:
+
+- invoice_create: POST /invoices/ (counter transaction + invoice + stats)
+- invoice_list_<n>, invoice_list_buyer_<n>: first page of GET /invoices/,
+  unfiltered and by buyer, with n invoices stored (1k/10k/100k by default)
+- dashboard_stats: GET /dashboard/stats (materialized document)
+- dashboard_recompute: the aggregation queries behind a stats rebuild
+- customer_list, item_list: GET /customers/ and /items/ with the cache
+  dropped before every request
+- pdf_html_<n>, pdf_render_<n>: SPM_bill.html rendered with Jinja2 only,
+  and to PDF with WeasyPrint, for 1/15/50-line invoices
+
+Each scenario reports p50/p95/p99 latency, throughput and the peak RSS of
+the process so far. With --baseline the p95 of every scenario is compared
+with a stored run, and the exit status is 1 if any regressed by more than
+--threshold.
+
+Runs on the SQLite backend by default, whose indexes make list latency
+depend on page size rather than collection size, as on Firestore; use
+--backend memory to leave out storage I/O entirely. The test client needs
+httpx (pip install httpx).
+
+    python -m benchmarks.api_hot_paths
+    python -m benchmarks.api_hot_paths --backend memory --sizes 1000 10000
+    python -m benchmarks.api_hot_paths --save-baseline benchmarks/baseline.json
+    python -m benchmarks.api_hot_paths --baseline benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+API = "/api/v1"
+BULK_CHUNK = 5000
+BUYER_COUNT = 50
+PDF_LINE_COUNTS = (1, 15, 50)
+
+
+# ---------------------------
+# Measurement
+# ---------------------------
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def measure(
+    name: str,
+    fn,
+    iterations: int,
+    max_seconds: float,
+    min_iterations: int = 20,
+    warmup: int = 3,
+) -> dict:
+    """
+    Time fn() up to `iterations` times, stopping early after max_seconds
+    once min_iterations samples are in.
+    """
+    for _ in range(warmup):
+        fn()
+
+    samples = []
+    started = time.perf_counter()
+    while len(samples) < iterations:
+        call_started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - call_started) * 1000)
+        if len(samples) >= min_iterations and time.perf_counter() - started > max_seconds:
+            break
+    elapsed = time.perf_counter() - started
+
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "name": name,
+        "iterations": len(samples),
+        "p50_ms": cuts[49],
+        "p95_ms": cuts[94],
+        "p99_ms": cuts[98],
+        "throughput": len(samples) / elapsed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def expect_ok(response):
+    if response.status_code != 200:
+        raise RuntimeError(
+            f"{response.request.method} {response.request.url} answered "
+            f"{response.status_code}: {response.text[:200]}"
+        )
+    return response
+
+
+# ---------------------------
+# Data
+# ---------------------------
+def buyer(index: int) -> dict:
+    return {
+        "id": f"bench-buyer-{index}",
+        "name": f"Buyer {index} Industries",
+        "gstin": f"33ABCDE{index:04d}F1Z5",
+        "address": "12, Avinashi Road, Coimbatore",
+    }
+
+
+def invoice_payload(rng: random.Random, lines: int = 5) -> dict:
+    party = buyer(rng.randrange(BUYER_COUNT))
+    items = []
+    for line in range(lines):
+        quantity = rng.randint(1, 20)
+        rate = round(rng.uniform(50, 5000), 2)
+        items.append(
+            {
+                "item_id": f"bench-item-{line}",
+                "name": f"Machined part {line}",
+                "hsn": "8483",
+                "uom": "NOS",
+                "quantity": quantity,
+                "rate": rate,
+                "gst_percentage": 18,
+                "amount": round(quantity * rate, 2),
+            }
+        )
+    subtotal = round(sum(item["amount"] for item in items), 2)
+    tax = round(subtotal * 0.09, 2)
+    total = round(subtotal + 2 * tax, 2)
+    invoice_date = date(2025, 4, 1) + timedelta(days=rng.randrange(365))
+    return {
+        "invoice_date": invoice_date.isoformat(),
+        "po_number": f"PO-{rng.randrange(1000)}",
+        "buyer": party,
+        "consignee": party,
+        "items": items,
+        "totals": {
+            "subtotal": subtotal,
+            "sgst": tax,
+            "cgst": tax,
+            "round_off": round(round(total) - total, 2),
+            "rounded_total": round(total),
+            "total": total,
+        },
+    }
+
+
+def seed_master_data(db, count: int) -> None:
+    created_at = datetime.now(timezone.utc)
+    batch = db.batch()
+    for index in range(count):
+        stamp = created_at - timedelta(seconds=index)
+        batch.set(
+            db.collection("customers").document(f"bench-customer-{index}"),
+            {
+                "name": f"Customer {index}",
+                "email": f"customer{index}@example.com",
+                "phone": f"98{index:08d}",
+                "address": "Coimbatore",
+                "gstin": f"33ABCDE{index:04d}F1Z5",
+                "panNumber": None,
+                "is_active": True,
+                "created_at": stamp,
+                "updated_at": None,
+            },
+        )
+        batch.set(
+            db.collection("items").document(f"bench-item-{index}"),
+            {
+                "name": f"Item {index}",
+                "hsn_sac": "8483",
+                "uom": "NOS",
+                "rate": "250",
+                "gst_percentage": "18",
+                "description": "Machined part",
+                "is_active": True,
+                "created_at": stamp,
+                "updated_at": None,
+            },
+        )
+    batch.commit()
+
+
+def top_up_invoices(invoice_service, rng: random.Random, current: int, target: int) -> int:
+    """Bulk-create invoices until `target` exist; returns the new count."""
+    while current < target:
+        chunk = min(BULK_CHUNK, target - current)
+        invoice_service.create_invoices_bulk(
+            [invoice_payload(rng) for _ in range(chunk)]
+        )
+        current += chunk
+    return current
+
+
+def size_label(size: int) -> str:
+    return f"{size // 1000}k" if size % 1000 == 0 else str(size)
+
+
+# ---------------------------
+# Scenarios
+# ---------------------------
+def run_suite(args) -> list:
+    # Imported here so STORAGE_BACKEND is set before the app picks a client
+    from fastapi.testclient import TestClient
+
+    from app.api.v1.customers import customers_cache
+    from app.api.v1.invoices import invoice_service
+    from app.api.v1.items import items_cache
+    from app.core.firebase import get_firestore
+    from app.main import app
+    from app.services.dashboard_service import DashboardService
+    from app.services.pdf_service import get_pdf_renderer
+
+    rng = random.Random(args.seed)
+    client = TestClient(app)
+    db = get_firestore()
+    results = []
+
+    def run(name, fn, iterations=args.iterations):
+        result = measure(name, fn, iterations, args.max_seconds)
+        print_result(result)
+        results.append(result)
+        return result
+
+    seed_master_data(db, args.master_records)
+
+    def create_invoice():
+        expect_ok(client.post(f"{API}/invoices/", json=invoice_payload(rng)))
+
+    created = run("invoice_create", create_invoice)
+    # Including the warm-up requests
+    stored = 3 + created["iterations"]
+
+    def list_customers():
+        customers_cache.invalidate()
+        expect_ok(client.get(f"{API}/customers/"))
+
+    def list_items():
+        items_cache.invalidate()
+        expect_ok(client.get(f"{API}/items/"))
+
+    run("customer_list", list_customers)
+    run("item_list", list_items)
+
+    for size in sorted(args.sizes):
+        started = time.perf_counter()
+        stored = top_up_invoices(invoice_service, rng, stored, size)
+        print(f"  (seeded {stored} invoices in {time.perf_counter() - started:.1f} s)")
+        label = size_label(size)
+        run(
+            f"invoice_list_{label}",
+            lambda: expect_ok(client.get(f"{API}/invoices/?limit=50")),
+        )
+        run(
+            f"invoice_list_buyer_{label}",
+            lambda: expect_ok(
+                client.get(f"{API}/invoices/?limit=50&buyer_id={buyer(7)['id']}")
+            ),
+        )
+
+    dashboard_service = DashboardService()
+    run("dashboard_stats", lambda: expect_ok(client.get(f"{API}/dashboard/stats")))
+    run("dashboard_recompute", dashboard_service.compute_stats)
+
+    renderer = get_pdf_renderer()
+    for lines in PDF_LINE_COUNTS:
+        invoice = invoice_payload(rng, lines=lines)
+        invoice["invoice_number"] = "INV/25-26/0001"
+        run(
+            f"pdf_html_{lines}",
+            lambda invoice=invoice: renderer.render_html(invoice),
+            args.pdf_iterations,
+        )
+        try:
+            renderer.render(invoice)
+        except (ImportError, OSError) as e:
+            # WeasyPrint needs Pango/Cairo system libraries
+            reason = str(e).splitlines()[0].split(":")[0]
+            print(f"{f'pdf_render_{lines}':<26} skipped: {reason}")
+            continue
+        run(
+            f"pdf_render_{lines}",
+            lambda invoice=invoice: renderer.render(invoice),
+            args.pdf_iterations,
+        )
+
+    return results
+
+
+# ---------------------------
+# Reporting
+# ---------------------------
+def print_header() -> None:
+    print(
+        f"{'scenario':<26} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+        f"{'ops/s':>9} {'rss MB':>8}"
+    )
+
+
+def print_result(result: dict) -> None:
+    print(
+        f"{result['name']:<26} {result['iterations']:>5} {result['p50_ms']:>9.2f} "
+        f"{result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f} "
+        f"{result['throughput']:>9.1f} {result['peak_rss_mb']:>8.1f}"
+    )
+
+
+def compare(results: list, baseline: dict, threshold: float) -> list:
+    """Print p95 against the baseline; return the regressed scenario names."""
+    previous = baseline.get("results", {})
+    regressions = []
+    print(f"\n{'scenario':<26} {'base p95':>9} {'p95':>9} {'change':>8}")
+    for result in results:
+        base = previous.get(result["name"])
+        if base is None:
+            print(f"{result['name']:<26} {'-':>9} {result['p95_ms']:>9.2f} {'new':>8}")
+            continue
+        change = result["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(result["name"])
+            flag = "  REGRESSION"
+        print(
+            f"{result['name']:<26} {base['p95_ms']:>9.2f} {result['p95_ms']:>9.2f} "
+            f"{change:>+8.0%}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="sqlite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--pdf-iterations", type=int, default=20)
+    parser.add_argument(
+        "--max-seconds", type=float, default=10.0, help="time budget per scenario"
+    )
+    parser.add_argument("--master-records", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed p95 slowdown (0.25 = 25%%)"
+    )
+    parser.add_argument("--save-baseline", help="write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    os.environ["STORAGE_BACKEND"] = args.backend
+    # Throw-away database, removed when the run ends
+    workdir = tempfile.TemporaryDirectory(prefix="spm-bench-")
+    os.environ["SQLITE_DATABASE_PATH"] = os.path.join(workdir.name, "bench.db")
+    # Render in-process; the worker pool would hide the cost from this process
+    os.environ.setdefault("PDF_RENDER_WORKERS", "0")
+    os.environ.setdefault("MASTER_DATA_REPLICA", "false")
+
+    print(f"backend={args.backend} python={platform.python_version()}")
+    print_header()
+    results = run_suite(args)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(
+                {
+                    "backend": args.backend,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "results": {result["name"]: result for result in results},
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nbaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
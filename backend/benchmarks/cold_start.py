@@ -0,0 +1,225 @@
+"""
+Cold start benchmark and import-time profile.
+
+Starts fresh interpreters the way a serverless function cold-starts: each
+run imports app.main and sends the first requests straight to the ASGI app
+(no server, no network), then exits. Reports, as the median over --runs:
+
+- interpreter: process spawn until the child starts importing
+- import: `import app.main`
+- per path: time to the first response byte, from the request and from spawn
+
+One more run with `python -X importtime` breaks the import down by package
+and lists the slowest modules, so anything heavy that creeps back into the
+import path (firebase_admin, google-cloud-firestore, grpc, WeasyPrint,
+Jinja2) shows up by name. With --max-import-ms the exit status is 1 when
+the median import is slower than that.
+
+/health needs no Firestore credentials, since nothing touches Firebase
+until a route uses it; paths that read data need a local backend:
+
+    python -m benchmarks.cold_start
+    python -m benchmarks.cold_start --runs 10 --max-import-ms 800
+    python -m benchmarks.cold_start --backend memory --path /health /api/v1/invoices/
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child interpreter. Keep its own imports to the minimum so the
+# numbers are those of the app.
+CHILD = r"""
+import asyncio, json, sys, time
+
+spawned = float(sys.argv[1])
+started = time.time()
+import app.main
+imported = time.time()
+
+
+async def first_byte(path):
+    path, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000),
+        "server": ("localhost", 80),
+    }
+    result = {}
+    done = asyncio.Event()
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if not requested:
+            requested = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+            result["first_byte"] = time.time()
+        elif message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    sent = time.time()
+    await app.main.app(scope, receive, send)
+    return {
+        "status": result["status"],
+        "request_ms": (result["first_byte"] - sent) * 1000,
+        "from_spawn_ms": (result["first_byte"] - spawned) * 1000,
+    }
+
+
+async def main():
+    return {path: await first_byte(path) for path in sys.argv[2:]}
+
+
+print(json.dumps({
+    "interpreter_ms": (started - spawned) * 1000,
+    "import_ms": (imported - started) * 1000,
+    "paths": asyncio.run(main()),
+}))
+"""
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)$")
+
+# Namespace packages reported one level deeper
+_NAMESPACES = ("app", "google")
+
+
+# ---------------------------
+# Runs
+# ---------------------------
+def run_child(paths: list, backend: str, importtime: bool = False) -> tuple:
+    """One cold start; returns (measurements, stderr)."""
+    env = {**os.environ, "STORAGE_BACKEND": backend, "PYTHONDONTWRITEBYTECODE": "1"}
+    # Never fork PDF workers or attach listeners from a benchmark child
+    env.setdefault("PDF_RENDER_WORKERS", "0")
+    env.setdefault("MASTER_DATA_REPLICA", "false")
+    flags = ["-X", "importtime"] if importtime else []
+    # A new SQLite database per run, as on a fresh instance
+    with tempfile.TemporaryDirectory(prefix="spm-cold-start-") as workdir:
+        env["SQLITE_DATABASE_PATH"] = os.path.join(workdir, "cold_start.db")
+        command = [sys.executable, *flags, "-c", CHILD, repr(time.time()), *paths]
+        process = subprocess.run(
+            command, cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+        )
+    if process.returncode != 0:
+        sys.exit(f"cold start run failed:\n{process.stderr}")
+    return json.loads(process.stdout.strip().splitlines()[-1]), process.stderr
+
+
+def import_profile(stderr: str, root: str = "app.main") -> list:
+    """(module, self_us, cumulative_us) of every module imported by root."""
+    entries = []
+    for line in stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((len(indent) // 2, name, int(self_us), int(cumulative_us)))
+
+    # -X importtime prints a module after everything it imported
+    root_index = max(
+        index for index, entry in enumerate(entries) if entry[1] == root
+    )
+    root_depth = entries[root_index][0]
+    modules = [entries[root_index][1:]]
+    for depth, name, self_us, cumulative_us in reversed(entries[:root_index]):
+        if depth <= root_depth:
+            break
+        modules.append((name, self_us, cumulative_us))
+    return modules
+
+
+def package_of(module: str) -> str:
+    parts = module.split(".")
+    return ".".join(parts[:2]) if parts[0] in _NAMESPACES else parts[0]
+
+
+# ---------------------------
+# Reporting
+# ---------------------------
+def print_timings(runs: list, paths: list) -> float:
+    """Print the medians over runs; return the median import time."""
+    interpreter_ms = statistics.median(run["interpreter_ms"] for run in runs)
+    import_ms = statistics.median(run["import_ms"] for run in runs)
+    print(f"{'interpreter start':<34} {interpreter_ms:>9.1f} ms")
+    print(f"{'import app.main':<34} {import_ms:>9.1f} ms")
+    for path in paths:
+        request_ms = statistics.median(run["paths"][path]["request_ms"] for run in runs)
+        from_spawn_ms = statistics.median(
+            run["paths"][path]["from_spawn_ms"] for run in runs
+        )
+        status = runs[-1]["paths"][path]["status"]
+        print(
+            f"{'GET ' + path:<34} {request_ms:>9.1f} ms   "
+            f"first byte {from_spawn_ms:.1f} ms after spawn ({status})"
+        )
+    return import_ms
+
+
+def print_profile(modules: list, top: int) -> None:
+    packages = {}
+    for name, self_us, _ in modules:
+        package = package_of(name)
+        packages[package] = packages.get(package, 0) + self_us
+
+    print(f"\n{'package':<34} {'self ms':>9}")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"{package:<34} {self_us / 1000:>9.1f}")
+
+    print(f"\n{'module':<34} {'self ms':>9} {'cumul. ms':>10}")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda m: -m[1])[:top]:
+        print(f"{name:<34} {self_us / 1000:>9.1f} {cumulative_us / 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--backend", choices=("firestore", "memory", "sqlite"), default="firestore"
+    )
+    parser.add_argument("--path", nargs="+", default=["/health"], dest="paths")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="rows per profile table")
+    parser.add_argument(
+        "--max-import-ms", type=float, help="fail when the median import is slower"
+    )
+    args = parser.parse_args()
+
+    runs = [run_child(args.paths, args.backend)[0] for _ in range(args.runs)]
+    print(f"backend={args.backend} runs={args.runs} (median)")
+    import_ms = print_timings(runs, args.paths)
+
+    _, stderr = run_child(args.paths, args.backend, importtime=True)
+    print_profile(import_profile(stderr), args.top)
+
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        print(
+            f"\nimport app.main took {import_ms:.1f} ms "
+            f"(budget {args.max_import_ms:g} ms)"
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
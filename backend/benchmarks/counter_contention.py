@@ -0,0 +1,121 @@
+"""
+Invoice counter contention benchmark.
+
+Measures invoice-number allocation throughput as the number of concurrent
+writers grows, comparing one counter transaction per invoice (the old
+behaviour: every writer thread runs its own transaction, so they contend on
+the counter document and retry) with the commit-batched
+InvoiceNumberAllocator. "attempts" counts transaction function runs,
+retries included. Every run uses a throw-away counter document and checks
+the allocated numbers are gap-free and unique.
+
+Run against the Firestore emulator (recommended) or the configured project:
+
+    export FIRESTORE_EMULATOR_HOST=localhost:8080
+    python -m benchmarks.counter_contention --writers 1 2 4 8 16 32 --per-writer 20
+"""
+
+import argparse
+import os
+import threading
+import time
+import uuid
+
+from app.services.invoice_counter import (
+    COUNT_COLLECTION,
+    InvoiceNumberAllocator,
+    reserve_sequence,
+)
+from app.storage import transactional
+from app.utils.invoice_utils import get_current_financial_year
+
+
+def get_client():
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        from google.cloud import firestore
+
+        return firestore.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "spm-bench"))
+
+    from app.core.firebase import get_firestore
+
+    return get_firestore()
+
+
+def run(db, writers: int, per_writer: int, batched: bool) -> dict:
+    count_ref = db.collection(COUNT_COLLECTION).document(f"bench_{uuid.uuid4().hex}")
+    allocator = InvoiceNumberAllocator(db, count_ref=count_ref)
+    current_fy = get_current_financial_year()
+
+    numbers = []
+    errors = []
+    attempts = []
+    lock = threading.Lock()
+
+    @transactional
+    def reserve_one(transaction):
+        with lock:
+            attempts.append(1)
+        return reserve_sequence(transaction, count_ref, current_fy, 1)
+
+    def allocate():
+        if batched:
+            return allocator.allocate()[0]
+        # The old behaviour: one transaction per invoice, contending with
+        # every other writer's
+        return reserve_one(db.transaction())
+
+    def writer():
+        for _ in range(per_writer):
+            try:
+                start = allocate()
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                numbers.append(start)
+
+    threads = [threading.Thread(target=writer) for _ in range(writers)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    count_ref.delete()
+
+    return {
+        "writers": writers,
+        "mode": "batched" if batched else "per-invoice",
+        "allocated": len(numbers),
+        "errors": len(errors),
+        "throughput": len(numbers) / elapsed if elapsed else 0.0,
+        "attempts": allocator.stats()["transactions"] if batched else len(attempts),
+        "gap_free": sorted(numbers) == list(range(1, len(numbers) + 1)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--writers", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--per-writer", type=int, default=20)
+    args = parser.parse_args()
+
+    db = get_client()
+    print(
+        f"{'writers':>7}  {'mode':<12} {'alloc/s':>9} {'attempts':>8} {'errors':>6}  "
+        "gap-free"
+    )
+    for writers in args.writers:
+        for batched in (False, True):
+            result = run(db, writers, args.per_writer, batched)
+            print(
+                f"{result['writers']:>7}  {result['mode']:<12} "
+                f"{result['throughput']:>9.1f} {result['attempts']:>8} "
+                f"{result['errors']:>6}  {result['gap_free']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
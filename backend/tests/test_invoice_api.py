@@ -0,0 +1,318 @@
+"""
+Invoice and customer endpoints on the in-memory store: cursor pagination and
+projections, list filters, conditional GETs, bulk create results and the
+customer search index.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.core.firebase as firebase
+import app.storage as storage
+from app.api.v1 import customers as customers_api
+from app.api.v1 import invoices as invoices_api
+from app.services import stats_service
+from app.services.search_index import SearchIndex
+from app.storage.documents import DocumentClient
+from app.storage.memory import MemoryDocumentStore
+
+API = "/api/v1"
+
+
+def invoice_payload(buyer_id: str, day: int, total: float, po_number: str = "PO-1"):
+    buyer = {"id": buyer_id, "name": f"Buyer {buyer_id}", "gstin": f"29{buyer_id}"}
+    return {
+        "invoice_date": f"2025-05-{day:02d}",
+        "po_number": po_number,
+        "buyer": buyer,
+        "consignee": buyer,
+        "items": [
+            {
+                "item_id": "i1",
+                "name": "Steel rod",
+                "hsn": "9983",
+                "uom": "NOS",
+                "quantity": 1,
+                "rate": total,
+                "gst_percentage": 18,
+                "amount": total,
+            }
+        ],
+        "totals": {
+            "subtotal": total,
+            "sgst": 0,
+            "cgst": 0,
+            "round_off": 0,
+            "rounded_total": int(total),
+            "total": total,
+        },
+    }
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """TestClient whose storage is a fresh in-memory store."""
+    monkeypatch.setenv("STORAGE_BACKEND", "memory")
+    monkeypatch.setenv("MASTER_DATA_REPLICA", "false")
+    monkeypatch.setattr(stats_service, "_seeded", False)
+    monkeypatch.setattr(storage, "_client", DocumentClient(MemoryDocumentStore()))
+    monkeypatch.setattr(storage, "_async_client", None)
+    monkeypatch.setattr(firebase, "_db", None)
+    monkeypatch.setattr(firebase, "_async_db", None)
+    # The router's service caches its clients and allocator on first use
+    for name in ("db", "async_db", "counter"):
+        monkeypatch.delitem(invoices_api.invoice_service.__dict__, name, raising=False)
+    # Customer reads are cached and indexed per process
+    customers_api.customers_cache.invalidate()
+    index = customers_api.customers_index
+    monkeypatch.setattr(
+        customers_api,
+        "customers_index",
+        SearchIndex(index.name, index.id_field, index.fields, tuple(index.code_fields)),
+    )
+
+    from app.main import app
+
+    return TestClient(app)
+
+
+def create_invoices(client, buyer_id: str, totals: list, **kwargs) -> list:
+    created = []
+    for day, total in enumerate(totals, start=1):
+        response = client.post(
+            f"{API}/invoices/", json=invoice_payload(buyer_id, day, total, **kwargs)
+        )
+        assert response.status_code == 200, response.text
+        created.append(response.json()["data"])
+    return created
+
+
+def list_invoices(client, **params) -> dict:
+    response = client.get(f"{API}/invoices/", params=params)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+# ---------------------------
+# Cursor pagination
+# ---------------------------
+def test_cursor_pages_cover_every_invoice_once(client):
+    created = create_invoices(client, "B1", [100, 200, 300, 400, 500])
+
+    seen = []
+    page = list_invoices(client, limit=2)
+    while True:
+        seen.extend(invoice["id"] for invoice in page["data"])
+        if not page["has_more"]:
+            assert page["next_cursor"] is None
+            break
+        assert page["next_cursor"]
+        page = list_invoices(client, limit=2, after=page["next_cursor"])
+
+    # Newest first, no duplicates or gaps across pages
+    assert seen == [invoice["id"] for invoice in reversed(created)]
+
+
+def test_last_full_page_reports_no_more(client):
+    create_invoices(client, "B1", [100, 200])
+
+    page = list_invoices(client, limit=2)
+    assert len(page["data"]) == 2
+    assert page["has_more"] is False
+    assert page["next_cursor"] is None
+
+
+def test_summary_view_and_fields_projection(client):
+    create_invoices(client, "B1", [100])
+
+    summary = list_invoices(client, view="summary")["data"][0]
+    assert "items" not in summary
+    assert summary["buyer"] == {"name": "Buyer B1"}
+    assert summary["totals"]["total"] == 100
+
+    projected = list_invoices(client, fields="invoice_number,totals.total")["data"][0]
+    assert set(projected) <= {"id", "invoice_number", "totals", "meta"}
+    assert projected["totals"] == {"total": 100}
+
+
+def test_second_range_filter_is_rejected(client):
+    response = client.get(
+        f"{API}/invoices/", params={"number_prefix": "INV/", "total_min": 10}
+    )
+    assert response.status_code == 400
+
+
+def test_invalid_cursor_is_rejected(client):
+    response = client.get(f"{API}/invoices/", params={"after": "not-a-cursor"})
+    assert response.status_code == 400
+
+
+def test_pages_past_null_order_values(client):
+    created = create_invoices(client, "B1", [100, 200, 300])
+    # Legacy invoices may lack a creation time; nulls sort last newest-first
+    invoices = storage._client.collection("invoices")
+    invoices.document(created[1]["id"]).update({"meta.created_at": None})
+
+    seen = []
+    page = list_invoices(client, limit=1)
+    seen.extend(invoice["id"] for invoice in page["data"])
+    while page["has_more"]:
+        page = list_invoices(client, limit=1, after=page["next_cursor"])
+        seen.extend(invoice["id"] for invoice in page["data"])
+
+    assert seen == [created[2]["id"], created[0]["id"], created[1]["id"]]
+
+
+# ---------------------------
+# List filters
+# ---------------------------
+def test_equality_and_range_filters_combine(client):
+    create_invoices(client, "B1", [100, 200, 300], po_number="PO-A")
+    create_invoices(client, "B2", [150, 250], po_number="PO-A")
+    create_invoices(client, "B2", [350], po_number="PO-B")
+
+    by_buyer = list_invoices(client, buyer_id="B2")["data"]
+    assert sorted(invoice["totals"]["total"] for invoice in by_buyer) == [150, 250, 350]
+
+    by_gstin = list_invoices(client, buyer_gstin="29B1")["data"]
+    assert len(by_gstin) == 3
+
+    combined = list_invoices(client, buyer_id="B2", po_number="PO-A", total_min=200)
+    assert [invoice["totals"]["total"] for invoice in combined["data"]] == [250]
+
+    # Sorted by the range field, largest first
+    totals = list_invoices(client, total_min=150, total_max=300)["data"]
+    assert [invoice["totals"]["total"] for invoice in totals] == [300, 250, 200, 150]
+
+
+def test_date_and_number_prefix_filters(client):
+    created = create_invoices(client, "B1", [100, 200, 300])
+
+    dated = list_invoices(client, **{"from": "2025-05-02", "to": "2025-05-03"})
+    assert [invoice["invoice_date"] for invoice in dated["data"]] == [
+        "2025-05-03",
+        "2025-05-02",
+    ]
+
+    prefix = created[0]["invoice_number"].rsplit("/", 1)[0] + "/"
+    numbered = list_invoices(client, number_prefix=prefix)["data"]
+    assert len(numbered) == 3
+    assert list_invoices(client, number_prefix="XYZ/")["data"] == []
+
+
+# ---------------------------
+# Conditional requests
+# ---------------------------
+def test_conditional_get_answers_304_until_the_invoice_changes(client):
+    (invoice,) = create_invoices(client, "B1", [100])
+    url = f"{API}/invoices/{invoice['id']}"
+
+    first = client.get(url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert etag.startswith('W/"')
+
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    last_modified = first.headers["Last-Modified"]
+    since = client.get(url, headers={"If-Modified-Since": last_modified})
+    assert since.status_code == 304
+
+    update = {**invoice_payload("B1", 1, 100), "po_number": "PO-2"}
+    assert client.put(url, json=update).status_code == 200
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["data"]["po_number"] == "PO-2"
+
+
+def test_list_etag_changes_with_its_content(client):
+    create_invoices(client, "B1", [100])
+    etag = client.get(f"{API}/invoices/").headers["ETag"]
+
+    unchanged = client.get(f"{API}/invoices/", headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304
+
+    create_invoices(client, "B1", [200])
+    changed = client.get(f"{API}/invoices/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+
+
+# ---------------------------
+# Bulk create
+# ---------------------------
+def test_bulk_create_reports_each_row(client):
+    invalid = {**invoice_payload("B1", 2, 200)}
+    del invalid["buyer"]
+    rows = [invoice_payload("B1", 1, 100), invalid, invoice_payload("B1", 3, 300)]
+
+    response = client.post(f"{API}/invoices/bulk", json=rows)
+    assert response.status_code == 200
+    body = response.json()
+    results = body["data"]
+
+    assert body["success"] is False
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert [result["success"] for result in results] == [True, False, True]
+    assert results[1]["id"] is None and results[1]["error"]
+
+    # Valid rows get consecutive numbers in request order
+    first, last = results[0]["invoice_number"], results[2]["invoice_number"]
+    assert int(last.rsplit("/", 1)[1]) == int(first.rsplit("/", 1)[1]) + 1
+    assert client.get(f"{API}/invoices/{results[2]['id']}").status_code == 200
+
+    stats = client.get(f"{API}/dashboard/stats").json()["data"]
+    assert stats["total_invoices"] == 2
+    assert stats["total_revenue"] == 400
+
+
+# ---------------------------
+# Customer search index
+# ---------------------------
+def create_customer(client, name: str, gstin: str, phone: str) -> str:
+    response = client.post(
+        f"{API}/customers/",
+        json={
+            "name": name,
+            "gstin": gstin,
+            "phone": phone,
+            "address": "Coimbatore",
+            "email": "accounts@example.com",
+        },
+    )
+    assert response.status_code == 200, response.text
+    return response.json()["customer_id"]
+
+
+def search_customers(client, q: str) -> list:
+    response = client.get(f"{API}/customers/search", params={"q": q})
+    assert response.status_code == 200, response.text
+    return [customer["name"] for customer in response.json()["customers"]]
+
+
+def test_customer_search_by_name_gstin_and_phone(client):
+    create_customer(client, "Balaji Traders", "29ABCDE1234F1Z5", "9845012345")
+    create_customer(client, "Sri Balaji Steels", "33PQRST5678K1Z2", "9443098765")
+    create_customer(client, "Kumar Agencies", "32LMNOP4321Q1Z9", "9876543210")
+
+    assert search_customers(client, "bala") == ["Balaji Traders", "Sri Balaji Steels"]
+    assert search_customers(client, "33PQRST") == ["Sri Balaji Steels"]
+    assert search_customers(client, "98765432") == ["Kumar Agencies"]
+    assert search_customers(client, "zzz") == []
+
+
+def test_customer_search_follows_writes(client):
+    customer_id = create_customer(
+        client, "Balaji Traders", "29ABCDE1234F1Z5", "9845012345"
+    )
+    assert search_customers(client, "balaji") == ["Balaji Traders"]
+
+    create_customer(client, "Balaji Motors", "29ZZZZZ1234F1Z5", "9845000000")
+    assert "Balaji Motors" in search_customers(client, "balaji")
+
+    assert client.delete(f"{API}/customers/{customer_id}").status_code == 200
+    assert search_customers(client, "balaji") == ["Balaji Motors"]
@@ -0,0 +1,188 @@
+"""
+Failure injection between the steps of an invoice create.
+
+The counter bump and the invoice write share one transaction, so whatever
+fails (the write callback or the commit itself) the counter must stay where
+it was, no invoice may be left behind and the next create must get the
+number the failed one would have had.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import pytest
+
+from app.services import invoice_counter as invoice_counter_module
+from app.services import stats_service
+from app.services.invoice_counter import (
+    BATCH_LIMIT,
+    InvoiceNumberAllocator,
+    _Request,
+)
+from app.services.invoice_service import InvoiceService, _staged_writes
+from app.storage.documents import DocumentClient, Transaction
+from app.storage.memory import MemoryDocumentStore
+
+BUYER = {"id": "c1", "name": "Balaji Traders", "gstin": "29ABCDE1234F1Z5"}
+
+INVOICE = {
+    "invoice_date": "2025-05-02",
+    "po_number": "PO-1",
+    "buyer": BUYER,
+    "consignee": BUYER,
+    "items": [
+        {
+            "item_id": "i1",
+            "name": "Steel rod",
+            "hsn": "9983",
+            "uom": "NOS",
+            "quantity": 1,
+            "rate": 100,
+            "gst_percentage": 18,
+            "amount": 100,
+        }
+    ],
+    "totals": {"subtotal": 100, "sgst": 9, "cgst": 9, "total": 118},
+}
+
+
+class InjectedFailure(Exception):
+    pass
+
+
+@pytest.fixture
+def service(monkeypatch):
+    """InvoiceService over a fresh in-memory store."""
+    # The stats document of an empty store needs no rebuild
+    monkeypatch.setattr(stats_service, "_seeded", True)
+
+    db = DocumentClient(MemoryDocumentStore())
+    service = InvoiceService()
+    service.db = db
+    service.counter = InvoiceNumberAllocator(db, window=0)
+    return service
+
+
+def counter_value(service) -> int:
+    doc = service.db.collection("Count").document("count").get()
+    return (doc.to_dict() or {}).get("inv_no", 0) if doc.exists else 0
+
+
+def invoice_numbers(service) -> list:
+    invoices = service.db.collection("invoices").stream()
+    return sorted(doc.to_dict()["invoice_number"] for doc in invoices)
+
+
+def fail_once(monkeypatch, target, name):
+    """Make target.name raise InjectedFailure on its next call only."""
+    original = getattr(target, name)
+    calls = []
+
+    def failing(*args, **kwargs):
+        if not calls:
+            calls.append(True)
+            raise InjectedFailure(f"{name} failed")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(target, name, failing)
+
+
+def test_create_invoice_numbers_are_sequential(service):
+    first = service.create_invoice(INVOICE)
+    second = service.create_invoice(INVOICE)
+
+    assert first["invoice_number"].endswith("/0001")
+    assert second["invoice_number"].endswith("/0002")
+    assert counter_value(service) == 2
+
+
+def test_failed_write_callback_consumes_no_number(service, monkeypatch):
+    created = service.create_invoice(INVOICE)
+
+    # Fails after the invoice document has been staged in the transaction
+    fail_once(monkeypatch, invoice_counter_module, "record_invoice_changes")
+    with pytest.raises(Exception, match="record_invoice_changes failed"):
+        service.create_invoice(INVOICE)
+
+    assert counter_value(service) == 1
+    assert invoice_numbers(service) == [created["invoice_number"]]
+
+    retried = service.create_invoice(INVOICE)
+    assert retried["invoice_number"].endswith("/0002")
+    assert counter_value(service) == 2
+
+
+def test_failed_commit_consumes_no_number(service, monkeypatch):
+    created = service.create_invoice(INVOICE)
+
+    # The store rejects the transaction's writes as a whole
+    fail_once(monkeypatch, service.db._store, "write")
+    with pytest.raises(Exception, match="write failed"):
+        service.create_invoice(INVOICE)
+
+    assert counter_value(service) == 1
+    assert invoice_numbers(service) == [created["invoice_number"]]
+
+    retried = service.create_invoice(INVOICE)
+    assert retried["invoice_number"].endswith("/0002")
+    assert counter_value(service) == 2
+
+
+def test_failed_write_does_not_fail_requests_batched_with_it(service):
+    def failing_write(transaction, start, fy):
+        raise InjectedFailure("write failed")
+
+    written = []
+
+    def write(transaction, start, fy):
+        written.append(start)
+
+    # One counter transaction for both, as for concurrent callers
+    batch = [_Request(1, failing_write), _Request(1, write)]
+    service.counter._commit(batch)
+
+    assert isinstance(batch[0].error, InjectedFailure)
+    assert batch[1].error is None
+    assert batch[1].start == 1
+    assert written[-1] == 1
+    assert counter_value(service) == 1
+
+
+def test_saturated_batch_commits_once_within_write_limit(service, monkeypatch):
+    # Numbers alone would allow more creates than one commit can hold
+    service.counter.max_batch = 1000
+    commits = []
+    original_commit = Transaction.commit
+
+    def counting_commit(self, **kwargs):
+        commits.append(len(self))
+        return original_commit(self, **kwargs)
+
+    monkeypatch.setattr(Transaction, "commit", counting_commit)
+
+    collection = service.db.collection("invoices")
+
+    def make_write(invoice_ref):
+        def write(transaction, start, fy):
+            invoice_doc = {**INVOICE, "invoice_number": str(start)}
+            transaction.set(invoice_ref, invoice_doc)
+            return [(None, invoice_doc)]
+
+        return write
+
+    writes = _staged_writes([INVOICE])
+    service.counter._pending = [
+        _Request(1, make_write(collection.document()), writes) for _ in range(300)
+    ]
+    batch = service.counter._take_batch()
+    service.counter._commit(batch)
+
+    # Counter + stats document + each create's invoice and rollup buckets
+    assert 2 + len(batch) * writes <= BATCH_LIMIT < 2 + (len(batch) + 1) * writes
+    assert all(request.error is None for request in batch)
+    # One transaction, no one-by-one fallback; stats and buckets written once
+    assert commits == [len(batch) + 1 + 1 + 3]
+    assert counter_value(service) == len(batch)
+
+    stats = stats_service.get_stats_ref(service.db).get().to_dict()
+    assert stats["total_invoices"] == len(batch)
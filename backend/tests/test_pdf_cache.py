@@ -0,0 +1,50 @@
+"""
+Disk tier of the PDF cache: size budget with LRU eviction by mtime, and
+removal of PDFs rendered from an older template.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import os
+
+from app.services.pdf_cache import PdfCache, pdf_cache_key
+
+OLD_TEMPLATE = "a" * 64
+NEW_TEMPLATE = "b" * 64
+PDF = b"x" * 1000
+
+
+def put(cache, invoice_id: int, mtime: int) -> str:
+    key = pdf_cache_key({"id": invoice_id}, OLD_TEMPLATE)
+    cache.put(key, str(invoice_id), PDF)
+    os.utime(cache._disk_path(key), (mtime, mtime))
+    return key
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = PdfCache(disk_dir=str(tmp_path), disk_max_bytes=5 * len(PDF))
+    keys = [put(cache, invoice_id, mtime=1000 + invoice_id) for invoice_id in range(5)]
+
+    # Reading the oldest PDF makes it the most recently used
+    assert cache.get(keys[0]) == PDF
+    cache.put(pdf_cache_key({"id": 5}, OLD_TEMPLATE), "5", PDF)
+
+    remaining = {path.stem for path in tmp_path.glob("*.pdf")}
+    assert keys[0] in remaining
+    assert keys[1] not in remaining
+    assert len(remaining) * len(PDF) <= cache.disk_max_bytes
+    assert cache.stats()["disk_evictions"] >= 1
+
+
+def test_remove_stale_drops_other_templates(tmp_path):
+    cache = PdfCache(disk_dir=str(tmp_path))
+    stale = put(cache, 1, mtime=1000)
+    current = pdf_cache_key({"id": 2}, NEW_TEMPLATE)
+    cache.put(current, "2", PDF)
+
+    restarted = PdfCache(disk_dir=str(tmp_path))
+    assert restarted.remove_stale(NEW_TEMPLATE) == 1
+    assert [path.stem for path in tmp_path.glob("*.pdf")] == [current]
+    assert restarted.stats()["disk_bytes"] == len(PDF)
+    assert stale != current
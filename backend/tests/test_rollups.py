@@ -0,0 +1,111 @@
+"""
+Revenue rollups on an install whose invoices predate them.
+
+Invoices written before the rollups existed have no buckets, so the first
+write or read must rebuild them from the invoices; otherwise the trend
+shows only new invoices and changing an old one drives its buckets negative.
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+from datetime import datetime, timezone
+
+import pytest
+
+from app.services import stats_service
+from app.services.dashboard_service import DashboardService
+from app.services.invoice_counter import InvoiceNumberAllocator
+from app.services.invoice_service import InvoiceService
+from app.storage.documents import DocumentClient
+from app.storage.memory import MemoryDocumentStore
+
+FY = "2024-2025"
+
+
+def legacy_invoice(invoice_date: str, total: float) -> dict:
+    return {
+        "invoice_number": f"INV/{FY}/{invoice_date}",
+        "invoice_date": invoice_date,
+        "buyer": {"id": "c1", "name": "Balaji Traders"},
+        "totals": {"subtotal": total, "sgst": 0, "cgst": 0, "total": total},
+        "meta": {"created_at": datetime(2024, 6, 1, tzinfo=timezone.utc)},
+    }
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """In-memory store holding invoices written before stats or rollups."""
+    monkeypatch.setattr(stats_service, "_seeded", False)
+
+    db = DocumentClient(MemoryDocumentStore())
+    invoices = db.collection("invoices")
+    invoices.document("a").set(legacy_invoice("2024-05-10", 100))
+    invoices.document("b").set(legacy_invoice("2024-05-20", 50))
+    invoices.document("c").set(legacy_invoice("2024-07-01", 200))
+    return db
+
+
+@pytest.fixture
+def service(db):
+    service = InvoiceService()
+    service.db = db
+    service.counter = InvoiceNumberAllocator(db, window=0)
+    return service
+
+
+def dashboard(db) -> DashboardService:
+    dashboard_service = DashboardService()
+    dashboard_service.db = db
+    return dashboard_service
+
+
+def timeseries(db, granularity: str) -> dict:
+    points = dashboard(db).get_timeseries(granularity, FY)["points"]
+    return {
+        point["bucket"]: (point["invoice_count"], point["revenue"])
+        for point in points
+        if point["invoice_count"] or point["revenue"]
+    }
+
+
+def test_first_read_seeds_rollups(db):
+    assert timeseries(db, "month") == {
+        "2024-05": (2, 150.0),
+        "2024-07": (1, 200.0),
+    }
+    assert stats_service.is_seeded(
+        stats_service.get_stats_ref(db).get(), stats_service.ROLLUPS_SEEDED_FIELD
+    )
+
+
+def test_update_of_old_invoice_moves_it_between_buckets(service, db):
+    service.update_invoice("a", {"invoice_date": "2024-07-15"})
+
+    assert timeseries(db, "month") == {
+        "2024-05": (1, 50.0),
+        "2024-07": (2, 300.0),
+    }
+    assert timeseries(db, "fy") == {FY: (3, 350.0)}
+
+
+def test_delete_of_old_invoice_keeps_buckets_non_negative(service, db):
+    service.delete_invoice("c")
+    service.delete_invoice("a")
+
+    assert timeseries(db, "month") == {"2024-05": (1, 50.0)}
+    assert timeseries(db, "day") == {"2024-05-20": (1, 50.0)}
+    assert timeseries(db, "fy") == {FY: (1, 50.0)}
+
+
+def test_stats_seeded_install_still_seeds_rollups(service, db):
+    # Stats seeded by an earlier deploy, rollups never built
+    dashboard(db).rebuild_stats()
+
+    service.delete_invoice("b")
+
+    assert timeseries(db, "month") == {
+        "2024-05": (1, 100.0),
+        "2024-07": (1, 200.0),
+    }
+
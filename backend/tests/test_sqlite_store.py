@@ -0,0 +1,74 @@
+"""
+The SQLite store must page through query results exactly like the in-memory
+store, whose Python evaluator follows Firestore's ordering (null first).
+
+Run from the backend directory:
+    python -m pytest tests
+"""
+
+import random
+
+import pytest
+
+from app.storage.documents import DocumentClient
+from app.storage.memory import MemoryDocumentStore
+from app.storage.sqlite import SQLiteDocumentStore
+
+ASCENDING = "ASCENDING"
+DESCENDING = "DESCENDING"
+
+
+@pytest.fixture(scope="module")
+def clients(tmp_path_factory):
+    memory = DocumentClient(MemoryDocumentStore())
+    sqlite = DocumentClient(
+        SQLiteDocumentStore(str(tmp_path_factory.mktemp("sqlite") / "store.db"))
+    )
+
+    rng = random.Random(7)
+    for index in range(200):
+        data = {
+            "po_number": rng.choice(["PO-1", "PO-2", None]),
+            "total": rng.choice([10, 118, 250.5, None]),
+        }
+        for client in (memory, sqlite):
+            client.collection("invoices").document(f"inv{index:03d}").set(data)
+    return memory, sqlite
+
+
+def page_ids(client, orders: list, page_size: int = 7) -> list:
+    """Every document ID, fetched page by page with start_after cursors."""
+    query = client.collection("invoices")
+    for field, direction in orders:
+        query = query.order_by(field, direction=direction)
+    query = query.limit(page_size)
+
+    ids, cursor = [], None
+    while True:
+        docs = (query.start_after(cursor) if cursor else query).get()
+        if not docs:
+            return ids
+        ids.extend(doc.id for doc in docs)
+        last = docs[-1]
+        cursor = {
+            field: last.id if field == "__name__" else last.get(field)
+            for field, _ in orders
+        }
+
+
+@pytest.mark.parametrize(
+    "orders",
+    [
+        [("po_number", ASCENDING), ("__name__", ASCENDING)],
+        [("po_number", DESCENDING), ("__name__", DESCENDING)],
+        [("total", DESCENDING), ("__name__", DESCENDING)],
+        [("po_number", ASCENDING), ("total", DESCENDING), ("__name__", ASCENDING)],
+        [("total", DESCENDING), ("po_number", DESCENDING), ("__name__", DESCENDING)],
+    ],
+)
+def test_cursor_pages_match_memory_store_with_nulls(clients, orders):
+    memory, sqlite = clients
+
+    expected = page_ids(memory, orders)
+    assert len(expected) == 200
+    assert page_ids(sqlite, orders) == expected
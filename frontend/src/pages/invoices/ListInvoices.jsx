@@ -1,5 +1,5 @@
 import { useNavigate } from "react-router-dom";
-import { useState, useEffect } from "react";
+import { useState, useEffect, useRef } from "react";
 import DashboardLayout from "../../app/layout/DashboardLayout";
 import {
   Plus,
@@ -11,7 +11,13 @@ import {
   Printer,
   Download,
 } from "lucide-react";
-import { getAllInvoices } from "@/services/invoice_service";
+import {
+  getAllInvoices,
+  getInvoiceSearchParams,
+} from "@/services/invoice_service";
+
+// Wait for typing to pause before querying the server
+const SEARCH_DEBOUNCE_MS = 300;
 
 export default function ListInvoices() {
   const navigate = useNavigate();
@@ -24,40 +30,68 @@ export default function ListInvoices() {
   const [perPage] = useState(10);
   const [showModal, setShowModal] = useState(false);
   const [selectedInvoice, setSelectedInvoice] = useState(null);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Server-side filters of the current search, reused for "Load more"
+  const [filters, setFilters] = useState({});
+  const [matchedBuyer, setMatchedBuyer] = useState(null);
+  // Only the latest search may update the list
+  const searchSeq = useRef(0);
 
   useEffect(() => {
-    fetchInvoices();
-  }, []);
+    const timer = setTimeout(
+      () => fetchInvoices(searchTerm),
+      searchTerm ? SEARCH_DEBOUNCE_MS : 0,
+    );
+    return () => clearTimeout(timer);
+  }, [searchTerm]);
 
-  const fetchInvoices = async () => {
+  // Restart from the first page with the filters of the search term
+  const fetchInvoices = async (term) => {
+    const seq = ++searchSeq.current;
     try {
       setLoading(true);
       setError(null);
-      const response = await getAllInvoices();
-      setInvoices(response.invoices || []);
+      const { params, buyer } = await getInvoiceSearchParams(term);
+      const response = await getAllInvoices({ view: "summary", ...params });
+      if (seq !== searchSeq.current) return;
+      setFilters(params);
+      setMatchedBuyer(buyer);
+      setInvoices(response.data || []);
+      setNextCursor(response.next_cursor || null);
+      setCurrentPage(1);
     } catch (err) {
+      if (seq !== searchSeq.current) return;
       setError("Failed to load invoices");
       console.error("Error fetching invoices:", err);
     } finally {
-      setLoading(false);
+      if (seq === searchSeq.current) setLoading(false);
     }
   };
 
-  const filtered = invoices.filter((inv) => {
-    const q = searchTerm.toLowerCase();
-    return (
-      (inv.invoice_number &&
-        inv.invoice_number.toString().toLowerCase().includes(q)) ||
-      (inv.po_number && inv.po_number.toString().toLowerCase().includes(q)) ||
-      (inv.consignee?.name &&
-        inv.consignee.name.toString().toLowerCase().includes(q)) ||
-      (inv.buyer?.name && inv.buyer.name.toString().toLowerCase().includes(q))
-    );
-  });
+  const loadMoreInvoices = async () => {
+    if (!nextCursor) return;
+    const seq = searchSeq.current;
+    try {
+      setLoadingMore(true);
+      const response = await getAllInvoices({
+        view: "summary",
+        ...filters,
+        after: nextCursor,
+      });
+      if (seq !== searchSeq.current) return;
+      setInvoices((prev) => [...prev, ...(response.data || [])]);
+      setNextCursor(response.next_cursor || null);
+    } catch (err) {
+      console.error("Error fetching more invoices:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
-  const totalPages = Math.max(1, Math.ceil(filtered.length / perPage));
+  const totalPages = Math.max(1, Math.ceil(invoices.length / perPage));
   const startIndex = (currentPage - 1) * perPage;
-  const paginated = filtered.slice(startIndex, startIndex + perPage);
+  const paginated = invoices.slice(startIndex, startIndex + perPage);
 
   const handleRowClick = (id) => navigate(`/invoices/${id}`);
 
@@ -161,14 +195,16 @@ export default function ListInvoices() {
           <Search className="absolute left-3 top-3 text-gray-400" size={18} />
           <input
             value={searchTerm}
-            onChange={(e) => {
-              setSearchTerm(e.target.value);
-              setCurrentPage(1);
-            }}
+            onChange={(e) => setSearchTerm(e.target.value)}
             type="text"
-            placeholder="Search by invoice, PO, consignee or buyer..."
+            placeholder="Search by invoice no. (INV/25-26/...), PO, buyer or GSTIN..."
             className="w-full pl-10 pr-4 py-2 border border-gray-300 rounded-lg focus:outline-none focus:ring-2 focus:ring-purple-500 focus:border-transparent"
           />
+          {matchedBuyer && (
+            <p className="text-xs text-gray-500 mt-1">
+              Showing invoices of {matchedBuyer.name}
+            </p>
+          )}
         </div>
 
         {/* <div className="bg-white rounded-2xl shadow overflow-hidden"> */}
@@ -307,8 +343,17 @@ export default function ListInvoices() {
             <div className="flex flex-col sm:flex-row sm:items-center sm:justify-between gap-3 mt-6 pt-4 border-t border-gray-200">
               <div className="text-xs md:text-sm text-gray-600">
                 Showing {startIndex + 1} to{" "}
-                {Math.min(startIndex + perPage, filtered.length)} of{" "}
-                {filtered.length} invoices
+                {Math.min(startIndex + perPage, invoices.length)} of{" "}
+                {invoices.length} invoices
+                {nextCursor && (
+                  <button
+                    onClick={loadMoreInvoices}
+                    disabled={loadingMore}
+                    className="ml-3 text-purple-600 hover:underline disabled:opacity-50"
+                  >
+                    {loadingMore ? "Loading..." : "Load more"}
+                  </button>
+                )}
               </div>
 
               <div className="flex items-center gap-1 md:gap-2">
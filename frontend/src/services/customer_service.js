@@ -31,3 +31,9 @@ export const getCustomerById = async (customerId) => {
   const res = await api.get(`/customers/${customerId}`);
   return res.data;
 };
+
+// Search active customers by name, GSTIN or phone
+export const searchCustomers = async (q, limit = 20) => {
+  const res = await api.get("/customers/search", { params: { q, limit } });
+  return res.data;
+};
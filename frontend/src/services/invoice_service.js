@@ -1,4 +1,5 @@
 import api from "@/config/axios";
+import { searchCustomers } from "@/services/customer_service";
 
 // Get preview invoice number
 export const getPreviewInvoiceNumber = async () => {
@@ -13,12 +14,37 @@ export const createInvoice = async (payload) => {
   return res.data;
 };
 
-// Get all invoices
-export const getAllInvoices = async () => {
-  const res = await api.get("/invoices");
+// Get one page of invoices (pass next_cursor as `after` for the next page)
+export const getAllInvoices = async (params = {}) => {
+  const res = await api.get("/invoices", { params });
   return res.data;
 };
 
+const GSTIN_PATTERN = /^\d{2}[A-Z]{5}\d{4}[A-Z][A-Z\d]Z[A-Z\d]$/;
+
+// Turn a search box term into the list filters of GET /invoices:
+// a GSTIN filters by buyer GSTIN, an invoice number (INV/25-26/...) by
+// number prefix, a buyer name by the best matching customer, anything else
+// by PO number. Returns { params, buyer } (buyer: the matched customer).
+export const getInvoiceSearchParams = async (term) => {
+  const q = term.trim();
+  if (!q) return { params: {}, buyer: null };
+
+  const upper = q.toUpperCase();
+  if (GSTIN_PATTERN.test(upper)) {
+    return { params: { buyer_gstin: upper }, buyer: null };
+  }
+  if (upper.startsWith("INV") || q.includes("/")) {
+    return { params: { number_prefix: upper }, buyer: null };
+  }
+
+  const { customers = [] } = await searchCustomers(q, 1);
+  if (customers.length > 0) {
+    return { params: { buyer_id: customers[0].id }, buyer: customers[0] };
+  }
+  return { params: { po_number: q }, buyer: null };
+};
+
 // Get invoice by ID
 export const getInvoiceById = async (invoiceId) => {
   const res = await api.get(`/invoices/${invoiceId}`);